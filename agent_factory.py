@@ -0,0 +1,416 @@
+"""Lazy construction of the camel agents used by the research scripts.
+
+Importing camel and creating model backends is most of our startup cost, so
+nothing in this module touches camel until an agent is actually requested.
+"""
+
+import os
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """Everything needed to build one ``ChatAgent``.
+
+    ``model_type`` is the name of a ``camel.types.ModelType`` member so specs
+    can be declared without importing camel. ``input_budget`` caps, in
+    estimated tokens, the evidence sent to the agent in one step (see
+    ``prompt_budget``); ``None`` means unlimited. ``memory`` is an
+    ``agent_memory.MemoryPolicy`` string such as ``"task"`` or
+    ``"window:8000"``; ``None`` uses the process default (``set_memory_policy``).
+    """
+
+    role_name: str
+    system_prompt: str
+    model_type: str = "GPT_4O"
+    use_search: bool = False
+    input_budget: int | None = None
+    memory: str | None = None
+
+
+def check_api_keys(*groups):
+    """Raise ``ValueError`` for the first group of env vars that is not set.
+
+    Each group is a tuple of variable names that are reported together, e.g.
+    ``("GOOGLE_API_KEY", "SEARCH_ENGINE_ID")``.
+    """
+    for names in groups:
+        if not all(os.getenv(name) for name in names):
+            raise ValueError(f"Please set {' and '.join(names)} in your .env file")
+
+
+DEFAULT_API_KEYS = (("OPENAI_API_KEY",), ("GOOGLE_API_KEY", "SEARCH_ENGINE_ID"))
+
+
+def add_backend_arguments(parser, fake=False, memory=True):
+    """Add the ``--llm-cache`` option, and ``--fake``/``--memory`` if asked, to ``parser``."""
+    parser.add_argument('--llm-cache', choices=['off', 'record', 'replay'], default='off',
+                        help='Record model responses, or replay recorded runs offline')
+    if fake:
+        parser.add_argument('--fake', action='store_true',
+                            help='Answer with fake_backends instead of OpenAI and Google '
+                                 '(no keys needed)')
+    if memory:
+        parser.add_argument('--memory', type=str, default='window:16000', metavar='POLICY',
+                            help='Agent conversation memory: task (reset every step), '
+                                 'window:TOKENS, summarize:TOKENS or unbounded '
+                                 '(default: window:16000)')
+
+
+def setup_backends(llm_cache="off", fake=False, keys=DEFAULT_API_KEYS, fake_options=None):
+    """Load ``.env``, check the API keys and set up the response cache for an entry point.
+
+    ``fake`` installs ``fake_backends`` (with ``fake_options``) and needs no
+    keys; a replay needs none either. ``keys`` are ``check_api_keys`` groups.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if fake:
+        from fake_backends import install_fakes
+
+        install_fakes(**(fake_options or {}))
+    elif llm_cache == "replay":
+        # Replays never reach the provider, the client only needs a key to exist
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+    else:
+        check_api_keys(*keys)
+    configure_llm_cache(llm_cache)
+
+
+_search_tools = None
+_search_cache = None
+_page_cache = None
+_llm_cache = None
+_model_provider = None
+_rate_limiter = None
+_openai_clients = {}
+_memory_policy = None
+_lock = threading.RLock()
+
+
+def set_model_provider(provider):
+    """Build every model with ``provider(model_type)`` instead of OpenAI.
+
+    ``provider`` gets the ``ModelType`` member name and returns a model
+    backend, e.g. a ``fake_backends.FakeModel``. ``None`` restores OpenAI.
+    """
+    global _model_provider
+    _model_provider = provider
+
+
+def set_search_tools(tools):
+    """Replace the search tools, e.g. with ``fake_backends.make_fake_search()``.
+
+    The tools are traced but not cached. ``None`` rebuilds the real toolkit
+    on next use.
+    """
+    global _search_tools
+    from tracing import traced_tool
+
+    with _lock:
+        _search_tools = None if tools is None else [traced_tool(tool) for tool in tools]
+
+
+def set_memory_policy(policy):
+    """Default ``agent_memory.MemoryPolicy`` (or policy string) for agents built afterwards.
+
+    Specs with their own ``memory`` keep it. ``None`` restores
+    ``agent_memory.DEFAULT_POLICY``.
+    """
+    global _memory_policy
+    if isinstance(policy, str):
+        from agent_memory import MemoryPolicy
+
+        policy = MemoryPolicy.parse(policy)
+    _memory_policy = policy
+
+
+def configure_llm_cache(mode="off", cache_dir=None):
+    """Route every model created afterwards through an ``LLMCache``.
+
+    ``mode`` is ``off``, ``record`` or ``replay``. Replay also makes the search
+    tools answer from the search cache only, so a recorded run needs no
+    network at all. Call this before any agent or search tool is built.
+    """
+    global _llm_cache
+    if mode == "off":
+        _llm_cache = None
+        return None
+    from llm_cache import DEFAULT_CACHE_DIR, LLMCache
+
+    _llm_cache = LLMCache(cache_dir or DEFAULT_CACHE_DIR, mode=mode)
+    return _llm_cache
+
+
+def replaying():
+    """Whether model and search calls are answered from recorded caches only."""
+    return _llm_cache is not None and _llm_cache.mode == "replay"
+
+
+def get_rate_limiter():
+    """Return the shared ``RateLimiter``, or ``None`` when ``RATE_LIMIT=0``."""
+    global _rate_limiter
+    with _lock:
+        if _rate_limiter is None:
+            from rate_limiter import limiter_from_env
+
+            _rate_limiter = limiter_from_env() or False
+    return _rate_limiter or None
+
+
+def _openai_client(base_url, api_key):
+    """One pooled ``OpenAI`` client per endpoint, shared by every model backend.
+
+    Retries are left to ``rate_limiter`` when it is enabled, so they are
+    spaced by the shared quota rather than by each client on its own.
+    """
+    with _lock:
+        key = (base_url, api_key)
+        if key not in _openai_clients:
+            from openai import OpenAI
+
+            _openai_clients[key] = OpenAI(
+                timeout=180,
+                max_retries=0 if get_rate_limiter() is not None else 3,
+                base_url=base_url,
+                api_key=api_key,
+            )
+    return _openai_clients[key]
+
+
+def create_model(model_type):
+    """Create an OpenAI model backend for the ``ModelType`` member named ``model_type``.
+
+    Backends share one HTTP client and, unless ``RATE_LIMIT=0``, the
+    requests- and tokens-per-minute buckets of ``get_rate_limiter``. A
+    provider installed with ``set_model_provider`` takes precedence.
+    """
+    if _model_provider is not None:
+        model = _model_provider(model_type)
+    else:
+        from camel.configs.openai_config import ChatGPTConfig
+        from camel.models import ModelFactory
+        from camel.types import ModelPlatformType, ModelType
+
+        model = ModelFactory.create(
+            model_platform=ModelPlatformType.OPENAI,
+            model_type=ModelType[model_type],
+            model_config_dict=ChatGPTConfig().as_dict()
+        )
+        model._client = _openai_client(model._url, model._api_key)
+        limiter = get_rate_limiter()
+        if limiter is not None:
+            from rate_limiter import RateLimitedModelBackend
+
+            model = RateLimitedModelBackend(model, limiter)
+    if _llm_cache is not None:
+        from llm_cache import CachingModelBackend
+
+        model = CachingModelBackend(model, _llm_cache)
+    return model
+
+
+def workforce_kwargs(tracer=None):
+    """Models for the Workforce's own coordinator and task planner agents.
+
+    Without these the Workforce builds them from camel's defaults, bypassing
+    ``create_model`` and therefore the response cache and ``tracer``.
+    """
+    kwargs = {}
+    for key, name in (
+        ("coordinator_agent_kwargs", "coordinator"),
+        ("task_agent_kwargs", "task_planner"),
+        ("new_worker_agent_kwargs", "new_worker"),
+    ):
+        model = create_model("DEFAULT")
+        if tracer is not None:
+            from tracing import TracingModelBackend
+
+            model = TracingModelBackend(model, tracer, name)
+        kwargs[key] = {"model": model}
+    return kwargs
+
+
+def get_search_cache():
+    """Return the shared search cache, or ``None`` when ``SEARCH_CACHE=0``."""
+    global _search_cache
+    with _lock:
+        if _search_cache is None:
+            from search_cache import cache_from_env
+
+            _search_cache = cache_from_env() or False
+    return _search_cache or None
+
+
+def get_search_tools():
+    """Return the shared search tool list, building the search client on first use.
+
+    Searches go through one pooled, rate-limited ``GoogleSearch`` client.
+    Tools are wrapped with the persistent search cache unless it is disabled,
+    and record a span on the calling run's tracer, if any.
+    """
+    global _search_tools
+    with _lock:
+        if _search_tools is None:
+            from google_search import GoogleSearch
+            from search_cache import cached_tool
+            from tracing import traced_tool
+
+            search_client = GoogleSearch(limiter=get_rate_limiter())
+            tools = [
+                search_client.search_google
+            ]
+            cache = get_search_cache()
+            if cache is not None:
+                tools = [cached_tool(tool, cache, strict=replaying()) for tool in tools]
+            _search_tools = [traced_tool(tool) for tool in tools]
+    return _search_tools
+
+
+def get_page_cache():
+    """Return the shared fetched-page cache, or ``None`` when ``PAGE_CACHE=0``."""
+    global _page_cache
+    with _lock:
+        if _page_cache is None:
+            from page_fetcher import page_cache_from_env
+
+            _page_cache = page_cache_from_env() or False
+    return _page_cache or None
+
+
+def make_page_fetcher(**kwargs):
+    """A ``PageFetcher`` on the shared page cache; cache-only when replaying.
+
+    Fetchers own an async HTTP client, so create one per event loop and use
+    it as ``async with make_page_fetcher() as fetcher``.
+    """
+    from page_fetcher import PageFetcher
+
+    return PageFetcher(cache=get_page_cache(), offline=replaying(), **kwargs)
+
+
+def print_cache_stats():
+    cache = get_search_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(
+            f"Search cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['entries']} entries"
+        )
+    if _llm_cache is not None:
+        print(
+            f"LLM cache ({_llm_cache.mode}): {_llm_cache.hits} hits, "
+            f"{_llm_cache.misses} misses"
+        )
+
+
+class AgentFactory:
+    """Builds agents from specs on first use and caches them.
+
+    A factory owns one instance of each agent, so code that needs isolated
+    conversation histories (e.g. concurrent batch queries) should use one
+    factory per query, or ``create`` for a throwaway instance.
+
+    ``stream_to`` maps agent names to token callbacks; those agents stream
+    their replies through ``streaming.StreamingModelBackend``. With a
+    ``tracing.Tracer`` every agent step and model call is recorded on it.
+    """
+
+    def __init__(self, specs, stream_to=None, tracer=None):
+        self.specs = dict(specs)
+        self.stream_to = dict(stream_to or {})
+        self.tracer = tracer
+        self._agents = {}
+
+    def create_model(self, name, stream=True):
+        """Model backend for agent ``name``, wrapped for streaming and tracing if requested."""
+        model = create_model(self.specs[name].model_type)
+        if stream and name in self.stream_to:
+            from streaming import StreamingModelBackend
+
+            model = StreamingModelBackend(model, self.stream_to[name])
+        if self.tracer is not None:
+            from tracing import TracingModelBackend
+
+            model = TracingModelBackend(model, self.tracer, name)
+        return model
+
+    def set_model(self, name, model_type):
+        """Use ``model_type`` for agent ``name`` from now on.
+
+        A cached agent on a different model is dropped, so the next ``get``
+        builds a fresh one (with an empty history).
+        """
+        spec = self.specs[name]
+        if spec.model_type != model_type:
+            self.specs[name] = replace(spec, model_type=model_type)
+            self._agents.pop(name, None)
+
+    def stage(self, name):
+        """Context manager marking a pipeline stage on the tracer, if any."""
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.stage(name)
+
+    def span(self, kind, name, **attrs):
+        """Context manager recording a span on the tracer, if any."""
+        if self.tracer is None:
+            return nullcontext({})
+        return self.tracer.span(kind, name, **attrs)
+
+    def memory_policy(self, name):
+        """The ``MemoryPolicy`` agent ``name`` is built with."""
+        from agent_memory import DEFAULT_POLICY, MemoryPolicy
+
+        spec = self.specs[name]
+        if spec.memory is not None:
+            return MemoryPolicy.parse(spec.memory)
+        return _memory_policy or DEFAULT_POLICY
+
+    def create(self, name, stream=True):
+        """Build a new, uncached agent for ``name``.
+
+        ``stream=False`` skips the agent's ``stream_to`` callback, e.g. for
+        concurrent steps whose tokens would interleave. The agent's history
+        is bounded by its ``memory_policy``; summaries are written by the
+        agent's model, without streaming.
+        """
+        from camel.agents.chat_agent import ChatAgent
+        from camel.messages.base import BaseMessage
+        from agent_memory import build_memory, summarize_with
+
+        spec = self.specs[name]
+        model = self.create_model(name, stream)
+        agent = ChatAgent(
+            system_message=BaseMessage.make_assistant_message(
+                role_name=spec.role_name,
+                content=spec.system_prompt
+            ),
+            model=model,
+            memory=build_memory(
+                self.memory_policy(name), name, model,
+                summarize=lambda text, max_tokens: summarize_with(
+                    self.create_model(name, stream=False), text, max_tokens
+                ),
+            ),
+            tools=get_search_tools() if spec.use_search else None
+        )
+        if self.tracer is not None:
+            self.tracer.instrument_agent(agent, name)
+        return agent
+
+    def get(self, name):
+        """Return the cached agent for ``name``, building it if needed."""
+        if name not in self._agents:
+            self._agents[name] = self.create(name)
+        return self._agents[name]
+
+    __getitem__ = get
+
+    @property
+    def built(self):
+        """Names of the agents that have been built so far."""
+        return list(self._agents)
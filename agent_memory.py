@@ -0,0 +1,230 @@
+"""Bounded conversation memory for agents that are reused across tasks.
+
+camel's ``ChatAgent`` keeps every message it has seen, so an agent that
+serves many tasks sends ever longer prompts, and earlier tasks leak into
+later ones. ``BoundedMemory`` applies a ``MemoryPolicy`` each time a new
+turn starts (a user message is written, i.e. at every ``step``):
+
+- ``task``: forget everything but the system message; each step is a task.
+- ``window``: drop the oldest turns until the history fits ``max_tokens``.
+- ``summarize``: fold the older turns into one summary message once the
+  history exceeds ``max_tokens``, keeping the last ``keep_turns`` as is.
+- ``unbounded``: camel's behaviour, with metrics.
+
+A turn is a user message and every assistant and tool message after it, so
+tool calls are never separated from their results; the turn being started
+is never touched. ``memory_stats`` reports how large histories get per agent.
+"""
+
+import json
+import threading
+import weakref
+from dataclasses import dataclass
+
+from prompt_budget import estimate_tokens, truncate_to_tokens
+
+POLICY_MODES = ("task", "window", "summarize", "unbounded")
+DEFAULT_MAX_TOKENS = 16000
+
+SUMMARY_PROMPT = (
+    "You compress conversation histories. Summarize the conversation below in at most "
+    "{words} words for the assistant that took part in it. Keep facts, figures, sources, "
+    "decisions and open questions; drop pleasantries and repetition. Reply with the summary only."
+)
+
+
+@dataclass(frozen=True)
+class MemoryPolicy:
+    mode: str = "window"
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    keep_turns: int = 1
+
+    def __post_init__(self):
+        if self.mode not in POLICY_MODES:
+            raise ValueError(f"Unknown memory policy {self.mode!r}, expected one of {', '.join(POLICY_MODES)}")
+        if self.max_tokens < 1:
+            raise ValueError("Memory max_tokens must be positive")
+
+    @classmethod
+    def parse(cls, text):
+        """Policy from ``"task"``, ``"window:8000"``, ``"summarize:16000"`` or ``"unbounded"``."""
+        mode, _, tokens = text.strip().partition(":")
+        return cls(mode, int(tokens)) if tokens else cls(mode)
+
+    def __str__(self):
+        return self.mode if self.mode in ("task", "unbounded") else f"{self.mode}:{self.max_tokens}"
+
+
+DEFAULT_POLICY = MemoryPolicy()
+
+
+class MemoryMetrics:
+    """Per-agent memory counters, shared by every ``BoundedMemory`` of the process."""
+
+    FIELDS = ("turns", "resets", "trimmed_turns", "summaries", "summary_failures")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents = {}
+        self._live = {}
+
+    def register(self, name, memory):
+        with self._lock:
+            self._live.setdefault(name, weakref.WeakSet()).add(memory)
+
+    def record(self, name, tokens, **counts):
+        """Count one turn that started with ``tokens`` of history."""
+        with self._lock:
+            agent = self._agents.setdefault(
+                name, {**dict.fromkeys(self.FIELDS, 0), "tokens": 0, "peak_tokens": 0, "total_tokens": 0}
+            )
+            agent["turns"] += 1
+            for key, value in counts.items():
+                agent[key] += value
+            agent["tokens"] = tokens
+            agent["peak_tokens"] = max(agent["peak_tokens"], tokens)
+            agent["total_tokens"] += tokens
+
+    def stats(self):
+        """``{agent: counters}`` with the average history size and live instances."""
+        with self._lock:
+            return {
+                name: {
+                    **{k: v for k, v in agent.items() if k != "total_tokens"},
+                    "avg_tokens": round(agent["total_tokens"] / agent["turns"]),
+                    "live": len(self._live.get(name, ())),
+                }
+                for name, agent in self._agents.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._agents.clear()
+
+
+metrics = MemoryMetrics()
+
+
+def memory_stats():
+    return metrics.stats()
+
+
+def format_memory_stats(stats=None):
+    stats = memory_stats() if stats is None else stats
+    return "\n".join(
+        f"Memory {name}: {s['turns']} turns, {s['avg_tokens']} avg / {s['peak_tokens']} peak tokens, "
+        f"{s['resets']} resets, {s['trimmed_turns']} turns trimmed, {s['summaries']} summaries"
+        for name, s in sorted(stats.items())
+    )
+
+
+def record_tokens(record):
+    return estimate_tokens(json.dumps(record.to_openai_message(), default=str))
+
+
+def summarize_with(model, text, max_tokens):
+    """Summary of ``text`` in about ``max_tokens`` from one call to model backend ``model``."""
+    response = model.run([
+        {"role": "system", "content": SUMMARY_PROMPT.format(words=max(50, max_tokens * 3 // 4))},
+        {"role": "user", "content": text},
+    ])
+    return truncate_to_tokens(response.choices[0].message.content or "", max_tokens)
+
+
+def build_memory(policy, name, model, summarize=None):
+    """``BoundedMemory`` for agent ``name`` on model backend ``model``.
+
+    ``summarize(text, max_tokens)`` is needed for the ``summarize`` mode;
+    without it that mode falls back to ``window``.
+    """
+    from camel.memories import ChatHistoryMemory, MemoryRecord
+    from camel.memories.context_creators.score_based import ScoreBasedContextCreator
+    from camel.messages.base import BaseMessage
+    from camel.types import OpenAIBackendRole
+
+    class BoundedMemory(ChatHistoryMemory):
+        def __init__(self):
+            super().__init__(ScoreBasedContextCreator(model.token_counter, model.token_limit))
+            self.policy = policy
+            self.name = name
+            metrics.register(name, self)
+
+        def write_records(self, records):
+            if records and records[0].role_at_backend == OpenAIBackendRole.USER:
+                self._start_turn()
+            super().write_records(records)
+
+        def _load(self):
+            return [MemoryRecord.from_dict(d) for d in self._chat_history_block.storage.load()]
+
+        def _store(self, records):
+            self.clear()
+            super().write_records(records)
+
+        def _start_turn(self):
+            records = self._load()
+            head = [r for r in records[:1] if r.role_at_backend == OpenAIBackendRole.SYSTEM]
+            preamble, turns = [], []
+            for record in records[len(head):]:
+                if record.role_at_backend == OpenAIBackendRole.USER:
+                    turns.append([record])
+                elif turns:
+                    turns[-1].append(record)
+                else:
+                    preamble.append(record)
+            counts = {}
+            if turns and policy.mode == "task":
+                preamble, turns = [], []
+                counts["resets"] = 1
+            elif policy.mode in ("window", "summarize"):
+                preamble, turns, counts = self._bound(head, preamble, turns)
+            kept = head + preamble + [r for turn in turns for r in turn]
+            if [r.uuid for r in kept] != [r.uuid for r in records]:
+                self._store(kept)
+            tokens = sum(record_tokens(r) for r in kept)
+            metrics.record(name, tokens, **counts)
+            from tracing import annotate
+
+            annotate(memory_tokens=tokens, memory_records=len(kept))
+
+        def _bound(self, head, preamble, turns):
+            sizes = [sum(record_tokens(r) for r in turn) for turn in turns]
+            total = sum(record_tokens(r) for r in head + preamble) + sum(sizes)
+            if total <= policy.max_tokens:
+                return preamble, turns, {}
+            if policy.mode == "summarize" and summarize is not None and len(turns) > policy.keep_turns:
+                cut = len(turns) - policy.keep_turns
+                text = "\n\n".join(
+                    f"{r.role_at_backend.value}: {r.message.content}"
+                    for r in preamble + [r for turn in turns[:cut] for r in turn]
+                )
+                try:
+                    summary = summarize(text, policy.max_tokens // 4)
+                except Exception as e:
+                    print(f"Could not summarize the memory of {name}: {e}")
+                    return self._trim(preamble, turns, sizes, total, {"summary_failures": 1})
+                record = MemoryRecord(
+                    message=BaseMessage.make_assistant_message(
+                        role_name=name, content=f"Summary of the earlier conversation:\n{summary}"
+                    ),
+                    role_at_backend=OpenAIBackendRole.ASSISTANT,
+                    extra_info={"memory_summary": "true"},
+                )
+                turns = turns[cut:]
+                total = sum(record_tokens(r) for r in head + [record]) + sum(sizes[cut:])
+                counts = {"summaries": 1, "trimmed_turns": cut}
+                # A recent turn may still be too large on its own
+                return self._trim([record], turns, sizes[cut:], total, counts)
+            return self._trim(preamble, turns, sizes, total, {})
+
+        def _trim(self, preamble, turns, sizes, total, counts):
+            dropped = 0
+            while total > policy.max_tokens and dropped < len(turns):
+                total -= sizes[dropped]
+                dropped += 1
+            if total > policy.max_tokens:
+                preamble = []
+            counts["trimmed_turns"] = counts.get("trimmed_turns", 0) + dropped
+            return preamble, turns[dropped:], counts
+
+    return BoundedMemory()
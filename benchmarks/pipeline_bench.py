@@ -0,0 +1,216 @@
+"""Offline throughput benchmark for both research pipelines.
+
+Runs ``deep_reseach_team.py``'s staged pipeline and ``socrates.py``'s
+stages against ``fake_backends`` (no network, no API keys) at several
+concurrency levels and reports end-to-end latency percentiles, throughput,
+failures, and per stage how much time the framework adds on top of the
+fake model and search latency.
+
+    python benchmarks/pipeline_bench.py --runs 20 --concurrency 1,4,8
+    python benchmarks/pipeline_bench.py --model-latency 0.2 --failure-rate 0.05 --json bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import agent_factory  # noqa: E402
+import fake_backends  # noqa: E402
+from tracing import Tracer  # noqa: E402
+
+PIPELINES = ("deep", "socrates")
+
+
+def percentile(values, pct):
+    """Linearly interpolated percentile of ``values`` (0 <= pct <= 100)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def install_fakes(args):
+    """Route every model and search call of both scripts to the fake backends."""
+    fake_backends.install_fakes(
+        model_latency=args.model_latency,
+        tokens_per_second=args.tokens_per_second,
+        reply_words=args.reply_words,
+        search_latency=args.search_latency,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+
+
+async def run_deep(run_id, traces_dir, args):
+    import deep_reseach_team
+    from research_pipeline import run_pipeline
+
+    tracer = Tracer(run_id, traces_dir)
+    specs = deep_reseach_team.agent_specs_for(deep_reseach_team.DEFAULT_RECIPE, deep_reseach_team.content)
+    factory = agent_factory.AgentFactory(specs, tracer=tracer)
+    # Fake search hits point at example.com; fetching them would need the network
+    await run_pipeline(
+        factory, deep_reseach_team.content, args.topic_concurrency, fetch_pages=0, pipelined=args.pipelined
+    )
+    return tracer
+
+
+async def run_socrates(run_id, traces_dir, args):
+    import socrates
+
+    tracer = Tracer(run_id, traces_dir)
+    agents = socrates.build_agents(tracer=tracer)
+    await asyncio.to_thread(socrates.run_query, "Benchmark query about fake backends", agents)
+    return tracer
+
+
+RUNNERS = {"deep": run_deep, "socrates": run_socrates}
+
+
+async def run_level(pipeline, concurrency, traces_dir, args):
+    """Run ``args.runs`` pipelines with at most ``concurrency`` in flight."""
+    loop = asyncio.get_running_loop()
+    # Every run blocks a few worker threads; the default pool would cap concurrency
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 8 + 4))
+    semaphore = asyncio.Semaphore(concurrency)
+    runner = RUNNERS[pipeline]
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                tracer = await runner(f"{pipeline}-c{concurrency}-{i}", traces_dir, args)
+            except Exception as e:
+                return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            return {"ok": True, "latency_s": time.perf_counter() - started, "tracer": tracer}
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.runs)))
+    return results, time.perf_counter() - started
+
+
+def stage_overhead(tracers):
+    """Per stage: median wall time and framework time per agent step.
+
+    Framework time is a step's wall time minus the model calls and tool
+    calls made inside it, i.e. what ChatAgent and our wrappers add.
+    """
+    stages = {}
+    for tracer in tracers:
+        for span in tracer.spans:
+            stage = stages.setdefault(span["stage"] or span["agent"] or "-", {
+                "wall": [], "steps": 0, "step_s": 0.0, "inner_s": 0.0,
+            })
+            if span["kind"] == "stage":
+                stage["wall"].append(span["duration_s"])
+            elif span["kind"] == "agent_step":
+                stage["steps"] += 1
+                stage["step_s"] += span["duration_s"]
+            elif span["kind"] == "model" or (span["kind"] == "tool" and span["agent"]):
+                stage["inner_s"] += span["duration_s"]
+    return {
+        name: {
+            "wall_p50_ms": round(percentile(s["wall"], 50) * 1000, 2),
+            "steps": s["steps"],
+            "framework_ms_per_step": round(
+                (s["step_s"] - s["inner_s"]) / s["steps"] * 1000, 2
+            ) if s["steps"] else 0.0,
+        }
+        for name, s in stages.items()
+    }
+
+
+def summarize(results, elapsed):
+    ok = [r for r in results if r["ok"]]
+    latencies = [r["latency_s"] for r in ok]
+    return {
+        "runs": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p90_s": round(percentile(latencies, 90), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "errors": sorted({r["error"] for r in results if not r["ok"]})[:5],
+        "stages": stage_overhead([r["tracer"] for r in ok]),
+    }
+
+
+def print_report(pipeline, report):
+    print(f"\n{pipeline}")
+    print(f"{'concurrency':>11} {'ok':>5} {'failed':>6} {'p50_s':>8} {'p90_s':>8} {'p99_s':>8} {'runs/s':>8}")
+    for concurrency, row in report.items():
+        print(
+            f"{concurrency:>11} {row['ok']:>5} {row['failed']:>6} {row['p50_s']:>8.3f} "
+            f"{row['p90_s']:>8.3f} {row['p99_s']:>8.3f} {row['throughput_rps']:>8.2f}"
+        )
+    # Stage overhead from the lowest concurrency level, where contention is least
+    first = next(iter(report.values()))
+    print(f"\n  {'stage':<22} {'wall_p50_ms':>12} {'steps':>6} {'framework_ms/step':>18}")
+    for stage, row in first["stages"].items():
+        print(
+            f"  {stage:<22} {row['wall_p50_ms']:>12.1f} {row['steps']:>6} "
+            f"{row['framework_ms_per_step']:>18.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipeline", choices=PIPELINES + ("both",), default="both")
+    parser.add_argument("--runs", type=int, default=10, help="Pipeline runs per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,8",
+                        help="Comma-separated concurrency levels (default: 1,4,8)")
+    parser.add_argument("--topic-concurrency", type=int, default=4,
+                        help="Search topics researched at once within a deep run")
+    parser.add_argument("--model-latency", type=float, default=0.05,
+                        help="Fake model seconds to first token (default: 0.05)")
+    parser.add_argument("--tokens-per-second", type=float, default=None,
+                        help="Fake model output rate; unlimited by default")
+    parser.add_argument("--reply-words", type=int, default=200,
+                        help="Words per fake report/research reply (default: 200)")
+    parser.add_argument("--search-latency", type=float, default=0.05,
+                        help="Fake search seconds per call (default: 0.05)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Probability that a model or search call fails")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pipelined", action="store_true",
+                        help="Overlap research and report drafting in the deep pipeline")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+    pipelines = PIPELINES if args.pipeline == "both" else (args.pipeline,)
+
+    # Tool-schema warnings and per-call error logs would drown the tables;
+    # failures are counted per run instead
+    logging.getLogger("camel").setLevel(logging.CRITICAL)
+    warnings.filterwarnings("ignore", module="camel")
+    install_fakes(args)
+    report = {}
+    with tempfile.TemporaryDirectory() as traces_dir:
+        for pipeline in pipelines:
+            report[pipeline] = {}
+            for concurrency in levels:
+                results, elapsed = asyncio.run(run_level(pipeline, concurrency, traces_dir, args))
+                report[pipeline][concurrency] = summarize(results, elapsed)
+            print_report(pipeline, report[pipeline])
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
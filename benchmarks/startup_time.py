@@ -0,0 +1,62 @@
+"""Cold-start benchmark for the research entry points.
+
+Runs each script with ``--help`` in a fresh interpreter and compares it with
+importing the camel modules the scripts used to load at import time, which
+is the minimum the old eager startup paid before it could do anything.
+
+    python benchmarks/startup_time.py --runs 10
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+EAGER_IMPORTS = (
+    "from camel.agents.chat_agent import ChatAgent; "
+    "from camel.configs.openai_config import ChatGPTConfig; "
+    "from camel.messages.base import BaseMessage; "
+    "from camel.models import ModelFactory; "
+    "from camel.tasks.task import Task; "
+    "from camel.toolkits import SearchToolkit; "
+    "from camel.types import ModelPlatformType, ModelType; "
+    "from camel.societies.workforce import Workforce"
+)
+
+CASES = {
+    "socrates.py --help": [sys.executable, "socrates.py", "--help"],
+    "deep_reseach_team.py --help": [sys.executable, "deep_reseach_team.py", "--help"],
+    "eager camel imports (old startup floor)": [sys.executable, "-c", EAGER_IMPORTS],
+}
+
+
+def time_command(cmd, runs):
+    """Return wall-clock seconds for ``runs`` cold executions of ``cmd``."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(cmd, cwd=REPO_ROOT, check=True, capture_output=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the entry points")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per case (default: 5)")
+    args = parser.parse_args()
+
+    print(f"{'case':<42} {'median':>9} {'min':>9} {'max':>9}")
+    for name, cmd in CASES.items():
+        timings = time_command(cmd, args.runs)
+        print(
+            f"{name:<42} {statistics.median(timings) * 1000:>7.0f}ms "
+            f"{min(timings) * 1000:>7.0f}ms {max(timings) * 1000:>7.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
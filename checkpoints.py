@@ -0,0 +1,106 @@
+"""Per-stage checkpoints so a failed run can resume where it stopped.
+
+Each run gets a directory ``.runs/<run_id>/`` holding ``run.json`` (the
+run's inputs) and one ``<stage>.json`` per completed stage. Files are
+written atomically, so a crash mid-write never leaves a stage looking done.
+"""
+
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_RUNS_DIR = ".runs"
+
+
+def new_run_id():
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def _write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class RunCheckpoint:
+    """Stage outputs of one run, stored under ``root/run_id``."""
+
+    def __init__(self, run_id=None, root=DEFAULT_RUNS_DIR):
+        self.run_id = run_id or new_run_id()
+        self.dir = Path(root) / self.run_id
+
+    @classmethod
+    def resume(cls, run_id, root=DEFAULT_RUNS_DIR):
+        """Open an existing run; raises ``FileNotFoundError`` if it was never started."""
+        checkpoint = cls(run_id, root)
+        if not (checkpoint.dir / "run.json").exists():
+            raise FileNotFoundError(f"No run {run_id!r} in {root}")
+        return checkpoint
+
+    def save_inputs(self, **inputs):
+        """Record the run's inputs, discarding stages saved for different ones.
+
+        Run IDs are derived from names (``<batch file>-<query id>``), so an
+        ID can come back with another query; its stages must not be reused.
+        """
+        inputs = json.loads(json.dumps(inputs))
+        if (self.dir / "run.json").exists() and self.load_inputs() != inputs:
+            stale = self.reset()
+            if stale:
+                print(f"[{self.run_id}] inputs changed, discarding checkpoints: {', '.join(stale)}")
+        _write_json(self.dir / "run.json", inputs)
+
+    def reset(self):
+        """Delete every saved stage; returns their names."""
+        stages = sorted(path.stem for path in self.dir.glob("*.json") if path.name != "run.json")
+        for stage in stages:
+            os.remove(self.dir / f"{stage}.json")
+        return stages
+
+    def load_inputs(self):
+        with open(self.dir / "run.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    def completed(self, stage):
+        return (self.dir / f"{stage}.json").exists()
+
+    def load(self, stage):
+        with open(self.dir / f"{stage}.json", encoding="utf-8") as f:
+            return json.load(f)["output"]
+
+    def save(self, stage, output):
+        _write_json(self.dir / f"{stage}.json", {
+            "stage": stage,
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+            "output": output,
+        })
+
+
+def run_stage(checkpoint, stage, fn, *args):
+    """Return ``stage``'s saved output, or run ``fn(*args)`` and save it.
+
+    ``checkpoint`` may be ``None`` to run without persistence.
+    """
+    if checkpoint is not None and checkpoint.completed(stage):
+        print(f"[{checkpoint.run_id}] {stage}: reusing checkpoint")
+        return checkpoint.load(stage)
+    output = fn(*args)
+    if checkpoint is not None:
+        checkpoint.save(stage, output)
+    return output
+
+
+async def run_stage_async(checkpoint, stage, fn, *args):
+    """``run_stage`` for a coroutine function ``fn``."""
+    if checkpoint is not None and checkpoint.completed(stage):
+        print(f"[{checkpoint.run_id}] {stage}: reusing checkpoint")
+        return checkpoint.load(stage)
+    output = await fn(*args)
+    if checkpoint is not None:
+        checkpoint.save(stage, output)
+    return output
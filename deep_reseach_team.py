@@ -1,105 +1,48 @@
-"""Import Dependencies & Set up AsyncIO"""
-
-from camel.agents.chat_agent import ChatAgent
-from camel.configs.openai_config import ChatGPTConfig
-from camel.messages.base import BaseMessage
-from camel.models import ModelFactory
-from camel.tasks.task import Task
-from camel.toolkits import SearchToolkit
-from camel.types import ModelPlatformType, ModelType
-from camel.societies.workforce import Workforce
-
-import nest_asyncio
-nest_asyncio.apply()
-
-import os
-from getpass import getpass
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Verify API keys are loaded
-if not os.getenv("OPENAI_API_KEY") or not os.getenv("ANTHROPIC_API_KEY"):
-    raise ValueError("Please set OPENAI_API_KEY and ANTHROPIC_API_KEY in your .env file")
-
-# After load_dotenv()
-if not os.getenv("GOOGLE_API_KEY") or not os.getenv("SEARCH_ENGINE_ID"):
-    raise ValueError("Please set GOOGLE_API_KEY and SEARCH_ENGINE_ID in your .env file")
-
-"""## Import Dependencies & Set up AsnycIO"""
-
-from camel.agents.chat_agent import ChatAgent
-from camel.configs.openai_config import ChatGPTConfig
-from camel.messages.base import BaseMessage
-from camel.models import ModelFactory
-from camel.tasks.task import Task
-from camel.configs import DeepSeekConfig
-from camel.toolkits import (
-    SearchToolkit,
+"""Import Dependencies
+
+camel is imported lazily (see agent_factory.py) so ``--help`` and argument
+errors return immediately.
+"""
+
+import asyncio
+import argparse
+from dataclasses import replace
+
+from agent_factory import (
+    AgentFactory,
+    AgentSpec,
+    add_backend_arguments,
+    print_cache_stats,
+    set_memory_policy,
+    setup_backends,
+    workforce_kwargs,
 )
-from camel.types import ModelPlatformType, ModelType
-from camel.societies.workforce import Workforce
-
-import nest_asyncio
-nest_asyncio.apply()
+from checkpoints import RunCheckpoint, new_run_id
+from prompt_budget import Block, compose, fit_content
+from recipes import get_recipe_registry
+from research_pipeline import run_pipeline
 
 
 content = """feat: Add support for Qwen model platform (#1033)#1137 Merged Wendong-Fan merged 3 commits into master from qwen Nov 1, 2024 Merged feat: Add support for Qwen model platform (#1033)#1137 Wendong-Fan merged 3 commits into master from qwen Nov 1, 2024 +403 −2 Conversation This file contains bidirectional Unicode text that may be interpreted or compiled differently than what appears below MuggleJinx commented Oct 31, 2024 Description This PR adds support for the Qwen LLM models including qwen-max qwen-plus qwen-turbo qwen-long The addition of Qwen-series models enhances the platform's capabilities providing support for a broader range of language models and enabling users to leverage different performance tiers Motivation and Context Closes issue #1033 Types of changes New feature (non-breaking change which adds core functionality) Implemented Tasks Implement consistent interface for Qwen-series model Add the corresponding example and test file Checklist I have read the CONTRIBUTION guide I have updated the tests accordingly I have updated the documentation accordingly MuggleJinx implemet qwen model cf3e9a0 MuggleJinx requested a review from Wendong-Fan October 31 2024 05:40 Wendong-Fan linked an issue Oct 31 2024 that may be closed by this pull request [Feature Request] Integrate Qwen model platform #1033 Closed Wendong-Fan added this to the Sprint 15 milestone Oct 31 2024 Wendong-Fan added the Model Related to backend models label Oct 31 2024 Wendong-Fan assigned MuggleJinx Oct 31 2024 Wendong-Fan update based on comment"""
-needs_research = "needs_research is true, this content needs to be researched for additional context about Qwen models and their integration"
-
-ingredients = """
-
-Required Information:
-
-1. Project Contributors
-   - Who created or contributed to this PR, with their Github handle
-   - Who reviewed and approved the PR
-
-2. Technologies
-   - What is the name and purpose of the main framework/platform this PR is adding to, e.g. Can you spell check this? Do you know exactly how they describe themselves
-   - What are the names and purposes of the technologies being integrated e.g. do you knowthe key benefits of the integration
-
-3. Integration Purpose
-   - What new capabilities does this integration add to the main framework
-   - How do the technologies interact with the main framework
-   - Who is this integration designed for
-
-4. Documentation Access
-   - Link to PR and related issue
-   - Where to find usage examples"""
-
+# Output format and required ingredients, from recipes/<recipe_id>.json
+DEFAULT_RECIPE = "pr-integration-post"
 
-recipe = """Objective: Generate concise, engaging, and technical social media posts promoting AI tools, cookbooks, or integrations. The tone should be action-oriented and clear.
+# Token budgets (estimated) for the content and the evidence each agent receives
+CONTENT_BUDGET = 12000
+SEARCH_RESULTS_BUDGET = 2000
+REPORT_INPUT_BUDGET = 8000
 
-Key features:
-Catchy, action-oriented headline: [Begin with an exciting statement to grab attention, showcasing the feature or outcome.]
-Overview of benefits: [Explain what users will achieve or learn, focusing on the key value proposition.]
-Details of tools/technologies: [Mention tools or components without handles, but include emojis for emphasis.]
-Call-to-action: [Provide a link to the relevant resource and invite the audience to explore further.]
+"""# Worker Agent Prompts"""
 
-Make sure you follow the examples given """
-
-
-print(content)
-
-"""# Create Worker Agents"""
-
-search_toolkit = SearchToolkit()
-search_tools = [
-    #search_toolkit.search_linkup  # Switch to LinkUp search
-    search_toolkit.search_google  # Switch to Google search
-]
+# System prompts open with the recipe's static blocks and end with per-run
+# content, so the provider's prefix cache can reuse everything before it
 
 # Content Research Planner Agent (TogetherAI)
-content_classifier_agent = ChatAgent(
-    system_message=BaseMessage.make_assistant_message(
-        role_name="Content Research Planner Agent",
-        content=f"""You are a Research Planning Agent that analyzes content against a required ingredients list.
+content_classifier_instructions = """You are a Research Planning Agent that analyzes content against the required ingredients list above.
 
         INPUT FORMAT:
         1. Content: [Original content to analyze]
-        2. Ingredients: [List of required information]
+        2. Ingredients: [The Required Ingredients List above]
 
         YOUR TASK:
         Analyze the content and create a detailed research plan by:
@@ -107,9 +50,6 @@ content_classifier_agent = ChatAgent(
         2. Comparing against each ingredient in the ingredients list
         3. Categorizing each piece of required information
 
-        Required Ingredients List:
-        {ingredients}
-
         CATEGORIZATION SYSTEM:
         For each ingredient, provide:
         1. Status (one of):
@@ -126,60 +66,39 @@ content_classifier_agent = ChatAgent(
 
         OUTPUT FORMAT:
         Provide your analysis in this structure:
-        {{
+        {
             "ingredient_analysis": [
-                {{
+                {
                     "ingredient": "[Name of ingredient]",
                     "status": "[KNOWN/NEEDS_SEARCH/UNSEARCHABLE/REQUIRES_INPUT]",
                     "evidence": "[Supporting evidence or explanation]",
                     "action_needed": "[What needs to be done for this ingredient]"
-                }}
+                }
             ],
-            "research_plan": {{
+            "research_plan": {
                 "known_information": ["List of what we already have"],
                 "search_topics": ["List of what needs research"],
                 "required_inputs": ["List of what needs direct input"]
-            }}
-        }}"""
-    ),
-    model=ModelFactory.create(
-        model_platform=ModelPlatformType.OPENAI,
-        model_type=ModelType.O3_MINI,
-        model_config_dict=ChatGPTConfig().as_dict()
-    ),
-)
+            }
+        }"""
 
 # Research Agent (OpenAI)
-research_agent = ChatAgent(
-    system_message=BaseMessage.make_assistant_message(
-        role_name="Research Agent",
-        content="""From the topics listed by the research planner agent as NEEDS_SEARCH, conduct additional research using LinkUp search.
+research_agent_prompt = """From the topics listed by the research planner agent as NEEDS_SEARCH, conduct additional research using LinkUp search.
         
         When searching:
         - Use depth="deep" for comprehensive results
         - Use output_type="sourcedAnswer" for direct answers
         - Verify information across multiple sources
         """
-    ),
-    model=ModelFactory.create(
-        model_platform=ModelPlatformType.OPENAI,
-        model_type=ModelType.GPT_4O,
-        model_config_dict=ChatGPTConfig().as_dict()
-    ),
-    tools=search_tools,
-)
 
 # Report Creator Agent 
-report_creator_agent = ChatAgent(
-    system_message=BaseMessage.make_assistant_message(
-        role_name="Report Creator Agent",
-        content=f"""You are a Report Creator Agent that synthesizes information into a cohesive report.
+report_creator_instructions = """You are a Report Creator Agent that synthesizes information into a cohesive report.
 
         INPUT PROVIDED:
-        1. Original Content: {content}
-        2. Recipe Format: {recipe}
+        1. Original Content
+        2. Recipe Format (above)
         3. Research Results (if any)
-        4. Required Ingredients List: {ingredients}
+        4. Required Ingredients List (above)
 
         YOUR TASK:
         Create a comprehensive report that:
@@ -218,24 +137,14 @@ report_creator_agent = ChatAgent(
 
         OUTPUT FORMAT:
         Provide your report in markdown format with clear sections and subsections."""
-    ),
-    model=ModelFactory.create(
-        model_platform=ModelPlatformType.OPENAI,
-        model_type=ModelType.GPT_4O,
-        model_config_dict=ChatGPTConfig().as_dict()
-    )
-)
 
 # Judge Agent (OpenAI)
-judge_agent = ChatAgent(
-    system_message=BaseMessage.make_assistant_message(
-        role_name="Report Quality Judge Agent",
-        content=f"""You are a Judge Agent that evaluates reports against required criteria and ingredients.
+judge_instructions = """You are a Judge Agent that evaluates reports against required criteria and ingredients.
 
         INPUT PROVIDED:
         1. Report Content
-        2. Required Ingredients List: {ingredients}
-        3. Recipe Format: {recipe}
+        2. Required Ingredients List (above)
+        3. Recipe Format (above)
 
         YOUR TASK:
         Evaluate the report thoroughly by:
@@ -262,62 +171,116 @@ judge_agent = ChatAgent(
 
         OUTPUT FORMAT:
         Provide your evaluation in this structure:
-        {{
+        {
             "overall_assessment": "PASS/NEEDS_REVISION",
             "score": "X/10",
-            "criteria_evaluation": {{
-                "completeness": {{
+            "criteria_evaluation": {
+                "completeness": {
                     "score": "X/10",
                     "findings": ["List of findings"],
                     "missing_elements": ["List of gaps"]
-                }},
-                "format_adherence": {{
+                },
+                "format_adherence": {
                     "score": "X/10",
                     "findings": ["List of findings"],
                     "suggestions": ["List of improvements"]
-                }},
-                "information_quality": {{
+                },
+                "information_quality": {
                     "score": "X/10",
                     "strengths": ["List of strengths"],
                     "weaknesses": ["List of weaknesses"]
-                }}
-            }},
+                }
+            },
             "recommendations": ["List of specific recommendations"]
-        }}"""
-    ),
-    model=ModelFactory.create(
-        model_platform=ModelPlatformType.OPENAI,
-        model_type=ModelType.O3_MINI,
-        model_config_dict=ChatGPTConfig().as_dict()
-    ),
-)
+        }"""
+
+"""# Create Worker Agents"""
+
+def build_agent_specs(recipe):
+    """Agent specs for ``recipe``, compiled once per recipe by the registry.
+
+    The report creator's prompt stops before the per-run content; see
+    ``agent_specs_for``.
+    """
+    return {
+        "content_classifier_agent": AgentSpec(
+            role_name="Content Research Planner Agent",
+            system_prompt=compose(*recipe.ingredient_blocks, content_classifier_instructions),
+            model_type="O3_MINI",
+            input_budget=CONTENT_BUDGET
+        ),
+        "research_agent": AgentSpec(
+            role_name="Research Agent",
+            system_prompt=research_agent_prompt,
+            model_type="GPT_4O",
+            use_search=True,
+            input_budget=SEARCH_RESULTS_BUDGET
+        ),
+        "report_creator_agent": AgentSpec(
+            role_name="Report Creator Agent",
+            system_prompt=compose(*recipe.blocks, report_creator_instructions),
+            model_type="GPT_4O",
+            input_budget=REPORT_INPUT_BUDGET
+        ),
+        "judge_agent": AgentSpec(
+            role_name="Report Quality Judge Agent",
+            system_prompt=compose(*recipe.blocks, judge_instructions),
+            model_type="O3_MINI",
+            input_budget=REPORT_INPUT_BUDGET
+        ),
+    }
+
+def agent_specs_for(recipe_id, run_content, workforce=False):
+    """Agent specs for one run of ``run_content`` under recipe ``recipe_id``.
+
+    The staged pipeline's report creator gets the content as the last block
+    of its system prompt. The Workforce hands the content to workers as the
+    task's additional_info, so its report creator does not carry a second copy.
+    """
+    specs = get_recipe_registry().compile(recipe_id, build_agent_specs)
+    if workforce:
+        return specs
+    report_creator = specs["report_creator_agent"]
+    return {
+        **specs,
+        "report_creator_agent": replace(
+            report_creator,
+            system_prompt=compose(
+                report_creator.system_prompt,
+                Block("Original Content", fit_content(run_content, CONTENT_BUDGET)),
+            ),
+        ),
+    }
 
 """## Create Workforce & Add Agents"""
 
-# Create and configure workforce with all agents
-workforce = Workforce('Content Analysis and PR Tweet Writing Group')
-
-# Add all agents to the workforce in processing order
-workforce.add_single_agent_worker(
-    "CContent Research Planner Agent, an agent that plans reseach",
-    worker=content_classifier_agent
-).add_single_agent_worker(
-    "Research Agent, an agent that verifies facts and gathers context based on content type",
-    worker=research_agent
-).add_single_agent_worker(
-    "Report Creator, an agent that synthesizes analysis aligned with content goals",
-    worker=report_creator_agent
-).add_single_agent_worker(
-    "Report Quality Judge, an agent that evaluates report quality and completeness",
-    worker=judge_agent
-)
+def build_workforce(agents):
+    """Create and configure the workforce with all agents."""
+    from camel.societies.workforce import Workforce
+
+    workforce = Workforce(
+        'Content Analysis and PR Tweet Writing Group', **workforce_kwargs(agents.tracer)
+    )
+
+    # Add all agents to the workforce in processing order
+    workforce.add_single_agent_worker(
+        "CContent Research Planner Agent, an agent that plans reseach",
+        worker=agents["content_classifier_agent"]
+    ).add_single_agent_worker(
+        "Research Agent, an agent that verifies facts and gathers context based on content type",
+        worker=agents["research_agent"]
+    ).add_single_agent_worker(
+        "Report Creator, an agent that synthesizes analysis aligned with content goals",
+        worker=agents["report_creator_agent"]
+    ).add_single_agent_worker(
+        "Report Quality Judge, an agent that evaluates report quality and completeness",
+        worker=agents["judge_agent"]
+    )
+    return workforce
 
 """## Create Task & Assign to Workforce"""
 
-# specify the task to be solved
-human_task = Task(
-    content=(
-"""Your goal is to create a clear report on the provided content. Follow these steps:
+task_prompt = """Your goal is to create a clear report on the provided content. Follow these steps:
 
 1. First analyze the content to identify research needs. Focus on:
    - Technical details of Qwen LLM models
@@ -334,13 +297,143 @@ human_task = Task(
 3. Finally, create a comprehensive report synthesizing all findings
 
 Use the content research planner agent first, then the research agent, and finally the report creator agent."""
-    ),
-    additional_info=content,
-    id='0',
-)
 
-task = workforce.process_task(human_task)
+def run_workforce(agents):
+    """Let the camel Workforce route the task between the agents."""
+    from camel.tasks.task import Task
+
+    workforce = build_workforce(agents)
 
-"""## Get the result of the Task"""
+    # specify the task to be solved
+    human_task = Task(
+        content=task_prompt,
+        additional_info=fit_content(content, CONTENT_BUDGET),
+        id='0',
+    )
 
-print('Final Result of Original task:\n', task.result)
\ No newline at end of file
+    task = workforce.process_task(human_task)
+    return task.result
+
+def main():
+    parser = argparse.ArgumentParser(description='Content analysis and PR write-up research team')
+    parser.add_argument('--workforce', action='store_true',
+                        help='Let a camel Workforce route the task instead of the staged pipeline')
+    parser.add_argument('--run-id', type=str,
+                        help='Name for this run\'s stage checkpoints (default: timestamp)')
+    parser.add_argument('--resume', type=str, metavar='RUN_ID',
+                        help='Resume a failed run from its first incomplete stage')
+    parser.add_argument('--no-stream', action='store_true',
+                        help='Print the report only once the run has finished')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Maximum number of search topics researched at once (default: 4)')
+    parser.add_argument('--fetch-pages', type=int, default=3,
+                        help='Top search results per topic downloaded as evidence; 0 uses snippets only (default: 3)')
+    parser.add_argument('--metrics-file', type=str, metavar='PATH',
+                        help='Write per-stage metrics in Prometheus text format')
+    parser.add_argument('--routing', choices=['auto', 'fixed'], default='auto',
+                        help='Pick cheaper models for simple runs (auto) or always use each agent\'s '
+                             'configured model (fixed); staged pipeline only (default: auto)')
+    parser.add_argument('--router-config', type=str, metavar='PATH',
+                        help='JSON file overriding the routing thresholds and model tiers')
+    parser.add_argument('--max-revisions', type=int, default=2,
+                        help='Rounds of judge-driven section revisions; 0 disables them (default: 2)')
+    parser.add_argument('--min-score', type=float, default=8.0,
+                        help='Judge score out of 10 that ends revising early, like a PASS (default: 8)')
+    add_backend_arguments(parser)
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Draft the report from what the content already covers while research '
+                             'runs, folding findings in as each topic completes')
+    parser.add_argument('--recipe', type=str, metavar='RECIPE_ID',
+                        help=f'Recipe from recipes/<RECIPE_ID>.json (default: {DEFAULT_RECIPE}, '
+                             'or the resumed run\'s recipe)')
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.max_revisions < 0:
+        parser.error("--max-revisions must not be negative")
+    if args.workforce and (args.resume or args.run_id):
+        parser.error("--workforce runs are not checkpointed; drop --resume/--run-id")
+    try:
+        set_memory_policy(args.memory)
+    except ValueError as e:
+        parser.error(f"--memory: {e}")
+    if args.recipe or not args.resume:
+        # A resumed run uses the recipe it recorded
+        try:
+            get_recipe_registry().get(args.recipe or DEFAULT_RECIPE)
+        except (KeyError, ValueError) as e:
+            parser.error(f"--recipe: {e}")
+
+    # Load environment variables and verify API keys
+    import nest_asyncio
+    from tracing import Tracer
+
+    setup_backends(args.llm_cache, keys=(
+        ("OPENAI_API_KEY", "ANTHROPIC_API_KEY"),
+        ("GOOGLE_API_KEY", "SEARCH_ENGINE_ID"),
+    ))
+    nest_asyncio.apply()
+
+    print(content)
+
+    stream_to = None
+    if not args.no_stream and not args.workforce:
+        from streaming import print_token
+
+        # Report tokens are printed as they arrive
+        stream_to = {"report_creator_agent": print_token}
+    checkpoint = None
+    run_content, recipe_id = content, args.recipe or DEFAULT_RECIPE
+    if not args.workforce:
+        if args.resume:
+            checkpoint = RunCheckpoint.resume(args.resume)
+            inputs = checkpoint.load_inputs()
+            run_content = inputs["content"]
+            recipe_id = args.recipe or inputs.get("recipe_id", DEFAULT_RECIPE)
+            if recipe_id != inputs.get("recipe_id", DEFAULT_RECIPE):
+                # The saved stages were written for another recipe
+                checkpoint.save_inputs(**{**inputs, "recipe_id": recipe_id})
+        else:
+            checkpoint = RunCheckpoint(args.run_id)
+            checkpoint.save_inputs(content=content, recipe_id=recipe_id)
+        print(f"Run ID: {checkpoint.run_id}")
+    try:
+        recipe = get_recipe_registry().get(recipe_id)
+        specs = agent_specs_for(recipe_id, run_content, workforce=args.workforce)
+    except (KeyError, ValueError) as e:
+        parser.error(f"--recipe: {e}")
+    router = None
+    if args.routing == 'auto' and not args.workforce:
+        from model_router import ModelRouter, RouterConfig
+
+        router = ModelRouter(RouterConfig.from_file(args.router_config) if args.router_config else None)
+    tracer = Tracer(checkpoint.run_id if checkpoint is not None else new_run_id())
+    factory = AgentFactory(specs, stream_to=stream_to, tracer=tracer)
+    try:
+        if args.workforce:
+            result = run_workforce(factory)
+        else:
+            try:
+                outputs = asyncio.run(run_pipeline(
+                    factory, run_content, args.concurrency, checkpoint, args.fetch_pages, router,
+                    args.max_revisions, args.min_score, recipe.needs_research, args.pipelined,
+                ))
+            except Exception:
+                print(f"\nRun failed. Resume with: python deep_reseach_team.py --resume {checkpoint.run_id}")
+                raise
+            result = outputs["report"] + "\n\nJudge Evaluation:\n" + outputs["judgement"]
+    finally:
+        if router is not None and router.decisions:
+            print(f"\nModel routing:\n{router.format_decisions()}")
+        print(f"\n{tracer.format_summary()}")
+        print(f"Trace written to: {tracer.path}")
+        if args.metrics_file:
+            tracer.write_prometheus(args.metrics_file)
+
+    """## Get the result of the Task"""
+
+    print('Final Result of Original task:\n', result)
+    print_cache_stats()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Local stand-ins for the model and search backends, for running without API keys.
+
+``FakeModel`` answers through a ``responder(messages) -> str`` callable and
+streams its reply word by word when the config asks for ``stream``.
+``pipeline_responder`` plays every agent of both research scripts and
+``make_fake_search`` replaces ``search_google``; ``install_fakes`` wires
+them into ``agent_factory``. Latency and failure rate are configurable so
+benchmarks can model a slow or flaky provider.
+"""
+
+import json
+import random
+import re
+import time
+import uuid
+
+from camel.models import BaseModelBackend
+from camel.types import ChatCompletion, ChatCompletionChunk
+from camel.utils import BaseTokenCounter
+
+
+class FakeTokenCounter(BaseTokenCounter):
+    """Whitespace token counter; avoids downloading tiktoken encodings."""
+
+    def count_tokens_from_messages(self, messages):
+        return sum(len(str(message.get("content") or "").split()) for message in messages)
+
+
+class FakeBackendError(RuntimeError):
+    """Injected failure of a fake backend."""
+
+
+def echo_responder(messages):
+    return f"Fake reply to: {messages[-1].get('content')}"
+
+
+FAKE_PLAN = {
+    "ingredient_analysis": [
+        {"ingredient": "Project Contributors", "status": "KNOWN",
+         "evidence": "Named in the content", "action_needed": ""},
+        {"ingredient": "Technologies", "status": "NEEDS_SEARCH",
+         "evidence": "Model family mentioned", "action_needed": "search the model family"},
+        {"ingredient": "Documentation Access", "status": "NEEDS_SEARCH",
+         "evidence": "", "action_needed": "find usage documentation"},
+    ],
+    "research_plan": {
+        "known_information": ["Project Contributors"],
+        "search_topics": [
+            "model family overview",
+            "model family benchmark results",
+            "integration usage documentation",
+        ],
+        "required_inputs": [],
+    },
+}
+
+FAKE_JUDGEMENT = {"overall_assessment": "PASS", "score": "9/10", "feedback": []}
+
+# Sections of the deep_reseach_team report creator's REPORT STRUCTURE
+FAKE_REPORT_SECTIONS = ("Overview", "Technical Details", "Benefits and Results", "Additional Context")
+
+_PENDING = re.compile(r"\[pending:[^\]\n]*\]")
+
+
+def pipeline_responder(words=200):
+    """Responder answering like each agent of the research scripts.
+
+    Planners get ``FAKE_PLAN``, judges ``FAKE_JUDGEMENT`` and every other
+    agent ``words`` words of filler text. The report creator's filler is
+    split into ``FAKE_REPORT_SECTIONS``, and a request to revise one section
+    gets that section's share of the words. A draft written while research
+    runs spreads a pending marker per ingredient over the sections; a
+    revision keeps the markers its findings do not name.
+    """
+    filler = " ".join(f"word{i}" for i in range(words))
+    section_words = " ".join(f"word{i}" for i in range(words // len(FAKE_REPORT_SECTIONS)))
+
+    def respond(messages):
+        system = str(messages[0].get("content") or "")
+        if "Research Planning Agent" in system:
+            return "```json\n" + json.dumps(FAKE_PLAN) + "\n```"
+        if "Judge Agent" in system:
+            return json.dumps(FAKE_JUDGEMENT)
+        if "Report Creator Agent" in system:
+            request = str(messages[-1].get("content") or "")
+            if request.startswith("Revise one section"):
+                current, _, findings = request.split("Current section:\n", 1)[-1].partition(
+                    "\n\nReviewer findings"
+                )
+                named = {marker.casefold() for marker in _PENDING.findall(findings)}
+                kept = [
+                    marker for marker in dict.fromkeys(_PENDING.findall(current))
+                    if marker.casefold() not in named
+                ]
+                return " ".join([current.split("\n", 1)[0] + "\n" + section_words, *kept])
+            markers = [[] for _ in FAKE_REPORT_SECTIONS]
+            if "Research is still running" in request:
+                listed = request.split("Research is still running", 1)[1].split("\n\n", 1)[0]
+                for i, ingredient in enumerate(re.findall(r"^- ([^:\n]+):", listed, re.M)):
+                    markers[i % len(markers)].append(f"[pending: {ingredient}]")
+            return "\n\n".join(
+                " ".join([f"## {title}\n{section_words}", *marked])
+                for title, marked in zip(FAKE_REPORT_SECTIONS, markers)
+            )
+        return filler
+
+    return respond
+
+
+def make_fake_search(latency=0.0, failure_rate=0.0, num_results=5, seed=None):
+    """Return a ``search_google`` stand-in with fixed latency and random failures."""
+    rng = random.Random(seed)
+
+    def search_google(query: str, num_result_pages: int = 5) -> list:
+        r"""Use Google search engine to search information for the given query.
+
+        Args:
+            query (str): The query to be searched.
+            num_result_pages (int): The number of result pages to retrieve.
+
+        Returns:
+            List[Dict[str, Any]]: A list of dictionaries, one per result.
+        """
+        time.sleep(latency)
+        if rng.random() < failure_rate:
+            raise FakeBackendError(f"fake search failure for {query!r}")
+        slug = "-".join(query.lower().split())
+        return [
+            {
+                "result_id": i + 1,
+                "title": f"{query} ({i + 1})",
+                "description": f"Result {i + 1} about {query}.",
+                "url": f"https://example.com/{slug}/{i + 1}",
+            }
+            for i in range(min(num_results, num_result_pages))
+        ]
+
+    return search_google
+
+
+class FakeModel(BaseModelBackend):
+    """Model backend that needs no network.
+
+    Args:
+        responder: Callable turning the message list into the reply text.
+        first_token_latency: Seconds before the first token is produced.
+        tokens_per_second: Generation speed for the rest of the reply.
+        failure_rate: Probability that a call raises ``FakeBackendError``.
+        seed: Seed for the failure draws.
+    """
+
+    def __init__(self, responder=echo_responder, first_token_latency=0.0,
+                 tokens_per_second=None, model_type="gpt-4o-mini", model_config_dict=None,
+                 failure_rate=0.0, seed=None):
+        super().__init__(model_type, model_config_dict or {}, token_counter=FakeTokenCounter())
+        self.responder = responder
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    @property
+    def token_counter(self):
+        return self._token_counter
+
+    @property
+    def token_limit(self):
+        return 128000
+
+    def check_model_config(self):
+        pass
+
+    def _tokens(self, text):
+        # Keep the whitespace with each word so the joined stream equals text
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + [words[-1]]
+
+    def _usage(self, messages, text):
+        prompt_tokens = self.token_counter.count_tokens_from_messages(messages)
+        completion_tokens = len(text.split())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def run(self, messages):
+        if self._rng.random() < self.failure_rate:
+            time.sleep(self.first_token_latency)
+            raise FakeBackendError(f"fake {self.model_type} failure")
+        text = self.responder(messages)
+        response_id = f"fake-{uuid.uuid4().hex[:12]}"
+        if self.model_config_dict.get("stream"):
+            return self._stream(messages, text, response_id)
+        time.sleep(self.first_token_latency)
+        if self.tokens_per_second:
+            time.sleep(len(text.split()) / self.tokens_per_second)
+        return ChatCompletion.model_validate({
+            "id": response_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": str(self.model_type),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": self._usage(messages, text),
+        })
+
+    def _stream(self, messages, text, response_id):
+        time.sleep(self.first_token_latency)
+        created = int(time.time())
+        for token in self._tokens(text):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield ChatCompletionChunk.model_validate({
+                "id": response_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": str(self.model_type),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            })
+        yield ChatCompletionChunk.model_validate({
+            "id": response_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": str(self.model_type),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": self._usage(messages, text),
+        })
+
+
+def install_fakes(model_latency=0.0, tokens_per_second=None, reply_words=200,
+                  search_latency=0.0, failure_rate=0.0, seed=0):
+    """Route every model and search call of the research scripts to fake backends.
+
+    Each model gets its own failure seed, derived from ``seed``.
+    """
+    import itertools
+
+    import agent_factory
+    from camel.types import ModelType
+
+    seeds = itertools.count(seed)
+    responder = pipeline_responder(reply_words)
+
+    def provider(model_type):
+        return FakeModel(
+            responder,
+            first_token_latency=model_latency,
+            tokens_per_second=tokens_per_second,
+            model_type=ModelType[model_type].value,
+            failure_rate=failure_rate,
+            seed=next(seeds),
+        )
+
+    agent_factory.set_model_provider(provider)
+    agent_factory.set_search_tools([make_fake_search(search_latency, failure_rate, seed=seed)])
@@ -0,0 +1,97 @@
+"""Google Custom Search client on a pooled, rate-limited HTTP session.
+
+A drop-in for camel's ``SearchToolkit.search_google``: same name, arguments
+and result format, so the tool schema and search-cache keys are unchanged.
+Unlike the toolkit it reuses connections across calls, draws from the
+shared ``google:search`` bucket of a ``rate_limiter.RateLimiter`` and
+retries 429s and 5xx responses with backoff instead of returning an error
+on the first refusal.
+"""
+
+import os
+import threading
+
+SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+
+class GoogleSearch:
+    """Search client whose ``search_google`` method is exposed as the agent tool."""
+
+    def __init__(self, limiter=None, retries=5, pool_size=20, timeout=20.0):
+        self.limiter = limiter
+        self.retries = retries
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+        return self._session
+
+    def _get(self, params):
+        import requests
+
+        response = self.session.get(SEARCH_URL, params=params, timeout=self.timeout)
+        if response.status_code >= 400:
+            # Not raise_for_status(): its message would include the API key in the URL
+            raise requests.HTTPError(
+                f"{response.status_code} {response.reason} from Google Custom Search",
+                response=response,
+            )
+        return response.json()
+
+    def search_google(self, query: str, num_result_pages: int = 5) -> list:
+        r"""Use Google search engine to search information for the given query.
+
+        Args:
+            query (str): The query to be searched.
+            num_result_pages (int): The number of result pages to retrieve.
+
+        Returns:
+            List[Dict[str, Any]]: A list of dictionaries where each dictionary
+            represents a website. Each dictionary contains the keys
+            'result_id', 'title', 'description', 'long_description' and
+            'url'.
+        """
+        from rate_limiter import call_with_backoff, describe_error
+
+        params = {
+            "key": os.getenv("GOOGLE_API_KEY"),
+            "cx": os.getenv("SEARCH_ENGINE_ID"),
+            "q": query,
+            "start": 1,
+            "lr": "en",
+            "num": num_result_pages,
+        }
+        try:
+            data = call_with_backoff(
+                self._get, params, retries=self.retries,
+                limiter=self.limiter, bucket="google:search", amounts={"google:search": 1},
+            )
+        except Exception as e:
+            return [{"error": f"google search failed: {describe_error(e)}"}]
+
+        results = []
+        for i, item in enumerate(data.get("items", []), start=1):
+            metatags = item.get("pagemap", {}).get("metatags")
+            if not metatags:
+                continue
+            results.append({
+                "result_id": i,
+                "title": item.get("title"),
+                "description": item.get("snippet"),
+                "long_description": metatags[0].get("og:description", "N/A"),
+                "url": item.get("link"),
+            })
+        return results
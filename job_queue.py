@@ -0,0 +1,476 @@
+"""Durable job queue for large research batches, worked by several processes.
+
+    python job_queue.py enqueue requests.jsonl
+    python job_queue.py work --workers 8
+    python job_queue.py status
+
+Jobs live in a SQLite database (``.cache/jobs.sqlite3``), so nothing is lost
+when a worker or the whole machine goes down. Each worker process claims
+one job at a time under a lease that a background thread renews while the
+job runs; a lease that runs out (the worker died) makes the job claimable
+again. Failed jobs are retried with backoff and moved to ``dead`` once
+they used up their attempts. Reports go to a fixed path per job ID and
+stage checkpoints are kept per job (run ID ``job-<job id>``), so a retry
+resumes where the last attempt stopped and never writes a second report.
+"""
+
+import os
+import json
+import hashlib
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+from sqlite_connections import ThreadLocalConnections
+
+DEFAULT_DB_PATH = ".cache/jobs.sqlite3"
+DEFAULT_LEASE_S = 120
+DEFAULT_MAX_ATTEMPTS = 3
+STATUSES = ("queued", "leased", "done", "dead")
+
+
+def job_id_for(name, query_id, query, recipe_id=None):
+    """``<name>-<query id>-<hash>``; the hash of query and recipe tells reused IDs apart."""
+    digest = hashlib.sha256(json.dumps([query, recipe_id]).encode("utf-8")).hexdigest()
+    return f"{name}-{query_id}-{digest[:8]}"
+
+
+class JobQueue:
+    """SQLite-backed queue; safe to share between threads and processes."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect = ThreadLocalConnections(
+            self.db_path, row_factory=sqlite3.Row, isolation_level=None
+        )
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    duration_s REAL,
+                    report_path TEXT,
+                    error TEXT,
+                    recipe_id TEXT
+                )"""
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "recipe_id" not in columns:
+                # Queues created before recipes were selectable
+                conn.execute("ALTER TABLE jobs ADD COLUMN recipe_id TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at)")
+
+    def _transaction(self, fn):
+        """Run ``fn(conn)`` inside ``BEGIN IMMEDIATE``, so claims never race."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def enqueue(self, job_id, query, max_attempts=DEFAULT_MAX_ATTEMPTS, recipe_id=None):
+        """Add a job; returns ``False`` if the same job was already enqueued.
+
+        Raises ``ValueError`` if ``job_id`` is taken by another query or recipe.
+        """
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO jobs (id, query, max_attempts, available_at, created_at, recipe_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, query, max_attempts, now, now, recipe_id),
+        )
+        if cursor.rowcount == 1:
+            return True
+        row = conn.execute("SELECT query, recipe_id FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if (row["query"], row["recipe_id"]) != (query, recipe_id):
+            raise ValueError(f"Job {job_id} already exists with a different query or recipe")
+        return False
+
+    def enqueue_file(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS, recipe_id=None):
+        """Enqueue every query of a batch file (job IDs from ``job_id_for``).
+
+        A line's own ``recipe_id`` takes precedence over ``recipe_id``.
+        Returns ``(added, skipped)``; rerunning the same file adds nothing,
+        while a query ID that now holds another query becomes a new job.
+        """
+        from recipes import get_recipe_registry
+        from socrates import load_batch
+
+        queries = [
+            (query_id, query, query_recipe or recipe_id)
+            for query_id, query, query_recipe in load_batch(path)
+        ]
+        # Reject the file before enqueueing anything if a recipe is missing or invalid
+        for recipe in {recipe for _, _, recipe in queries if recipe}:
+            get_recipe_registry().get(recipe)
+        added = skipped = 0
+        for query_id, query, recipe in queries:
+            job_id = job_id_for(Path(path).stem, query_id, query, recipe)
+            if self.enqueue(job_id, query, max_attempts, recipe):
+                added += 1
+            else:
+                skipped += 1
+        return added, skipped
+
+    def claim(self, worker_id, lease_s=DEFAULT_LEASE_S):
+        """Lease the oldest available job to ``worker_id``; ``None`` if there is none.
+
+        Jobs whose lease expired are available again, unless that was their
+        last attempt, in which case they are dead-lettered.
+        """
+
+        def claim_one(conn):
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'dead', lease_owner = NULL, finished_at = ?, "
+                "error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY available_at, created_at LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker_id, now + lease_s, now, row["id"]),
+            )
+            return {**dict(row), "attempts": row["attempts"] + 1}
+
+        return self._transaction(claim_one)
+
+    def heartbeat(self, job_id, worker_id, lease_s=DEFAULT_LEASE_S):
+        """Extend the lease; returns ``False`` if ``worker_id`` no longer holds it."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (time.time() + lease_s, job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, report_path, duration_s=None):
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'done', lease_owner = NULL, finished_at = ?, "
+            "duration_s = ?, report_path = ?, error = NULL "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (time.time(), duration_s, str(report_path), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, retry_delay=0.0):
+        """Record a failed attempt: retry after ``retry_delay`` or dead-letter the job.
+
+        Returns the job's new status.
+        """
+
+        def fail_one(conn):
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ? "
+                "AND status = 'leased'",
+                (job_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return None
+            status = "dead" if row["attempts"] >= row["max_attempts"] else "queued"
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, available_at = ?, error = ?, "
+                "finished_at = CASE WHEN ? = 'dead' THEN ? END WHERE id = ?",
+                (status, now + retry_delay, error, status, now, job_id),
+            )
+            return status
+
+        return self._transaction(fail_one)
+
+    def release(self, job_id, worker_id):
+        """Give a job back without counting the attempt (e.g. on shutdown)."""
+        self._connect().execute(
+            "UPDATE jobs SET status = 'queued', lease_owner = NULL, attempts = attempts - 1 "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (job_id, worker_id),
+        )
+
+    def requeue_dead(self):
+        """Give every dead job a fresh set of attempts; returns how many."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, finished_at = NULL "
+            "WHERE status = 'dead'",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    def stats(self, window_s=600):
+        """Queue depth per status, throughput and the jobs currently leased."""
+        conn = self._connect()
+        now = time.time()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        recent, average = conn.execute(
+            "SELECT COUNT(*), AVG(duration_s) FROM jobs WHERE status = 'done' AND finished_at >= ?",
+            (now - window_s,),
+        ).fetchone()
+        first_start = conn.execute("SELECT MIN(started_at) FROM jobs").fetchone()[0]
+        per_minute = recent / (window_s / 60)
+        return {
+            **counts,
+            "retrying": conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND attempts > 0"
+            ).fetchone()[0],
+            "done_last_window": recent,
+            "window_s": window_s,
+            "jobs_per_minute": round(per_minute, 2),
+            "overall_jobs_per_minute": round(counts["done"] / ((now - first_start) / 60), 2)
+            if first_start and counts["done"] else 0.0,
+            "avg_duration_s": round(average, 1) if average is not None else None,
+            "eta_minutes": round(counts["queued"] / per_minute, 1) if per_minute and counts["queued"] else None,
+            "running": [
+                dict(row) for row in conn.execute(
+                    "SELECT id, lease_owner, attempts, ? - started_at AS running_s FROM jobs "
+                    "WHERE status = 'leased' ORDER BY started_at",
+                    (now,),
+                ).fetchall()
+            ],
+            "dead_letters": [
+                dict(row) for row in conn.execute(
+                    "SELECT id, attempts, error FROM jobs WHERE status = 'dead' "
+                    "ORDER BY finished_at DESC LIMIT 10"
+                ).fetchall()
+            ],
+        }
+
+
+class Heartbeat:
+    """Renews a job's lease from a background thread while the job runs."""
+
+    def __init__(self, queue, job_id, worker_id, lease_s):
+        self.queue = queue
+        self.args = (job_id, worker_id, lease_s)
+        self.interval = lease_s / 3
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.queue.heartbeat(*self.args):
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_job(job, reuse="auto", max_age_days=7.0):
+    """Run one job's query and write its report; returns the report path.
+
+    The path depends only on the job, so a report written by an attempt
+    that died before marking the job done is picked up, not rewritten.
+    """
+    from checkpoints import RunCheckpoint
+    from socrates import _run_query_in_thread, build_tracer, prior_report, results_path, save_results
+
+    filepath = results_path(job["query"], job["id"])
+    if filepath.exists():
+        return filepath
+    decision, match, seed = prior_report(job["query"], reuse, max_age_days, job["recipe_id"])
+    if decision == "reuse":
+        return Path(match.path)
+    # Own namespace, so a socrates.py --batch run of the same file never shares checkpoints
+    run_id = f"job-{job['id']}"
+    checkpoint = RunCheckpoint(run_id)
+    if not checkpoint.completed("plan"):
+        checkpoint.save_inputs(query=job["query"], seed=seed, recipe_id=job["recipe_id"])
+    tracer = build_tracer(run_id)
+    result = _run_query_in_thread(
+        job["query"], checkpoint, False, tracer, seed, recipe_id=job["recipe_id"]
+    )
+    return save_results(job["query"], result, filepath, job["recipe_id"])
+
+
+def work(db_path, worker_id, lease_s=DEFAULT_LEASE_S, poll_s=2.0, drain=False,
+         reuse="auto", max_age_days=7.0, fake=False, llm_cache="off"):
+    """Worker process loop: claim, run under a heartbeat, record the outcome."""
+    from agent_factory import setup_backends
+    from rate_limiter import backoff_delay, describe_error
+
+    setup_backends(llm_cache, fake, fake_options=dict(model_latency=0.05))
+    queue = JobQueue(db_path)
+    while True:
+        job = queue.claim(worker_id, lease_s)
+        if job is None:
+            if drain:
+                return
+            time.sleep(poll_s)
+            continue
+        print(f"[{worker_id}] {job['id']} attempt {job['attempts']}/{job['max_attempts']}")
+        started = time.perf_counter()
+        try:
+            with Heartbeat(queue, job["id"], worker_id, lease_s) as heartbeat:
+                filepath = run_job(job, reuse, max_age_days)
+        except KeyboardInterrupt:
+            queue.release(job["id"], worker_id)
+            return
+        except Exception as e:
+            status = queue.fail(job["id"], worker_id, describe_error(e),
+                                retry_delay=backoff_delay(job["attempts"], base=10, cap=300))
+            print(f"[{worker_id}] {job['id']} failed ({status}): {describe_error(e)}")
+            continue
+        if heartbeat.lost or not queue.complete(
+            job["id"], worker_id, filepath, round(time.perf_counter() - started, 3)
+        ):
+            print(f"[{worker_id}] {job['id']} lease was lost; another worker owns it now")
+        else:
+            print(f"[{worker_id}] {job['id']} done -> {filepath}")
+
+
+def run_workers(args):
+    """Start ``args.workers`` worker processes and wait for them."""
+    import multiprocessing
+
+    # spawn: workers must not inherit the parent's SQLite connections or threads
+    context = multiprocessing.get_context("spawn")
+    host = os.uname().nodename if hasattr(os, "uname") else "local"
+    processes = [
+        context.Process(
+            target=work,
+            args=(args.db, f"{host}-{os.getpid()}-{i}", args.lease, args.poll, args.drain,
+                  args.reuse, args.max_age, args.fake, args.llm_cache),
+        )
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT and release their jobs
+        for process in processes:
+            process.join()
+
+
+def format_stats(stats):
+    lines = [
+        f"queued {stats['queued']} (retrying {stats['retrying']})  leased {stats['leased']}  "
+        f"done {stats['done']}  dead {stats['dead']}",
+        f"throughput: {stats['jobs_per_minute']} jobs/min over the last {stats['window_s'] / 60:.0f} min, "
+        f"{stats['overall_jobs_per_minute']} jobs/min overall"
+        + (f", avg {stats['avg_duration_s']}s per job" if stats["avg_duration_s"] is not None else "")
+        + (f", ETA {stats['eta_minutes']} min" if stats["eta_minutes"] is not None else ""),
+    ]
+    for job in stats["running"]:
+        lines.append(f"  running {job['id']} on {job['lease_owner']} "
+                     f"(attempt {job['attempts']}, {job['running_s']:.0f}s)")
+    for job in stats["dead_letters"]:
+        lines.append(f"  dead {job['id']} after {job['attempts']} attempts: {job['error']}")
+    return "\n".join(lines)
+
+
+def main():
+    from agent_factory import add_backend_arguments, setup_backends
+
+    parser = argparse.ArgumentParser(description='Durable SQLite job queue for research batches')
+    parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH,
+                        help=f'Queue database (default: {DEFAULT_DB_PATH})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='Add queries from a JSONL batch file or --query')
+    enqueue.add_argument('batch', nargs='?', metavar='JSONL',
+                         help='Batch file in socrates.py --batch format (e.g. requests.jsonl)')
+    enqueue.add_argument('--query', type=str, help='Add a single query')
+    enqueue.add_argument('--id', type=str, help='Job ID for --query (default: generated)')
+    enqueue.add_argument('--recipe', type=str, metavar='RECIPE_ID',
+                         help='Recipe for queries that do not set their own recipe_id')
+    enqueue.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                         help=f'Attempts before a job is dead-lettered (default: {DEFAULT_MAX_ATTEMPTS})')
+
+    worker = commands.add_parser('work', help='Process jobs with a pool of worker processes')
+    worker.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per CPU)')
+    worker.add_argument('--lease', type=float, default=DEFAULT_LEASE_S,
+                        help=f'Seconds a claimed job stays leased without a heartbeat (default: {DEFAULT_LEASE_S})')
+    worker.add_argument('--poll', type=float, default=2.0,
+                        help='Seconds between claims while the queue is empty (default: 2)')
+    worker.add_argument('--drain', action='store_true',
+                        help='Exit once no job is available instead of waiting for more')
+    worker.add_argument('--reuse', choices=['auto', 'always', 'never'], default='auto',
+                        help='Saved-report reuse policy, as in socrates.py (default: auto)')
+    worker.add_argument('--max-age', type=float, default=7.0, metavar='DAYS',
+                        help='Age after which a matching report is refreshed (default: 7)')
+    add_backend_arguments(worker, fake=True, memory=False)
+
+    status = commands.add_parser('status', help='Show queue depth, throughput and failures')
+    status.add_argument('--window', type=float, default=10, metavar='MINUTES',
+                        help='Window for the recent throughput (default: 10)')
+    status.add_argument('--json', action='store_true', help='Print the numbers as JSON')
+
+    commands.add_parser('requeue-dead', help='Retry every dead-lettered job from scratch')
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.command == 'enqueue':
+        if not args.batch and not args.query:
+            parser.error("enqueue needs a batch file or --query")
+        if args.recipe:
+            from recipes import get_recipe_registry
+
+            try:
+                get_recipe_registry().get(args.recipe)
+            except (KeyError, ValueError) as e:
+                parser.error(f"--recipe: {e}")
+        if args.batch:
+            added, skipped = queue.enqueue_file(args.batch, args.max_attempts, args.recipe)
+            print(f"Enqueued {added} jobs from {args.batch} ({skipped} already known)")
+        if args.query:
+            from checkpoints import new_run_id
+
+            job_id = args.id or new_run_id()
+            try:
+                added = queue.enqueue(job_id, args.query, args.max_attempts, args.recipe)
+            except ValueError as e:
+                parser.exit(1, f"{e}\n")
+            print(f"Enqueued {job_id}" if added else f"Job {job_id} already exists")
+    elif args.command == 'work':
+        if args.workers < 1:
+            parser.error("--workers must be at least 1")
+        # Fail on missing keys here rather than in every worker process
+        setup_backends(args.llm_cache, args.fake)
+        run_workers(args)
+    elif args.command == 'status':
+        stats = queue.stats(args.window * 60)
+        if args.json:
+            print(json.dumps(stats, indent=2))
+        else:
+            print(format_stats(stats))
+    elif args.command == 'requeue-dead':
+        print(f"Requeued {queue.requeue_dead()} dead jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Content-addressed cache for model responses, with a strict replay mode.
+
+Responses are stored as JSON files named by the hash of everything that
+determines them: model type, model config (including tool schemas) and the
+full message list, system message included. In ``record`` mode misses go to
+the real backend and are written to the cache; in ``replay`` mode a miss
+raises ``CacheMissError`` so a recorded run can be re-executed offline.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from camel.types import ChatCompletion
+
+from model_backends import DelegatingModelBackend
+from search_cache import CacheMissError
+from tracing import annotate
+
+MODES = ("off", "record", "replay")
+DEFAULT_CACHE_DIR = ".cache/llm"
+
+# Transport-only settings that do not change the response
+IGNORED_CONFIG_KEYS = ("stream", "stream_options")
+
+
+def make_key(model_type, model_config_dict, messages):
+    """Hash of a model request; the system message is the first of ``messages``."""
+    config = {
+        key: value for key, value in model_config_dict.items()
+        if key not in IGNORED_CONFIG_KEYS
+    }
+    payload = json.dumps(
+        {
+            "model_type": str(model_type),
+            "config": config,
+            "messages": messages,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """One JSON file per response under ``cache_dir/<key[:2]>/<key>.json``.
+
+    Files are written to a temporary name and renamed into place, so
+    concurrent writers (threads or processes) never expose partial entries.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, mode="record"):
+        if mode not in MODES:
+            raise ValueError(f"LLM cache mode must be one of {MODES}, got {mode!r}")
+        self.cache_dir = Path(cache_dir)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def set(self, key, data):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+class CachingModelBackend(DelegatingModelBackend):
+    """Model backend that answers repeated requests from an ``LLMCache``."""
+
+    def __init__(self, backend, cache):
+        super().__init__(backend)
+        self.cache = cache
+
+    def run(self, messages):
+        key = make_key(self.model_type, self.model_config_dict, messages)
+        data = self.cache.get(key)
+        if data is not None:
+            annotate(cached=True)
+            return ChatCompletion.model_validate(data)
+        if self.cache.mode == "replay":
+            raise CacheMissError(
+                f"No recorded response for {self.model_type} request {key[:12]}"
+            )
+        response = self.backend.run(messages)
+        if isinstance(response, ChatCompletion):
+            self.cache.set(key, response.model_dump(mode="json"))
+            return response
+        return self._record_stream(key, response)
+
+    def _record_stream(self, key, chunks):
+        # Pass chunks through untouched and record the assembled completion
+        # once the stream is exhausted. Cache hits are replayed whole.
+        from streaming import completion_from_chunks
+
+        seen = []
+        for chunk in chunks:
+            seen.append(chunk)
+            yield chunk
+        self.cache.set(key, completion_from_chunks(seen).model_dump(mode="json"))
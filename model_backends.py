@@ -0,0 +1,45 @@
+"""Base class for the model backend wrappers (cache, rate limit, streaming, tracing)."""
+
+from camel.models import BaseModelBackend
+
+
+class DelegatingModelBackend(BaseModelBackend):
+    """Delegates everything to the wrapped ``backend``; subclasses override ``run``.
+
+    ``model_config_dict`` is delegated too, since ``ChatAgent`` reads and
+    reassigns it while adding tools and response formats.
+    """
+
+    def __init__(self, backend):
+        # BaseModelBackend.__init__ would overwrite the delegated config
+        self.backend = backend
+
+    @property
+    def model_type(self):
+        return self.backend.model_type
+
+    @property
+    def model_config_dict(self):
+        return self.backend.model_config_dict
+
+    @model_config_dict.setter
+    def model_config_dict(self, model_config_dict):
+        self.backend.model_config_dict = model_config_dict
+
+    @property
+    def token_counter(self):
+        return self.backend.token_counter
+
+    @property
+    def token_limit(self):
+        return self.backend.token_limit
+
+    @property
+    def stream(self):
+        return self.backend.stream
+
+    def check_model_config(self):
+        self.backend.check_model_config()
+
+    def run(self, messages):
+        return self.backend.run(messages)
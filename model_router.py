@@ -0,0 +1,136 @@
+"""Per-agent model tiers chosen from how demanding a run looks.
+
+Every agent has a ladder of models, cheapest first: by default the fast
+model followed by the model in its ``AgentSpec``. A run is rated from the
+size of its input and, once the planner has answered, from how many
+ingredients need searching or are still missing. Simple runs use the
+bottom of each ladder; anything over a threshold gets the top. A judge
+verdict of ``NEEDS_REVISION`` escalates the report creator and judge to
+their strongest tier for one more attempt.
+"""
+
+import json
+from dataclasses import asdict, dataclass, field, fields
+
+
+@dataclass(frozen=True)
+class RouterConfig:
+    """Thresholds at or below which a run counts as simple, and the model ladders.
+
+    ``tiers`` maps an agent name to its models, cheapest first; agents not
+    listed use ``(fast_model, spec.model_type)``. ``agents`` restricts
+    routing to the named agents (``None`` routes all of them).
+    """
+
+    fast_model: str = "GPT_4O_MINI"
+    max_simple_tokens: int = 3000
+    max_simple_searches: int = 2
+    max_simple_gaps: int = 1
+    tiers: dict = field(default_factory=dict)
+    agents: tuple | None = None
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a config from a JSON object of field overrides."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        unknown = set(data) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown router settings: {', '.join(sorted(unknown))}")
+        if data.get("agents") is not None:
+            data["agents"] = tuple(data["agents"])
+        return cls(**data)
+
+
+@dataclass
+class Complexity:
+    """What a run has to deal with: input size and the planner's status counts."""
+
+    input_tokens: int
+    needs_search: int = 0
+    gaps: int = 0
+    known: int = 0
+
+    def level(self, config):
+        simple = (
+            self.input_tokens <= config.max_simple_tokens
+            and self.needs_search <= config.max_simple_searches
+            and self.gaps <= config.max_simple_gaps
+        )
+        return "simple" if simple else "complex"
+
+
+def estimate_complexity(content, plan=None):
+    """Rate ``content`` alone (before planning) or with the planner's ``plan``."""
+    from prompt_budget import estimate_tokens
+
+    complexity = Complexity(input_tokens=estimate_tokens(content))
+    if plan is not None:
+        for item in plan.get("ingredient_analysis", []):
+            status = item.get("status")
+            if status == "NEEDS_SEARCH":
+                complexity.needs_search += 1
+            elif status in ("UNSEARCHABLE", "REQUIRES_INPUT"):
+                complexity.gaps += 1
+            elif status == "KNOWN":
+                complexity.known += 1
+    return complexity
+
+
+class ModelRouter:
+    """Picks each agent's model and records why.
+
+    Decisions are applied with ``AgentFactory.set_model``, kept in
+    ``decisions`` and recorded as ``route`` spans on the factory's tracer.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or RouterConfig()
+        self.decisions = []
+        self._defaults = {}
+
+    def ladder(self, factory, name):
+        if name in self.config.tiers:
+            return list(self.config.tiers[name])
+        # The spec's own model, before any routing replaced it
+        default = self._defaults.setdefault(name, factory.specs[name].model_type)
+        return [self.config.fast_model, default] if default != self.config.fast_model else [default]
+
+    def _apply(self, factory, name, tier, reason, complexity):
+        if self.config.agents is not None and name not in self.config.agents:
+            return None
+        ladder = self.ladder(factory, name)
+        model_type = ladder[0] if tier == "fast" else ladder[-1]
+        decision = {"model": model_type, "reason": reason, **asdict(complexity)}
+        with factory.span("route", name, agent=name, **decision):
+            factory.set_model(name, model_type)
+        self.decisions.append({"agent": name, **decision})
+        return model_type
+
+    def route(self, factory, names, complexity):
+        """Assign each agent in ``names`` the tier matching ``complexity``."""
+        level = complexity.level(self.config)
+        for name in names:
+            self._apply(factory, name, "fast" if level == "simple" else "strong", level, complexity)
+
+    def escalate(self, factory, names, complexity):
+        """Move ``names`` that are below their strongest tier up to it.
+
+        Returns whether any model changed; if none did, a rerun would only
+        repeat the same attempt.
+        """
+        changed = False
+        for name in names:
+            if self.config.agents is not None and name not in self.config.agents:
+                continue
+            if factory.specs[name].model_type != self.ladder(factory, name)[-1]:
+                self._apply(factory, name, "strong", "escalated", complexity)
+                changed = True
+        return changed
+
+    def format_decisions(self):
+        return "\n".join(
+            f"  {d['agent']:<26} {d['model']:<12} {d['reason']:<9} "
+            f"(~{d['input_tokens']} tokens, {d['needs_search']} to search, {d['gaps']} gaps)"
+            for d in self.decisions
+        )
@@ -0,0 +1,222 @@
+"""Concurrent fetching of search-hit pages as plain text.
+
+``PageFetcher`` downloads URLs over one pooled ``httpx.AsyncClient`` with a
+per-host concurrency limit. Response bodies are streamed straight into an
+HTML-to-text parser and the download stops once ``max_bytes`` have arrived
+or ``max_chars`` of text were extracted, so a huge page is never buffered
+whole. Extracted text is cached by URL together with the response's ETag;
+stale entries are revalidated with ``If-None-Match`` and a ``304`` serves
+the cached text without downloading the page again.
+"""
+
+import asyncio
+import codecs
+import os
+import re
+import time
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from search_cache import CacheMissError, SearchCache, make_key
+
+DEFAULT_CACHE_DIR = ".cache/pages"
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+DEFAULT_MAX_CHARS = 20000
+USER_AGENT = "deep-research-bot/1.0 (+https://github.com/camel-ai/camel)"
+
+TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+SKIPPED_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "head"}
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article",
+    "header", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote",
+}
+
+
+class TextExtractor(HTMLParser):
+    """Incremental HTML-to-text converter; ``feed`` it chunks as they arrive."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.title = ""
+        self.chars = 0
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth and data.strip():
+            self.parts.append(data)
+            self.chars += len(data)
+
+    def text(self):
+        text = re.sub(r"[ \t\r\f\v]+", " ", "".join(self.parts))
+        return re.sub(r"\s*\n\s*", "\n", text).strip()
+
+
+def _charset(content_type):
+    match = re.search(r"charset=([\w-]+)", content_type or "", re.I)
+    if match:
+        try:
+            codecs.lookup(match.group(1))
+            return match.group(1)
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class PageFetcher:
+    """Pooled async page downloader; use as ``async with PageFetcher() as fetcher``.
+
+    Args:
+        max_connections: Size of the shared connection pool.
+        max_per_host: Requests allowed in flight to one host at a time.
+        max_bytes: Bytes read per response before the download is cut off.
+        max_chars: Characters of extracted text kept per page.
+        timeout: Seconds allowed per request.
+        cache: ``SearchCache`` for extracted text, or ``None``.
+        ttl: Seconds a cached page is served without revalidation.
+        offline: Serve only from the cache (offline replay); misses fail.
+    """
+
+    def __init__(self, max_connections=20, max_per_host=4, max_bytes=DEFAULT_MAX_BYTES,
+                 max_chars=DEFAULT_MAX_CHARS, timeout=10.0, cache=None, ttl=DEFAULT_TTL,
+                 offline=False):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.cache = cache
+        self.ttl = ttl
+        self.offline = offline
+        self._hosts = {}
+        self._inflight = {}
+        self._client = None
+
+    async def __aenter__(self):
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        return self._hosts[host]
+
+    async def fetch(self, url):
+        """Return ``{url, title, text, status, cached, truncated}`` or ``{url, error}``.
+
+        Concurrent requests for the same URL share one download.
+        """
+        if url not in self._inflight:
+            self._inflight[url] = asyncio.ensure_future(self._fetch(url))
+            self._inflight[url].add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(self._inflight[url])
+
+    async def _fetch(self, url):
+        key = make_key("fetch_page", "", {"url": url})
+        cached = self.cache.get(key, allow_expired=True) if self.cache is not None else None
+        if cached is not None and (self.offline or cached["fetched_at"] + self.ttl > time.time()):
+            return {**cached["page"], "cached": True}
+        if self.offline:
+            return {"url": url, "error": str(CacheMissError(f"No cached page for {url}"))}
+
+        headers = {}
+        if cached is not None and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        try:
+            async with self._host_limit(url):
+                page, etag = await self._download(url, headers)
+        except Exception as e:
+            return {"url": url, "error": f"{type(e).__name__}: {e}"}
+        not_modified = page is None
+        if not_modified:
+            # 304 Not Modified: the cached text is still current
+            page, etag = cached["page"], cached["etag"]
+        elif "error" in page:
+            return page
+        if self.cache is not None:
+            # Keep entries past their freshness window so they can be revalidated
+            self.cache.set(key, {"page": page, "etag": etag, "fetched_at": time.time()},
+                           ttl=self.ttl * 24)
+        return {**page, "cached": not_modified}
+
+    async def _download(self, url, headers):
+        async with self._client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return None, None
+            if response.status_code >= 400:
+                return {"url": url, "error": f"HTTP {response.status_code}"}, None
+            content_type = response.headers.get("content-type", "")
+            if content_type and not content_type.lower().startswith(TEXT_TYPES):
+                return {"url": url, "error": f"unsupported content type {content_type}"}, None
+
+            decoder = codecs.getincrementaldecoder(_charset(content_type))(errors="replace")
+            extractor = TextExtractor()
+            received = 0
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if received >= self.max_bytes or extractor.chars >= self.max_chars:
+                    truncated = True
+                    break
+            if not truncated:
+                extractor.feed(decoder.decode(b"", final=True))
+                extractor.close()
+            text = extractor.text()
+            page = {
+                "url": str(response.url),
+                "title": extractor.title.strip(),
+                "text": text[:self.max_chars],
+                "status": response.status_code,
+                "truncated": truncated or len(text) > self.max_chars,
+            }
+            return page, response.headers.get("etag")
+
+    async def fetch_all(self, urls):
+        """Fetch ``urls`` concurrently; results are in the order given."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+
+def page_cache_from_env():
+    """``SearchCache`` for fetched pages, configured like ``search_cache.cache_from_env``."""
+    if os.getenv("PAGE_CACHE", "1").lower() in ("0", "false", "off"):
+        return None
+    return SearchCache(
+        cache_dir=os.getenv("PAGE_CACHE_DIR", DEFAULT_CACHE_DIR),
+        max_bytes=int(float(os.getenv("PAGE_CACHE_MAX_MB", 200)) * 1024 * 1024),
+    )
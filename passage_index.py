@@ -0,0 +1,156 @@
+"""In-memory passage index for ranking research evidence.
+
+Fetched pages and search snippets are split into overlapping word windows.
+Near-identical passages (syndicated copies, mirrored docs) are dropped by
+SimHash, and the rest are scored against a query with BM25. One index is
+built per run, so nothing is persisted.
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by",
+    "is", "are", "was", "were", "be", "it", "its", "this", "that", "as", "at",
+    "from", "into", "about", "what", "who", "how", "can", "does", "their",
+}
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9\-_.]*[a-z0-9]|[a-z0-9]")
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_text(text, size=120, overlap=30):
+    """Split ``text`` into windows of ``size`` words that overlap by ``overlap``."""
+    words = text.split()
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    step = size - overlap
+    return [" ".join(words[start:start + size]) for start in range(0, len(words) - overlap, step)]
+
+
+def simhash(tokens):
+    """64-bit SimHash over word 3-shingles (single words for very short texts)."""
+    shingles = [" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2)] or tokens
+    digests = [
+        format(int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for s in shingles
+    ]
+    # Majority vote per bit position; zip(*) transposes the bit strings in C
+    half = len(digests) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*digests)), 2)
+
+
+@dataclass
+class Passage:
+    text: str
+    source: str
+    title: str = ""
+    score: float = 0.0
+
+
+class PassageIndex:
+    """BM25 index over deduplicated passages.
+
+    Args:
+        max_distance: Passages whose SimHashes differ in at most this many
+            bits count as duplicates; the first one added is kept.
+        k1, b: BM25 parameters.
+    """
+
+    BANDS = 4
+
+    def __init__(self, max_distance=3, k1=1.5, b=0.75, chunk_size=120, chunk_overlap=30):
+        self.max_distance = max_distance
+        self.k1 = k1
+        self.b = b
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.passages = []
+        self.duplicates = 0
+        self._terms = []
+        self._lengths = []
+        self._df = Counter()
+        self._total_length = 0
+        # SimHash band -> passage hashes. With max_distance < BANDS any two
+        # duplicates agree on at least one 16-bit band, so only same-bucket
+        # hashes need comparing.
+        self._buckets = {}
+
+    def _is_duplicate(self, fingerprint):
+        band_bits = 64 // self.BANDS
+        mask = (1 << band_bits) - 1
+        bands = [(i, fingerprint >> (i * band_bits) & mask) for i in range(self.BANDS)]
+        for band in bands:
+            for other in self._buckets.get(band, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return True
+        for band in bands:
+            self._buckets.setdefault(band, []).append(fingerprint)
+        return False
+
+    def add(self, text, source="", title=""):
+        """Chunk ``text`` and index every passage that is not a near-duplicate."""
+        added = 0
+        for chunk in chunk_text(text, self.chunk_size, self.chunk_overlap):
+            tokens = tokenize(chunk)
+            if not tokens:
+                continue
+            if self._is_duplicate(simhash(tokens)):
+                self.duplicates += 1
+                continue
+            self.passages.append(Passage(chunk, source, title))
+            terms = Counter(tokens)
+            self._terms.append(terms)
+            self._lengths.append(len(tokens))
+            self._df.update(terms.keys())
+            self._total_length += len(tokens)
+            added += 1
+        return added
+
+    def search(self, query, k=5):
+        """Top ``k`` passages for ``query`` by BM25, best first; zero scores are dropped."""
+        if not self.passages:
+            return []
+        query_terms = set(tokenize(query))
+        n = len(self.passages)
+        average_length = self._total_length / n
+        scored = []
+        for passage, terms, length in zip(self.passages, self._terms, self._lengths):
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n - self._df[term] + 0.5) / (self._df[term] + 0.5))
+                score += idf * tf * (self.k1 + 1) / (
+                    tf + self.k1 * (1 - self.b + self.b * length / average_length)
+                )
+            if score > 0:
+                scored.append((score, passage))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [
+            Passage(passage.text, passage.source, passage.title, round(score, 3))
+            for score, passage in scored[:k]
+        ]
+
+
+def render_passages(passages, budget=None):
+    """Passages as quoted markdown with their sources, best first, within ``budget`` tokens."""
+    from prompt_budget import estimate_tokens
+
+    lines = []
+    used = 0
+    for passage in passages:
+        line = f"> {passage.text}\n  — [{passage.title or passage.source}]({passage.source})"
+        cost = estimate_tokens(line)
+        if budget is not None and lines and used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n\n".join(lines)
@@ -0,0 +1,150 @@
+"""Prompt assembly under token budgets.
+
+System prompts are composed from named blocks, stable ones first: shared
+blocks (ingredients, recipe) open every prompt byte-for-byte identically and
+per-run content goes last, so provider-side prefix caching can reuse the
+static part across agents and runs. Evidence sent in a step (search results,
+research findings, long content) is deduplicated and trimmed to the
+receiving agent's ``AgentSpec.input_budget``.
+
+Token counts are estimates (about four characters per token) so budgets can
+be applied without loading a tokenizer.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+
+CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"\S+\s*")
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass(frozen=True)
+class Block:
+    """A titled section of a system prompt."""
+
+    title: str
+    text: str
+
+    def render(self):
+        return f"{self.title}:\n{self.text.strip()}"
+
+
+def compose(*parts):
+    """Join blocks and plain strings into one prompt, dropping exact repeats.
+
+    Order is kept, so pass stable blocks first and per-run blocks last.
+    """
+    seen = set()
+    rendered = []
+    for part in parts:
+        text = part.render() if isinstance(part, Block) else part.strip()
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        if text and digest not in seen:
+            seen.add(digest)
+            rendered.append(text)
+    return "\n\n".join(rendered)
+
+
+def drop_repeated_runs(text, min_words=8):
+    """Remove word runs of ``min_words`` or more that already appeared earlier.
+
+    Scraped pages (e.g. GitHub PRs) repeat their title, status line and
+    timestamps several times; only the first occurrence is kept. Whitespace
+    of the kept words is preserved.
+    """
+    tokens = _WORD.findall(text)
+    words = [token.strip() for token in tokens]
+    seen = set()
+    kept = []
+    i = 0
+    while i < len(tokens):
+        gram = tuple(words[i:i + min_words])
+        if len(gram) == min_words and gram in seen:
+            # Skip to the end of the repeated run
+            while i + min_words <= len(words) and tuple(words[i:i + min_words]) in seen:
+                i += 1
+            i += min_words - 1
+            continue
+        if len(gram) == min_words:
+            seen.add(gram)
+        kept.append(tokens[i])
+        i += 1
+    return "".join(kept)
+
+
+def truncate_to_tokens(text, budget):
+    """Cut ``text`` to about ``budget`` tokens at a paragraph, line or sentence end."""
+    if budget is None or estimate_tokens(text) <= budget:
+        return text
+    limit = budget * CHARS_PER_TOKEN
+    cut = text[:limit]
+    for boundary in ("\n\n", "\n", ". "):
+        position = cut.rfind(boundary)
+        if position > limit // 2:
+            cut = cut[:position + len(boundary)]
+            break
+    dropped = estimate_tokens(text) - estimate_tokens(cut)
+    return f"{cut.rstrip()}\n[... {dropped} more tokens omitted]"
+
+
+def fit_content(text, budget):
+    """Deduplicate repeated runs in ``text``, then trim it to ``budget`` tokens."""
+    return truncate_to_tokens(drop_repeated_runs(text), budget)
+
+
+def fit_sections(sections, budget):
+    """Trim a list of texts so together they fit ``budget`` tokens.
+
+    Short sections are kept whole; the remaining budget is shared equally
+    among the longer ones, so one verbose finding cannot crowd out the rest.
+    """
+    if budget is None:
+        return list(sections)
+    sizes = [estimate_tokens(text) for text in sections]
+    if sum(sizes) <= budget:
+        return list(sections)
+    remaining = budget
+    pending = sorted(range(len(sections)), key=lambda i: sizes[i])
+    allowance = {}
+    while pending:
+        share = remaining // len(pending)
+        i = pending[0]
+        if sizes[i] > share:
+            for j in pending:
+                allowance[j] = share
+            break
+        allowance[i] = sizes[i]
+        remaining -= sizes[i]
+        pending.pop(0)
+    return [truncate_to_tokens(text, allowance[i]) for i, text in enumerate(sections)]
+
+
+def compact_results(results, budget=None, description_chars=300):
+    """Render search results as compact text within ``budget`` tokens.
+
+    Only title, URL and description are kept; results are dropped from the
+    end (lowest ranked) until the rest fit.
+    """
+    if not isinstance(results, list):
+        return truncate_to_tokens(json.dumps(results, indent=2, default=str), budget)
+    lines = []
+    for result in results:
+        if not isinstance(result, dict):
+            lines.append(str(result))
+        elif "error" in result:
+            lines.append(f"- Error: {result['error']}")
+        else:
+            description = str(result.get("description") or result.get("snippet") or "")
+            if len(description) > description_chars:
+                description = description[:description_chars].rstrip() + "..."
+            lines.append(f"- {result.get('title', '')} ({result.get('url', '')})\n  {description}")
+    while len(lines) > 1 and budget is not None and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop()
+    return truncate_to_tokens("\n".join(lines), budget)
@@ -0,0 +1,221 @@
+"""Rate limiting shared by every thread and local process, with retry backoff.
+
+Quotas are token buckets stored in SQLite, so concurrent ``socrates.py``
+processes draw from the same budget instead of each assuming it has the
+whole quota. A caller reserves what it needs inside one ``BEGIN IMMEDIATE``
+transaction and then sleeps off any debt outside it; reservations queue up
+in arrival order without polling. When a provider still answers 429, the
+bucket is drained for the ``Retry-After`` period so every process backs off,
+not just the one that was refused.
+"""
+
+import fnmatch
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from model_backends import DelegatingModelBackend
+from sqlite_connections import ThreadLocalConnections
+
+DEFAULT_DB_PATH = ".cache/ratelimit.sqlite3"
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "ConnectionError", "Timeout", "ReadTimeout")
+
+# Google searches per minute (SEARCH_QPM). OpenAI quotas depend on the
+# account's tier, so requests and tokens are only throttled when
+# OPENAI_RPM / OPENAI_TPM are set.
+DEFAULT_SEARCH_QPM = 100
+# Completion allowance charged against TPM when a model sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+class RateLimiter:
+    """Token buckets in a SQLite file, keyed by name.
+
+    ``limits`` maps a bucket name, or a glob pattern such as
+    ``openai:*:tokens``, to its capacity per minute. Each name matching a
+    pattern gets its own bucket. Buckets start full and refill continuously;
+    names without a limit are not throttled.
+    """
+
+    def __init__(self, limits, db_path=DEFAULT_DB_PATH):
+        self.limits = dict(limits)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.waited_s = 0.0
+        self._connect = ThreadLocalConnections(self.db_path, isolation_level=None)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )"""
+            )
+
+    def limit(self, name):
+        """Capacity per minute of bucket ``name``, or ``None`` if it is unlimited."""
+        if name in self.limits:
+            return self.limits[name]
+        for pattern, capacity in self.limits.items():
+            if fnmatch.fnmatchcase(name, pattern):
+                return capacity
+        return None
+
+    def _update(self, name, change):
+        """Refill ``name``, apply ``change(tokens, rate) -> tokens`` and return the new level."""
+        capacity = self.limit(name)
+        rate = capacity / 60.0
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            tokens = change(tokens, rate)
+            conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return tokens, rate
+
+    def reserve(self, name, amount=1.0):
+        """Take ``amount`` from bucket ``name``; returns the seconds to wait before using it."""
+        if self.limit(name) is None:
+            return 0.0
+        tokens, rate = self._update(name, lambda tokens, rate: tokens - amount)
+        return max(0.0, -tokens / rate)
+
+    def acquire(self, amounts):
+        """Reserve ``{bucket: amount}`` and sleep until all of them are available."""
+        wait = max((self.reserve(name, amount) for name, amount in amounts.items()), default=0.0)
+        if wait > 0:
+            self.waited_s += wait
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, name, seconds):
+        """Empty bucket ``name`` for ``seconds`` so every process pauses (e.g. after a 429)."""
+        if self.limit(name) is not None:
+            self._update(name, lambda tokens, rate: min(tokens, -rate * seconds))
+
+
+def retry_after(exc):
+    """Seconds from a ``Retry-After``/``retry-after-ms`` header on ``exc``'s response, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def status_code(exc):
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_retryable(exc):
+    return status_code(exc) in RETRY_STATUSES or type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def describe_error(exc):
+    """One-line description of ``exc`` that calls out rate limiting explicitly."""
+    if status_code(exc) == 429:
+        return (
+            f"rate limited (HTTP 429) after retrying: {exc}. Set OPENAI_RPM and OPENAI_TPM "
+            "to your quota, lower SEARCH_QPM, or run fewer queries at once"
+        )
+    return str(exc) or type(exc).__name__
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Full-jitter exponential backoff for retry number ``attempt`` (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def call_with_backoff(fn, *args, retries=5, limiter=None, bucket=None, amounts=None, **kwargs):
+    """Call ``fn``, retrying retryable errors with jittered exponential backoff.
+
+    A ``Retry-After`` header wins over the computed delay. With a
+    ``limiter`` every attempt, retries included, first acquires ``amounts``
+    (``{bucket: amount}``), and a 429 drains ``bucket`` for the delay, which
+    makes other threads and processes back off as well.
+    """
+    from tracing import note_retry
+
+    for attempt in range(retries + 1):
+        if limiter is not None and amounts:
+            limiter.acquire(amounts)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            hinted = retry_after(e)
+            delay = hinted + random.uniform(0, 1) if hinted is not None else backoff_delay(attempt)
+            if limiter is not None and bucket is not None and status_code(e) == 429:
+                limiter.penalize(bucket, delay)
+            note_retry()
+            time.sleep(delay)
+
+
+def estimate_request_tokens(messages, model_config_dict):
+    """Prompt tokens (estimated) plus the completion allowance, as counted against TPM."""
+    from prompt_budget import estimate_tokens
+
+    prompt = sum(estimate_tokens(str(message.get("content") or "")) for message in messages)
+    completion = model_config_dict.get("max_tokens") or model_config_dict.get("max_completion_tokens")
+    # Unset limits are openai.NOT_GIVEN rather than None
+    if not isinstance(completion, int):
+        completion = DEFAULT_COMPLETION_TOKENS
+    return prompt + completion
+
+
+class RateLimitedModelBackend(DelegatingModelBackend):
+    """Model backend that waits for RPM/TPM quota and retries with backoff.
+
+    Sits directly around the provider backend so cached responses never
+    consume quota.
+    """
+
+    def __init__(self, backend, limiter, retries=5):
+        super().__init__(backend)
+        self.limiter = limiter
+        self.retries = retries
+
+    def run(self, messages):
+        model = str(self.model_type)
+        return call_with_backoff(
+            self.backend.run, messages, retries=self.retries,
+            limiter=self.limiter, bucket=f"openai:{model}:requests",
+            amounts={
+                f"openai:{model}:requests": 1,
+                f"openai:{model}:tokens": estimate_request_tokens(messages, self.model_config_dict),
+            },
+        )
+
+
+def limiter_from_env():
+    """Build the shared ``RateLimiter`` from env vars, or ``None`` if ``RATE_LIMIT=0``.
+
+    ``OPENAI_RPM`` and ``OPENAI_TPM`` apply to each model separately, as
+    OpenAI's quotas do, and are unlimited unless set. ``SEARCH_QPM`` limits
+    Google searches.
+    """
+    if os.getenv("RATE_LIMIT", "1").lower() in ("0", "false", "off"):
+        return None
+    limits = {"google:search": float(os.getenv("SEARCH_QPM", DEFAULT_SEARCH_QPM))}
+    for pattern, var in (("openai:*:requests", "OPENAI_RPM"), ("openai:*:tokens", "OPENAI_TPM")):
+        if os.getenv(var):
+            limits[pattern] = float(os.getenv(var))
+    return RateLimiter(limits, os.getenv("RATE_LIMIT_DB", DEFAULT_DB_PATH))
@@ -0,0 +1,194 @@
+"""Recipe registry: output formats and required ingredients, looked up by ``recipe_id``.
+
+Each recipe is a JSON file ``recipes/<recipe_id>.json`` with the fields
+described in the README (``recipe``, ``examples``, ``ingredients``,
+``needs_research``). A recipe is parsed and validated once; the agent specs
+a script builds from it are compiled once per recipe and shared, so
+switching recipes between requests costs a dictionary lookup. A file is
+reloaded (and its specs recompiled) only when its modification time
+changes.
+
+Set ``RECIPES_DIR`` to use another directory.
+"""
+
+import os
+import re
+import json
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+from prompt_budget import Block
+
+DEFAULT_RECIPES_DIR = Path(__file__).resolve().parent / "recipes"
+
+_RECIPE_ID = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+
+
+class UnknownRecipeError(KeyError):
+    def __str__(self):
+        return self.args[0]
+
+
+@dataclass(frozen=True)
+class Recipe:
+    """One validated recipe; its prompt blocks are built on first use."""
+
+    recipe_id: str
+    recipe: str
+    ingredients: str = ""
+    examples: str = ""
+    needs_research: bool = True
+
+    @cached_property
+    def ingredient_blocks(self):
+        return self._blocks(("Required Ingredients List", self.ingredients))
+
+    @cached_property
+    def format_blocks(self):
+        return self._blocks(("Recipe Format", self.recipe), ("Examples", self.examples))
+
+    @property
+    def blocks(self):
+        """Prompt ``Block``s in their stable order: ingredients, recipe, examples.
+
+        Empty fields have no block.
+        """
+        return self.ingredient_blocks + self.format_blocks
+
+    @staticmethod
+    def _blocks(*fields):
+        return tuple(Block(title, text) for title, text in fields if text.strip())
+
+
+def parse_flag(value, field):
+    """``needs_research`` as a bool; the README's ``"TRUE"``/``"FALSE"`` are accepted."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise ValueError(f"{field} must be true or false, got {value!r}")
+
+
+def parse_recipe(recipe_id, data):
+    """Validate a recipe's JSON object; raises ``ValueError`` naming the bad field."""
+    if not isinstance(data, dict):
+        raise ValueError("a recipe must be a JSON object")
+    fields = {}
+    for name in ("recipe", "ingredients", "examples"):
+        value = data.get(name, "")
+        if isinstance(value, list):
+            value = "\n".join(map(str, value))
+        if not isinstance(value, str):
+            raise ValueError(f"{name} must be a string or a list of strings")
+        fields[name] = value
+    if not fields["recipe"].strip():
+        raise ValueError("recipe is required")
+    return Recipe(
+        recipe_id,
+        needs_research=parse_flag(data.get("needs_research", True), "needs_research"),
+        **fields,
+    )
+
+
+class RecipeRegistry:
+    """Loads recipes from ``root`` and caches them with whatever was compiled from them."""
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.getenv("RECIPES_DIR") or DEFAULT_RECIPES_DIR)
+        # Reentrant: a builder may look other recipes up
+        self._lock = threading.RLock()
+        # recipe_id -> (mtime_ns, Recipe, {builder: compiled})
+        self._entries = {}
+
+    def path(self, recipe_id):
+        if not _RECIPE_ID.match(str(recipe_id)):
+            raise ValueError(f"Invalid recipe ID {recipe_id!r}")
+        return self.root / f"{recipe_id}.json"
+
+    def ids(self):
+        return sorted(path.stem for path in self.root.glob("*.json"))
+
+    def _entry(self, recipe_id):
+        path = self.path(recipe_id)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise UnknownRecipeError(
+                f"Unknown recipe {recipe_id!r}; available: {', '.join(self.ids()) or 'none'}"
+            ) from None
+        with self._lock:
+            entry = self._entries.get(recipe_id)
+            if entry is None or entry[0] != mtime:
+                try:
+                    recipe = parse_recipe(recipe_id, json.loads(path.read_text(encoding="utf-8")))
+                except (json.JSONDecodeError, ValueError) as e:
+                    raise ValueError(f"Invalid recipe {path}: {e}") from None
+                entry = self._entries[recipe_id] = (mtime, recipe, {})
+            return entry
+
+    def get(self, recipe_id):
+        """The ``Recipe`` for ``recipe_id``; ``UnknownRecipeError`` if there is none."""
+        return self._entry(recipe_id)[1]
+
+    def compile(self, recipe_id, builder):
+        """``builder(recipe)``, computed once per recipe version and shared.
+
+        Use it for anything derived from a recipe alone, e.g. a script's
+        agent specs; callers must not mutate the result.
+        """
+        _, recipe, compiled = self._entry(recipe_id)
+        with self._lock:
+            if builder not in compiled:
+                compiled[builder] = builder(recipe)
+            return compiled[builder]
+
+    def validate_all(self):
+        """Load every recipe; returns ``{recipe_id: error}`` for the invalid ones."""
+        errors = {}
+        for recipe_id in self.ids():
+            try:
+                self.get(recipe_id)
+            except ValueError as e:
+                errors[recipe_id] = str(e)
+        return errors
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_recipe_registry():
+    """The process-wide ``RecipeRegistry``."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = RecipeRegistry()
+    return _registry
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='List and validate research recipes')
+    parser.add_argument('recipe_id', nargs='?', help='Show one recipe instead of listing them all')
+    args = parser.parse_args()
+    registry = get_recipe_registry()
+    if args.recipe_id:
+        try:
+            recipe = registry.get(args.recipe_id)
+        except (KeyError, ValueError) as e:
+            parser.exit(1, f"{e}\n")
+        print("\n\n".join(block.render() for block in recipe.blocks))
+        print(f"\nneeds_research: {recipe.needs_research}")
+        return
+    errors = registry.validate_all()
+    for recipe_id in registry.ids():
+        print(f"{recipe_id}: {errors.get(recipe_id, 'ok')}")
+    if errors:
+        parser.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Full-text index of the reports saved in results/.
+
+Reports are indexed in a SQLite FTS5 table so a repeated or closely matching
+query can reuse an earlier report instead of rerunning every agent. Each
+``save_results`` adds its report; ``sync`` picks up files added, changed or
+deleted by hand, comparing modification times so only those are re-read.
+Reports are only matched against queries for the recipe they were written
+with, read from their ``Recipe:`` header line; reports without one are
+indexed but never reused.
+"""
+
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from passage_index import tokenize
+from sqlite_connections import ThreadLocalConnections
+
+DEFAULT_DB_PATH = ".cache/reports.sqlite3"
+DEFAULT_RESULTS_DIR = "results"
+
+_HEADER = re.compile(
+    r"^# Research Report: (?P<query>.*)\n(?:Generated on: (?P<generated>[^\n]*)\n)?"
+    r"(?:Recipe: (?P<recipe>[^\n]*)\n)?"
+)
+
+
+@dataclass
+class ReportMatch:
+    path: str
+    query: str
+    created_at: float
+    similarity: float
+
+    @property
+    def age_days(self):
+        return (time.time() - self.created_at) / 86400
+
+
+def query_similarity(a, b):
+    """Jaccard similarity of the content words of two queries."""
+    terms_a, terms_b = set(tokenize(a)), set(tokenize(b))
+    if not terms_a or not terms_b:
+        return 0.0
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+
+def parse_report(text):
+    """Return ``(query, created_at, recipe_id, body)`` of a saved report.
+
+    Header fields are ``None`` if absent.
+    """
+    match = _HEADER.match(text)
+    if match is None:
+        return None, None, None, text
+    created_at = None
+    if match.group("generated"):
+        try:
+            created_at = datetime.strptime(match.group("generated").strip(), "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            pass
+    recipe_id = (match.group("recipe") or "").strip() or None
+    return match.group("query").strip(), created_at, recipe_id, text[match.end():].strip()
+
+
+class ReportIndex:
+    """FTS5 index of report queries and bodies, keyed by file path."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect = ThreadLocalConnections(self.db_path)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS reports (
+                    path TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    mtime REAL NOT NULL,
+                    recipe_id TEXT
+                )"""
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+            if "recipe_id" not in columns:
+                # Indexes created before reports recorded their recipe
+                conn.execute("ALTER TABLE reports ADD COLUMN recipe_id TEXT")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5("
+                "path UNINDEXED, query, body, tokenize='porter unicode61')"
+            )
+
+    def add(self, path, query, body, created_at=None, mtime=None, recipe_id=None):
+        """Index (or re-index) the report at ``path``, written with recipe ``recipe_id``."""
+        path = str(path)
+        created_at = created_at or time.time()
+        mtime = mtime if mtime is not None else Path(path).stat().st_mtime
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM reports_fts WHERE path = ?", (path,))
+            conn.execute(
+                "INSERT OR REPLACE INTO reports (path, query, created_at, mtime, recipe_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (path, query, created_at, mtime, recipe_id),
+            )
+            conn.execute("INSERT INTO reports_fts VALUES (?, ?, ?)", (path, query, body))
+
+    def remove(self, path):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM reports_fts WHERE path = ?", (str(path),))
+            conn.execute("DELETE FROM reports WHERE path = ?", (str(path),))
+
+    def sync(self, results_dir=DEFAULT_RESULTS_DIR):
+        """Index new or modified ``*.md`` reports and forget deleted ones.
+
+        Returns the number of files (re)indexed.
+        """
+        known = dict(self._connect().execute("SELECT path, mtime FROM reports").fetchall())
+        indexed = 0
+        seen = set()
+        for path in Path(results_dir).glob("*.md"):
+            key = str(path)
+            seen.add(key)
+            mtime = path.stat().st_mtime
+            if known.get(key) == mtime:
+                continue
+            query, created_at, recipe_id, body = parse_report(path.read_text(encoding="utf-8"))
+            self.add(key, query or path.stem, body, created_at or mtime, mtime, recipe_id)
+            indexed += 1
+        for key in known.keys() - seen:
+            self.remove(key)
+        return indexed
+
+    def search(self, query, limit=5, recipe_id=None):
+        """Reports ranked by BM25 over query (weighted 10x) and body.
+
+        With ``recipe_id`` only reports written with that recipe are returned.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        rows = self._connect().execute(
+            """SELECT r.path, r.query, r.created_at
+               FROM reports_fts JOIN reports r ON r.path = reports_fts.path
+               WHERE reports_fts MATCH ? AND (? IS NULL OR r.recipe_id = ?)
+               ORDER BY bm25(reports_fts, 0.0, 10.0, 1.0)
+               LIMIT ?""",
+            (match, recipe_id, recipe_id, limit),
+        ).fetchall()
+        return [
+            ReportMatch(path, stored_query, created_at, round(query_similarity(query, stored_query), 3))
+            for path, stored_query, created_at in rows
+        ]
+
+    def best_match(self, query, recipe_id, threshold=0.6):
+        """The most similar earlier report whose query clears ``threshold``, newest on ties.
+
+        Only reports written with ``recipe_id`` are considered.
+        """
+        candidates = [
+            m for m in self.search(query, limit=20, recipe_id=recipe_id) if m.similarity >= threshold
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda m: (m.similarity, m.created_at))
+
+    def body(self, path):
+        row = self._connect().execute(
+            "SELECT body FROM reports_fts WHERE path = ?", (str(path),)
+        ).fetchone()
+        return row[0] if row else None
+
+
+def reuse_decision(match, policy="auto", max_age_days=7.0):
+    """Decide what to do with an earlier report: ``"reuse"``, ``"refresh"`` or ``"run"``.
+
+    ``auto`` reuses matches younger than ``max_age_days`` and refreshes older
+    ones (rerun with the old report as seed context); ``always`` reuses any
+    match; ``never`` always runs from scratch.
+    """
+    if match is None or policy == "never":
+        return "run"
+    if policy == "always" or match.age_days <= max_age_days:
+        return "reuse"
+    return "refresh"
@@ -0,0 +1,188 @@
+"""Turning a judge's evaluation into targeted report revisions.
+
+The judge replies with an overall assessment, per-criterion scores and
+lists of missing elements, weaknesses and suggestions. Each of those
+findings is matched to the report section it concerns and, where it is
+about missing information, to the ingredient it belongs to. A revision
+round then researches only those ingredients again and rewrites only the
+affected sections; every other section is kept byte-for-byte.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from passage_index import tokenize
+
+# Judge fields holding actionable findings, and whether they ask for facts
+# (worth new research) or only for changes to the writing
+FINDING_FIELDS = {
+    "missing_elements": True,
+    "weaknesses": True,
+    "suggestions": False,
+}
+
+_HEADING = re.compile(r"^(#{1,6})\s+\S", re.M)
+_SCORE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:/\s*10)?")
+
+
+@dataclass
+class Section:
+    heading: str
+    text: str
+    # What separated the heading from the text: "\n", or "" for the
+    # preamble and a heading on the report's last line
+    sep: str = "\n"
+
+    @property
+    def title(self):
+        return self.heading.lstrip("#").strip()
+
+
+@dataclass
+class Finding:
+    text: str
+    needs_facts: bool
+    ingredient: str | None = None
+    section: int | None = None
+
+
+@dataclass
+class RevisionPlan:
+    """Which ingredients to research again and which sections to rewrite, and why."""
+
+    findings: list = field(default_factory=list)
+
+    @property
+    def ingredients(self):
+        return list(dict.fromkeys(
+            f.ingredient for f in self.findings if f.needs_facts and f.ingredient is not None
+        ))
+
+    @property
+    def sections(self):
+        return sorted({f.section for f in self.findings if f.section is not None})
+
+    def for_section(self, index):
+        return [f for f in self.findings if f.section == index]
+
+
+def parse_score(value):
+    """Score out of 10 from ``"7/10"``, ``7`` or ``"7.5"``; ``None`` if there is none."""
+    match = _SCORE.search(str(value if value is not None else ""))
+    return float(match.group(1)) if match else None
+
+
+def judge_findings(judgement):
+    """Actionable findings from a parsed judge reply, in criterion order.
+
+    Top-level ``recommendations`` count as writing changes.
+    """
+    findings = []
+    for criterion in (judgement.get("criteria_evaluation") or {}).values():
+        if not isinstance(criterion, dict):
+            continue
+        for key, needs_facts in FINDING_FIELDS.items():
+            for item in criterion.get(key) or []:
+                findings.append(Finding(str(item), needs_facts))
+    for item in judgement.get("recommendations") or []:
+        findings.append(Finding(str(item), False))
+    seen = set()
+    return [f for f in findings if f.text.strip() and not (f.text in seen or seen.add(f.text))]
+
+
+def split_sections(report):
+    """Split a markdown report at its main heading level.
+
+    The main level is the shallowest one used at least twice, so a single
+    ``# Title`` above ``## Overview`` etc. stays in the preamble. Text before
+    the first main heading is a section with an empty heading. Sections keep
+    every byte of their slice, so ``join_sections`` returns ``report`` as is.
+    """
+    levels = [len(m.group(1)) for m in _HEADING.finditer(report)]
+    main = next((level for level in sorted(set(levels)) if levels.count(level) > 1), None)
+    if main is None:
+        return [Section("", report, "")]
+    starts = [m.start() for m in _HEADING.finditer(report) if len(m.group(1)) == main]
+    sections = []
+    if starts[0] > 0:
+        sections.append(Section("", report[:starts[0]], ""))
+    for start, end in zip(starts, starts[1:] + [len(report)]):
+        heading, sep, body = report[start:end].partition("\n")
+        sections.append(Section(heading, body, sep))
+    return sections
+
+
+def join_sections(sections):
+    return "".join(section.heading + section.sep + section.text for section in sections)
+
+
+def _overlap(terms, text):
+    return len(terms & set(tokenize(text)))
+
+
+def map_findings(findings, sections, plan):
+    """Attach each finding to its best-matching ingredient and section.
+
+    Ingredients are matched on their name and the planner's notes, sections
+    on their heading (counted twice) and text. A finding that matches no
+    section goes to the last one, where reports keep links and open gaps.
+    """
+    ingredients = [item for item in plan.get("ingredient_analysis", []) if item.get("ingredient")]
+    editable = [i for i, section in enumerate(sections) if section.heading] or list(range(len(sections)))
+    for finding in findings:
+        terms = set(tokenize(finding.text))
+        scored = [
+            (_overlap(terms, " ".join([item["ingredient"]] * 2 + [item.get("action_needed", "")])), item)
+            for item in ingredients
+        ]
+        best = max(scored, key=lambda pair: pair[0], default=(0, None))
+        if best[0] > 0 and best[1].get("status") not in ("UNSEARCHABLE", "REQUIRES_INPUT"):
+            finding.ingredient = best[1]["ingredient"]
+        query = terms | (set(tokenize(finding.ingredient)) if finding.ingredient else set())
+        scores = [
+            (2 * _overlap(query, sections[i].title) + _overlap(query, sections[i].text), i)
+            for i in editable
+        ]
+        score, index = max(scores, key=lambda pair: (pair[0], -pair[1]))
+        finding.section = index if score > 0 else editable[-1]
+    return RevisionPlan(findings)
+
+
+def section_request(section, findings, research_text):
+    """Prompt asking the report creator to rewrite one section."""
+    parts = [
+        "Revise one section of your report. Keep everything in it that is accurate "
+        "and change only what the reviewer's findings require.",
+        f"Current section:\n{section.heading}\n{section.text.strip()}",
+        "Reviewer findings for this section:\n" + "\n".join(f"- {f.text}" for f in findings),
+    ]
+    if research_text:
+        parts.append(f"New research:\n{research_text}")
+    reply_format = (
+        f"the revised section only, starting with the line `{section.heading}`"
+        if section.heading else "the revised text only"
+    )
+    parts.append(
+        "Use only verified information; state anything still unknown as an open gap. "
+        f"Reply with {reply_format}."
+    )
+    return "\n\n".join(parts)
+
+
+def clean_section(reply, section):
+    """The revised section from a reply, keeping the original heading line."""
+    text = reply.strip()
+    fence = re.match(r"^```(?:markdown|md)?\n(.*)\n```$", text, re.S)
+    if fence:
+        text = fence.group(1).strip()
+    first, _, rest = text.partition("\n")
+    if first.lstrip("#").strip().lower() == section.title.lower():
+        text = rest
+    # Keep the original whitespace around the section body; the next
+    # heading must still start on a line of its own
+    body = section.text
+    lead = body[:len(body) - len(body.lstrip())] if body.strip() else ""
+    trail = body[len(body.rstrip()):]
+    if "\n" not in trail:
+        trail += "\n"
+    return Section(section.heading, lead + text.strip() + trail, "\n" if section.heading else "")
@@ -0,0 +1,745 @@
+"""Staged research pipeline: plan -> research -> report -> judge.
+
+The Workforce lets a coordinator agent route the task between workers one
+step at a time. Here the stages run in a fixed order instead, which lets the
+research stage fan the planner's search topics out concurrently: every topic
+gets its own search call and its own research agent, and the findings are
+merged back per ingredient for the report creator.
+"""
+
+import ast
+import asyncio
+import json
+import re
+from contextlib import nullcontext
+from dataclasses import replace
+
+from agent_factory import get_search_tools, make_page_fetcher
+from checkpoints import run_stage, run_stage_async
+from model_router import estimate_complexity
+from passage_index import PassageIndex, render_passages
+from prompt_budget import compact_results, fit_content, fit_sections, truncate_to_tokens
+from report_revision import (
+    Finding,
+    RevisionPlan,
+    clean_section,
+    join_sections,
+    judge_findings,
+    map_findings,
+    parse_score,
+    section_request,
+    split_sections,
+)
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "what", "who", "how", "are",
+    "its", "their", "from", "into", "about", "any", "all", "does", "can",
+}
+
+STATUSES = ("KNOWN", "NEEDS_SEARCH", "UNSEARCHABLE", "REQUIRES_INPUT")
+
+# Placeholder the draft of a pipelined run puts where research is still due
+_PENDING = re.compile(r"\[pending:\s*([^\]\n]+?)\s*\]", re.I)
+
+
+_JSON_LITERALS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\b(true|false|null)\b')
+_PYTHON_LITERALS = {"true": "True", "false": "False", "null": "None"}
+
+
+class PlanValidationError(ValueError):
+    """The planner's output is not a usable research plan."""
+
+
+def repair_json(text):
+    """Parse the JSON object in an agent reply, fixing common slips.
+
+    Handles markdown fences and surrounding chatter, smart quotes, trailing
+    commas and Python-style literals (single quotes, True/None).
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        raise PlanValidationError("No JSON object found in agent output")
+    candidate = text[start:end + 1]
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    candidate = (
+        candidate.replace("\u201c", '"').replace("\u201d", '"')
+        .replace("\u2018", "'").replace("\u2019", "'")
+    )
+    candidate = re.sub(r",\s*([}\]])", r"\1", candidate)
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    try:
+        # JSON literals become Python ones outside string literals only
+        value = ast.literal_eval(_JSON_LITERALS.sub(
+            lambda m: _PYTHON_LITERALS[m.group(1)] if m.group(1) else m.group(0), candidate
+        ))
+    except (ValueError, SyntaxError) as e:
+        raise PlanValidationError(f"Agent output is not valid JSON: {e}") from None
+    if not isinstance(value, dict):
+        raise PlanValidationError("Agent output is not a JSON object")
+    return value
+
+
+def validate_plan(plan):
+    """Check the planner output against the expected schema and normalize it.
+
+    Statuses are upper-cased with spaces turned into underscores, and missing
+    ``research_plan`` lists default to empty. Raises ``PlanValidationError``
+    listing every problem found.
+    """
+    errors = []
+    if not isinstance(plan, dict):
+        raise PlanValidationError("Plan must be a JSON object")
+    analysis = plan.get("ingredient_analysis")
+    if not isinstance(analysis, list) or not analysis:
+        errors.append("ingredient_analysis must be a non-empty list")
+        analysis = []
+    for i, item in enumerate(analysis):
+        if not isinstance(item, dict):
+            errors.append(f"ingredient_analysis[{i}] must be an object")
+            continue
+        if not isinstance(item.get("ingredient"), str) or not item["ingredient"].strip():
+            errors.append(f"ingredient_analysis[{i}].ingredient must be a non-empty string")
+        status = str(item.get("status", "")).strip().upper().replace(" ", "_")
+        if status not in STATUSES:
+            errors.append(f"ingredient_analysis[{i}].status must be one of {', '.join(STATUSES)}")
+        item["status"] = status
+        for key in ("evidence", "action_needed"):
+            item[key] = str(item.get(key) or "")
+    research_plan = plan.setdefault("research_plan", {})
+    if not isinstance(research_plan, dict):
+        errors.append("research_plan must be an object")
+    else:
+        for key in ("known_information", "search_topics", "required_inputs"):
+            value = research_plan.setdefault(key, [])
+            if not isinstance(value, list):
+                errors.append(f"research_plan.{key} must be a list")
+    if errors:
+        raise PlanValidationError("; ".join(errors))
+    return plan
+
+
+def parse_plan(text):
+    """Repair and validate a planner reply."""
+    return validate_plan(repair_json(text))
+
+
+def ingredients_with_status(plan, status):
+    return [item for item in plan["ingredient_analysis"] if item["status"] == status]
+
+
+def needs_search(plan):
+    """Whether any ingredient is NEEDS_SEARCH, i.e. the research stage has work."""
+    return bool(ingredients_with_status(plan, "NEEDS_SEARCH"))
+
+
+def _terms(text):
+    return {
+        word for word in re.findall(r"[a-z0-9]+", str(text).lower())
+        if len(word) > 2 and word not in STOPWORDS
+    }
+
+
+def dedupe_topics(topics, threshold=0.8):
+    """Drop empty, duplicate and near-duplicate topics, keeping the first seen.
+
+    Two topics are near-duplicates when the Jaccard similarity of their
+    significant words is at least ``threshold``.
+    """
+    kept = []
+    kept_terms = []
+    for topic in topics:
+        topic = " ".join(str(topic).split())
+        terms = _terms(topic)
+        if not terms:
+            continue
+        if any(len(terms & other) / len(terms | other) >= threshold for other in kept_terms):
+            continue
+        kept.append(topic)
+        kept_terms.append(terms)
+    return kept
+
+
+def match_ingredient(topic, plan):
+    """Name of the NEEDS_SEARCH ingredient ``topic`` most likely researches."""
+    topic_terms = _terms(topic)
+    best, best_score = "General", 0
+    for item in plan.get("ingredient_analysis", []):
+        if item.get("status") != "NEEDS_SEARCH":
+            continue
+        item_terms = _terms(
+            " ".join(str(item.get(key, "")) for key in ("ingredient", "evidence", "action_needed"))
+        )
+        score = len(topic_terms & item_terms)
+        if score > best_score:
+            best, best_score = item.get("ingredient", "General"), score
+    return best
+
+
+def search_topics(plan):
+    """Deduplicated search topics from the planner's research plan.
+
+    If the planner flagged NEEDS_SEARCH ingredients but listed no topics,
+    the ingredients' own search strategies are used instead.
+    """
+    topics = plan["research_plan"]["search_topics"]
+    if not topics:
+        topics = [
+            item["action_needed"] or item["ingredient"]
+            for item in ingredients_with_status(plan, "NEEDS_SEARCH")
+        ]
+    return dedupe_topics(topics)
+
+
+async def fetch_pages(factory, fetcher, results, limit):
+    """Download the top ``limit`` result URLs; returns the pages that have text."""
+    urls = [r["url"] for r in results if isinstance(r, dict) and r.get("url")][:limit]
+    if fetcher is None or not urls:
+        return []
+    with factory.span("tool", "fetch_pages", urls=len(urls)) as span:
+        pages = await fetcher.fetch_all(urls)
+        span["errors"] = sum(1 for page in pages if "error" in page)
+    return [
+        {"url": page["url"], "title": page["title"], "text": page["text"]}
+        for page in pages if page.get("text")
+    ]
+
+
+def research_request(topic, ingredient, results, pages, budget):
+    """Prompt for one topic: compact search results plus page excerpts within ``budget``.
+
+    Excerpts are the page passages that rank best for the topic, not the
+    first paragraphs of each page.
+    """
+    results_budget = budget // 3 if budget is not None and pages else budget
+    parts = [
+        f"Research topic: {topic}",
+        f"Ingredient it supports: {ingredient}",
+        f"Search results:\n{compact_results(results, results_budget)}",
+    ]
+    if pages:
+        pages_budget = budget - results_budget if budget is not None else None
+        index = PassageIndex()
+        for page in pages:
+            index.add(page["text"], page["url"], page["title"])
+        passages = index.search(f"{topic} {ingredient}", k=20)
+        parts.append("Page excerpts:\n" + render_passages(passages, pages_budget))
+    parts.append(
+        "Summarize the verified facts for this topic with their source URLs. "
+        "Search again only if these results are insufficient."
+    )
+    return "\n\n".join(parts)
+
+
+async def research_topic(factory, topic, ingredient, semaphore, fetcher=None, page_limit=3):
+    """Search for one topic, fetch its top pages and let a dedicated research agent digest them."""
+    async with semaphore:
+        search = get_search_tools()[0]
+        try:
+            results = await asyncio.to_thread(search, topic)
+        except Exception as e:
+            results = [{"error": str(e)}]
+        pages = await fetch_pages(factory, fetcher, results, page_limit)
+        # A fresh agent per topic keeps concurrent histories apart
+        agent = factory.create("research_agent")
+        prompt = research_request(
+            topic, ingredient, results, pages, factory.specs["research_agent"].input_budget
+        )
+        response = await asyncio.to_thread(agent.step, prompt)
+        return {
+            "topic": topic,
+            "ingredient": ingredient,
+            "findings": response.msgs[0].content if response.msgs else "",
+            "sources": [r["url"] for r in results if isinstance(r, dict) and r.get("url")],
+            "snippets": [
+                {"url": r["url"], "title": r.get("title", ""), "text": r.get("description", "")}
+                for r in results if isinstance(r, dict) and r.get("url") and r.get("description")
+            ],
+            "pages": pages,
+        }
+
+
+async def run_research(factory, plan, concurrency=4, fetch_pages=3):
+    """Research every search topic concurrently, at most ``concurrency`` at a time.
+
+    The top ``fetch_pages`` results of each search are downloaded as evidence
+    over one shared HTTP pool (``0`` sends snippets only). Returns the
+    findings grouped by ingredient, in topic order.
+    """
+    if not needs_search(plan):
+        return {}
+    semaphore = asyncio.Semaphore(concurrency)
+    topics = search_topics(plan)
+    async with (make_page_fetcher() if fetch_pages else nullcontext()) as fetcher:
+        results = await asyncio.gather(*(
+            research_topic(factory, topic, match_ingredient(topic, plan), semaphore, fetcher, fetch_pages)
+            for topic in topics
+        ))
+    merged = {}
+    for result in results:
+        merged.setdefault(result["ingredient"], []).append(result)
+    return merged
+
+
+def format_research(merged, budget=None):
+    """Render merged findings as markdown for the report creator.
+
+    With a ``budget`` the findings are trimmed so that no single topic
+    takes more than its share.
+    """
+    if not merged:
+        return "No additional research was needed."
+    findings = iter(fit_sections(
+        [result["findings"] for results in merged.values() for result in results], budget
+    ))
+    sections = []
+    for ingredient, results in merged.items():
+        lines = [f"## {ingredient}"]
+        for result in results:
+            lines.append(f"### {result['topic']}\n{next(findings)}")
+            if result["sources"]:
+                lines.append("Sources: " + ", ".join(result["sources"]))
+        sections.append("\n\n".join(lines))
+    return "\n\n".join(sections)
+
+
+def format_evidence(merged, budget=None, k=4):
+    """Top ``k`` passages per ingredient from every fetched page and snippet.
+
+    All topics' evidence goes into one index, so text syndicated across
+    sources is sent once, and each ingredient is queried with its name and
+    research topics. Ingredients share ``budget`` equally.
+    """
+    index = PassageIndex()
+    for results in merged.values():
+        for result in results:
+            for doc in result.get("pages", []) + result.get("snippets", []):
+                index.add(doc["text"], doc["url"], doc["title"])
+    if not index.passages:
+        return ""
+    share = budget // len(merged) if budget is not None else None
+    sections = []
+    for ingredient, results in merged.items():
+        query = " ".join([ingredient] + [result["topic"] for result in results])
+        passages = index.search(query, k)
+        if passages:
+            sections.append(f"## {ingredient}\n{render_passages(passages, share)}")
+    if not sections:
+        return ""
+    return "Supporting Evidence (top passages per ingredient):\n\n" + "\n\n".join(sections)
+
+
+def research_for_report(merged, budget=None):
+    """Findings plus ranked evidence for the report creator; evidence gets 40% of ``budget``."""
+    evidence_budget = int(budget * 0.4) if budget is not None else None
+    evidence = format_evidence(merged, evidence_budget)
+    findings_budget = budget - evidence_budget if budget is not None and evidence else budget
+    return "\n\n".join(part for part in (format_research(merged, findings_budget), evidence) if part)
+
+
+def run_plan(factory, content):
+    """Ask the planner to classify every ingredient; returns the validated plan.
+
+    Slightly malformed JSON is repaired locally. If the reply still does not
+    validate, the planner is asked once to correct it. The invalid reply is
+    quoted in that request, since a ``task`` memory policy has already
+    dropped it from the planner's history.
+    """
+    planner = factory.get("content_classifier_agent")
+    budget = factory.specs["content_classifier_agent"].input_budget
+    content = fit_content(content, budget)
+    response = planner.step(f"Content:\n{content}")
+    reply = response.msgs[0].content
+    try:
+        return parse_plan(reply)
+    except PlanValidationError as e:
+        response = planner.step(
+            f"Your analysis could not be used: {e}.\n\n"
+            f"Your analysis:\n{truncate_to_tokens(reply or '', budget)}\n\n"
+            "Reply with only the corrected JSON object in the required OUTPUT FORMAT."
+        )
+        return parse_plan(response.msgs[0].content)
+
+
+def report_request(plan, research_text):
+    """Tell the report creator what is known, what was researched and what is missing.
+
+    The original content is already in the report creator's system prompt,
+    so only the planner's classification and the new findings are sent.
+    """
+    parts = []
+    known = ingredients_with_status(plan, "KNOWN")
+    if known:
+        parts.append("Known from the content:\n" + "\n".join(
+            f"- {item['ingredient']}: {item['evidence']}" for item in known
+        ))
+    if needs_search(plan) and research_text:
+        parts.append(f"Research Results:\n{research_text}")
+    gaps = ingredients_with_status(plan, "UNSEARCHABLE") + ingredients_with_status(plan, "REQUIRES_INPUT")
+    if gaps:
+        parts.append(
+            "Still missing (state these as open gaps, do not invent them):\n" + "\n".join(
+                f"- {item['ingredient']} ({item['status']}): {item['action_needed'] or item['evidence']}"
+                for item in gaps
+            )
+        )
+    return "\n\n".join(parts) or "All ingredients are covered by the original content."
+
+
+def run_report(factory, plan, research_text):
+    """Write the report from the plan and the research findings."""
+    report_creator = factory.get("report_creator_agent")
+    response = report_creator.step(report_request(plan, research_text))
+    return response.msgs[0].content
+
+
+def parse_judgement(judgement):
+    """The judge's reply as a dict, or ``None`` if it is not readable JSON."""
+    try:
+        return repair_json(judgement)
+    except PlanValidationError:
+        return None
+
+
+def judge_verdict(judgement):
+    """``PASS``/``NEEDS_REVISION`` from a judge reply, or ``None`` if it is unreadable."""
+    parsed = parse_judgement(judgement)
+    if parsed is None:
+        return None
+    return str(parsed.get("overall_assessment") or "").strip().upper().replace(" ", "_") or None
+
+
+def revision_done(judgement, min_score=8.0):
+    """Whether the judge passed the report or scored it at least ``min_score`` out of 10."""
+    parsed = parse_judgement(judgement)
+    if parsed is None:
+        # Nothing to act on
+        return True
+    score = parse_score(parsed.get("score"))
+    return judge_verdict(judgement) == "PASS" or (score is not None and score >= min_score)
+
+
+def run_judge(factory, report, fresh=False):
+    """Evaluate the report against the recipe and ingredients.
+
+    ``fresh`` uses a new judge instead of the cached one, so rejudging a
+    revision does not carry the earlier reports in its history.
+    """
+    judge = factory.create("judge_agent") if fresh else factory.get("judge_agent")
+    report = truncate_to_tokens(report, factory.specs["judge_agent"].input_budget)
+    response = judge.step(f"Report Content:\n{report}")
+    return response.msgs[0].content
+
+
+async def rewrite_sections(factory, sections, revision, research):
+    """Rewrite every section ``revision`` touches, concurrently and in place.
+
+    Each section gets its own findings and the research of their ingredients.
+    """
+    budget = factory.specs["report_creator_agent"].input_budget
+
+    async def rewrite(index):
+        findings = revision.for_section(index)
+        relevant = {
+            ingredient: research[ingredient]
+            for ingredient in dict.fromkeys(f.ingredient for f in findings) if ingredient in research
+        }
+        research_text = research_for_report(relevant, budget) if relevant else ""
+        # Sections are rewritten concurrently, so their tokens are not streamed
+        agent = factory.create("report_creator_agent", stream=False)
+        response = await asyncio.to_thread(
+            agent.step, section_request(sections[index], findings, research_text)
+        )
+        return index, clean_section(response.msgs[0].content, sections[index])
+
+    for index, section in await asyncio.gather(*(rewrite(i) for i in revision.sections)):
+        sections[index] = section
+    return sections
+
+
+async def revise_report(factory, plan, report, judgement, concurrency=4, fetch_pages=3,
+                        needs_research=True):
+    """One revision round: research the missing ingredients, rewrite the affected sections.
+
+    Judge findings are mapped to report sections and ingredients (see
+    ``report_revision``). Unless ``needs_research`` is false, ingredients
+    whose facts are missing are researched again with the findings as
+    search topics; affected sections are
+    rewritten concurrently by fresh report creators and the other sections
+    are kept as they are. Returns ``None`` if no finding applies to the
+    report, else the revised report, the new research and what was changed.
+    """
+    parsed = parse_judgement(judgement)
+    sections = split_sections(report)
+    revision = map_findings(judge_findings(parsed or {}), sections, plan)
+    if not revision.sections:
+        return None
+    research = {}
+    if needs_research and revision.ingredients:
+        sub_plan = {
+            "ingredient_analysis": [
+                dict(item, status="NEEDS_SEARCH") for item in plan["ingredient_analysis"]
+                if item["ingredient"] in revision.ingredients
+            ],
+            "research_plan": {"search_topics": [
+                f.text for f in revision.findings if f.needs_facts and f.ingredient is not None
+            ]},
+        }
+        research = await run_research(factory, sub_plan, concurrency, fetch_pages)
+    await rewrite_sections(factory, sections, revision, research)
+    return {
+        "report": join_sections(sections),
+        "research": research,
+        "revised_sections": [sections[i].title for i in revision.sections],
+        "researched_ingredients": revision.ingredients if needs_research else [],
+    }
+
+
+def pending_marker(ingredient):
+    return f"[pending: {ingredient}]"
+
+
+def _ingredient_key(name):
+    return " ".join(name.split()).casefold()
+
+
+def pending_sections(sections):
+    """Section indexes holding pending markers, by the (normalized) ingredient they name."""
+    marked = {}
+    for index, section in enumerate(sections):
+        for name in _PENDING.findall(section.heading + "\n" + section.text):
+            marked.setdefault(_ingredient_key(name), set()).add(index)
+    return marked
+
+
+def pending_research(topics_by_ingredient):
+    """Stand-in research text for a draft written while research is still running."""
+    return (
+        "Research is still running for the ingredients below. Write their parts from what is "
+        f"known so far and put a `{pending_marker('<ingredient>')}` marker, with the ingredient "
+        "named as listed, where each missing fact belongs; the markers are replaced when that "
+        "ingredient's research completes.\n" + "\n".join(
+            f"- {ingredient}: {'; '.join(topics)}" for ingredient, topics in topics_by_ingredient.items()
+        )
+    )
+
+
+def draft_report(factory, plan, topics_by_ingredient):
+    """First version of the report, from what the content already covers."""
+    # Sections of the draft are rewritten as research arrives, so it is not streamed
+    report_creator = factory.create("report_creator_agent", stream=False)
+    response = report_creator.step(report_request(plan, pending_research(topics_by_ingredient)))
+    return response.msgs[0].content
+
+
+def fold_finding(ingredient, action=""):
+    return Finding(
+        f"Research on {ingredient} has completed: replace every `{pending_marker(ingredient)}` "
+        "marker with the verified findings, or state the fact as an open gap if they do not "
+        f"cover it. Keep the markers of other ingredients. {action}".strip(),
+        needs_facts=True,
+        ingredient=ingredient,
+    )
+
+
+async def fold_research(factory, plan, sections, arrived):
+    """Rewrite the sections that cover the ingredients in ``arrived`` with their findings.
+
+    Besides the best-matching section of each ingredient, every section
+    holding one of its pending markers is rewritten. Returns the titles of
+    the rewritten sections.
+    """
+    actions = {item["ingredient"]: item["action_needed"] for item in plan["ingredient_analysis"]}
+    findings = [fold_finding(ingredient, actions.get(ingredient, "")) for ingredient in arrived]
+    revision = map_findings(findings, sections, plan)
+    marked = pending_sections(sections)
+    extra = []
+    for finding, ingredient in zip(findings, arrived):
+        # The findings belong to the ingredient that was researched, whatever they match
+        finding.ingredient = ingredient
+        for index in sorted(marked.get(_ingredient_key(ingredient), set()) - {finding.section}):
+            extra.append(replace(finding, section=index))
+    revision.findings.extend(extra)
+    await rewrite_sections(factory, sections, revision, arrived)
+    return [sections[i].title or "(preamble)" for i in revision.sections]
+
+
+async def clear_pending(factory, sections, research):
+    """Rewrite the sections still holding pending markers once all research is in.
+
+    Markers naming a researched ingredient get its findings; any other marker
+    is turned into an open gap. Returns the titles of the rewritten sections.
+    """
+    ingredients = {_ingredient_key(ingredient): ingredient for ingredient in research}
+    revision = RevisionPlan([
+        Finding(
+            f"All research has completed: replace every `{pending_marker(key)}` marker (in any "
+            "spelling) with the verified findings, or state the fact as an open gap.",
+            needs_facts=True,
+            ingredient=ingredients.get(key),
+            section=index,
+        )
+        for key, indexes in pending_sections(sections).items() for index in sorted(indexes)
+    ])
+    await rewrite_sections(factory, sections, revision, research)
+    return [sections[i].title or "(preamble)" for i in revision.sections]
+
+
+async def run_research_and_report(factory, plan, concurrency=4, fetch_pages=3):
+    """Draft the report while research runs, then fold findings in as they arrive.
+
+    The draft is written from the KNOWN ingredients as soon as the plan is
+    ready. Topics are researched concurrently as in ``run_research``; once
+    every topic of an ingredient is done, the sections covering it or
+    holding its pending markers are rewritten with its findings. Ingredients
+    finishing together (e.g. while the draft is still being written) are
+    folded in one pass. Sections that still hold markers after the last
+    fold, e.g. under a misspelt ingredient, are rewritten once more. Returns
+    the same research as ``run_research`` and the finished report.
+    """
+    topics_by_ingredient = {}
+    for topic in search_topics(plan):
+        topics_by_ingredient.setdefault(match_ingredient(topic, plan), []).append(topic)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with (make_page_fetcher() if fetch_pages else nullcontext()) as fetcher:
+
+        async def research_ingredient(ingredient, topics):
+            results = await asyncio.gather(*(
+                research_topic(factory, topic, ingredient, semaphore, fetcher, fetch_pages)
+                for topic in topics
+            ))
+            return ingredient, list(results)
+
+        pending = {
+            asyncio.create_task(research_ingredient(ingredient, topics))
+            for ingredient, topics in topics_by_ingredient.items()
+        }
+        research = {}
+        try:
+            with factory.span("step", "draft"):
+                draft = await asyncio.to_thread(draft_report, factory, plan, topics_by_ingredient)
+            sections = split_sections(draft)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                arrived = dict(task.result() for task in done)
+                research.update(arrived)
+                with factory.span("step", "fold", ingredients=len(arrived)) as span:
+                    rewritten = await fold_research(factory, plan, sections, arrived)
+                    span["sections"] = len(rewritten)
+                print(f"\nFolded in research on {', '.join(arrived)}: rewrote {', '.join(rewritten)}")
+            if pending_sections(sections):
+                with factory.span("step", "fold", ingredients=0) as span:
+                    rewritten = await clear_pending(factory, sections, research)
+                    span["sections"] = len(rewritten)
+                print(f"\nCleared leftover pending markers: rewrote {', '.join(rewritten)}")
+            leftover = pending_sections(sections)
+            if leftover:
+                print(f"\nStill marked pending in the report: {', '.join(sorted(leftover))}")
+        finally:
+            for task in pending:
+                task.cancel()
+    return {
+        "research": {ingredient: research[ingredient] for ingredient in topics_by_ingredient},
+        "report": join_sections(sections),
+    }
+
+
+async def run_pipeline(factory, content, concurrency=4, checkpoint=None, fetch_pages=3, router=None,
+                       max_revisions=2, min_score=8.0, needs_research=True, pipelined=False):
+    """Run all stages for ``content`` and return every stage's output.
+
+    With a ``checkpoint`` each stage's output is saved as it completes and
+    stages already saved by an earlier attempt are not rerun. With a
+    ``model_router.ModelRouter`` each agent's model is picked from the
+    run's complexity.
+
+    ``needs_research=False`` (from the recipe) skips the research stage.
+    ``pipelined`` overlaps research and report in one ``research_report``
+    stage (see ``run_research_and_report``); a run resumed after its
+    research was saved continues with the separate report stage.
+
+    Until the judge passes the report or scores it ``min_score``, up to
+    ``max_revisions`` rounds of ``revise_report`` follow, each rejudged.
+    Before the first round the router escalates the report creator and
+    judge to their strongest tier.
+    """
+    with factory.stage("plan"):
+        if router is not None:
+            router.route(factory, ["content_classifier_agent"], estimate_complexity(content))
+        plan = await asyncio.to_thread(run_stage, checkpoint, "plan", run_plan, factory, content)
+    if router is not None:
+        complexity = estimate_complexity(content, plan)
+    overlap = (
+        pipelined and needs_research and needs_search(plan)
+        and not (checkpoint is not None and checkpoint.completed("research"))
+    )
+    if overlap:
+        with factory.stage("research_report"):
+            if router is not None:
+                router.route(factory, ["research_agent", "report_creator_agent", "judge_agent"], complexity)
+            outputs = await run_research_and_report(factory, plan, concurrency, fetch_pages)
+            research, report = outputs["research"], outputs["report"]
+            if checkpoint is not None:
+                checkpoint.save("research", research)
+                checkpoint.save("report", report)
+    else:
+        with factory.stage("research"):
+            if router is not None:
+                router.route(factory, ["research_agent", "report_creator_agent", "judge_agent"], complexity)
+            if needs_research:
+                research = await run_stage_async(
+                    checkpoint, "research", run_research, factory, plan, concurrency, fetch_pages,
+                )
+            else:
+                # The recipe's content describes itself; nothing is searched
+                research = {}
+                if checkpoint is not None and not checkpoint.completed("research"):
+                    checkpoint.save("research", research)
+        with factory.stage("report"):
+            report = await asyncio.to_thread(
+                run_stage, checkpoint, "report", run_report, factory, plan,
+                research_for_report(research, factory.specs["report_creator_agent"].input_budget),
+            )
+    with factory.stage("judge"):
+        judgement = await asyncio.to_thread(run_stage, checkpoint, "judge", run_judge, factory, report)
+    revisions = []
+    for round_number in range(1, max_revisions + 1):
+        if revision_done(judgement, min_score):
+            break
+        if round_number == 1 and router is not None:
+            router.escalate(factory, ["report_creator_agent", "judge_agent"], complexity)
+        stage = f"revision_{round_number}"
+        with factory.stage(stage):
+            revised = await run_stage_async(
+                checkpoint, stage, revise_report, factory, plan, report, judgement,
+                concurrency, fetch_pages, needs_research,
+            )
+        if revised is None:
+            break
+        print(
+            f"\nRevision {round_number}: rewrote {', '.join(revised['revised_sections'])}"
+            + (f"; researched {', '.join(revised['researched_ingredients'])}"
+               if revised["researched_ingredients"] else "")
+        )
+        report = revised["report"]
+        for ingredient, results in revised["research"].items():
+            research.setdefault(ingredient, []).extend(results)
+        revisions.append(revised)
+        with factory.stage(f"judge_{round_number}"):
+            judgement = await asyncio.to_thread(
+                run_stage, checkpoint, f"judge_{round_number}", run_judge, factory, report, True
+            )
+    return {
+        "plan": plan,
+        "research": research,
+        "report": report,
+        "judgement": judgement,
+        "revisions": revisions,
+        "routing": router.decisions if router is not None else [],
+    }
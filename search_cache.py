@@ -0,0 +1,175 @@
+"""Persistent cache in front of the search tools.
+
+Entries live in a SQLite database inside the cache directory, so several
+processes can share one directory safely: SQLite serialises the writers and
+readers never see a half-written entry. Each entry has its own expiry time,
+and the least recently used entries are evicted once the cache grows past
+``max_bytes``.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from sqlite_connections import ThreadLocalConnections
+
+DEFAULT_CACHE_DIR = ".cache/search"
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class CacheMissError(LookupError):
+    """Raised by strict (offline replay) caches when an entry is missing."""
+
+
+def normalize_query(query):
+    """Lower-case and collapse whitespace so trivially different queries share an entry."""
+    return " ".join(str(query).lower().split())
+
+
+def make_key(tool_name, query, params=None):
+    """Stable cache key for a tool call with a normalized query and its parameters."""
+    payload = json.dumps(
+        {"tool": tool_name, "query": normalize_query(query), "params": params or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """TTL-bounded, size-bounded LRU cache stored in SQLite."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.cache_dir / "search.sqlite3"
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connect = ThreadLocalConnections(self.path, pragmas=("synchronous=NORMAL",))
+        self._counter_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, allow_expired=False):
+        """Return the cached value for ``key`` or ``None`` if missing or expired.
+
+        ``allow_expired`` serves entries past their TTL that have not been
+        evicted yet, which replaying a recorded run relies on.
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] <= now and not allow_expired):
+                self._count(hit=False)
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        self._count(hit=True)
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Store ``value`` for ``ttl`` seconds (the cache default if ``None``)."""
+        now = time.time()
+        data = json.dumps(value)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now + (self.ttl if ttl is None else ttl), now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        # Expired entries are kept (for replay) until space is needed
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current cache size."""
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+def cached_tool(func, cache, ttl=None, strict=False):
+    """Wrap a search tool so repeated queries are answered from ``cache``.
+
+    The wrapper keeps the tool's name, signature and docstring, which camel
+    uses to build the tool schema. Failed searches are not cached. With
+    ``strict`` the tool never goes to the network: expired entries are still
+    served and a miss raises ``CacheMissError``.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        query = params.pop("query")
+        key = make_key(func.__name__, query, params)
+        result = cache.get(key, allow_expired=strict)
+        if result is not None:
+            return result
+        if strict:
+            raise CacheMissError(f"No cached {func.__name__} result for {query!r}")
+        result = func(*args, **kwargs)
+        if result and not any(isinstance(item, dict) and "error" in item for item in result):
+            cache.set(key, result, ttl=ttl)
+        return result
+
+    return wrapper
+
+
+def cache_from_env():
+    """Build a ``SearchCache`` from ``SEARCH_CACHE_*`` env vars, or ``None`` if disabled."""
+    if os.getenv("SEARCH_CACHE", "1").lower() in ("0", "false", "off"):
+        return None
+    return SearchCache(
+        cache_dir=os.getenv("SEARCH_CACHE_DIR", DEFAULT_CACHE_DIR),
+        ttl=float(os.getenv("SEARCH_CACHE_TTL", DEFAULT_TTL)),
+        max_bytes=int(float(os.getenv("SEARCH_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+    )
@@ -0,0 +1,434 @@
+"""Long-running HTTP service for research queries.
+
+    python service.py --port 8000 --workers 4
+    curl -X POST localhost:8000/jobs -d '{"query": "What is CAMEL-AI?"}'
+    curl -N localhost:8000/jobs/<job_id>/events
+
+The process stays up with camel imported, the recipes compiled and the
+model clients, search tools and report index built once, so a job only
+pays for constructing its agents and for its own model and search calls.
+Jobs wait in a bounded queue (a full queue answers 503) and a pool of
+workers runs them through ``socrates.py``'s staged pipeline, each with its
+own agents, checkpoint and trace. Stage progress and report tokens are streamed as Server-Sent
+Events; every job keeps its events, so a client that subscribes late still
+gets the whole stream. Reports are saved with ``socrates.save_results``
+like CLI runs.
+
+Only asyncio streams are used, no web framework. ``--fake`` serves from
+``fake_backends`` so the service can be exercised without network or keys.
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from agent_memory import memory_stats
+from checkpoints import RunCheckpoint, new_run_id
+
+MAX_BODY_BYTES = 1024 * 1024
+KEEPALIVE_S = 15
+FINAL_STATUSES = ("ok", "reused", "error")
+REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Job:
+    """One submitted query and everything streamed about it so far."""
+
+    id: str
+    query: str
+    reuse: str = "auto"
+    max_age_days: float = 7.0
+    workforce: bool = False
+    recipe_id: str | None = None
+    status: str = "queued"
+    stage: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    report_path: str | None = None
+    error: str | None = None
+    totals: dict = field(default_factory=dict)
+    events: list = field(default_factory=list, repr=False)
+    subscribers: set = field(default_factory=set, repr=False)
+
+    @property
+    def done(self):
+        return self.status in FINAL_STATUSES
+
+    def publish(self, event, data):
+        """Record an event and hand it to every subscriber; call on the event loop."""
+        if event == "stage" and data["event"] == "start":
+            self.stage = data["stage"]
+        self.events.append((event, data))
+        for queue in self.subscribers:
+            queue.put_nowait((event, data))
+
+    def summary(self):
+        return {
+            "job_id": self.id,
+            "query": self.query,
+            "recipe_id": self.recipe_id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "report_path": self.report_path,
+            "error": self.error,
+            **self.totals,
+        }
+
+
+def parse_job(body):
+    """Validate a ``POST /jobs`` body into ``Job`` keyword arguments."""
+    try:
+        payload = json.loads(body or b"{}")
+    except json.JSONDecodeError as e:
+        raise HTTPError(400, f"Body is not valid JSON: {e}") from None
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    query = payload.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise HTTPError(400, "query must be a non-empty string")
+    reuse = payload.get("reuse", "auto")
+    if reuse not in ("auto", "always", "never"):
+        raise HTTPError(400, "reuse must be auto, always or never")
+    try:
+        max_age_days = float(payload.get("max_age_days", 7.0))
+    except (TypeError, ValueError):
+        raise HTTPError(400, "max_age_days must be a number") from None
+    recipe_id = payload.get("recipe_id")
+    if recipe_id is not None:
+        from recipes import get_recipe_registry
+
+        try:
+            get_recipe_registry().get(recipe_id)
+        except (KeyError, ValueError) as e:
+            raise HTTPError(400, f"recipe_id: {e}") from None
+    return {
+        "query": query.strip(),
+        "reuse": reuse,
+        "max_age_days": max_age_days,
+        "workforce": bool(payload.get("workforce", False)),
+        "recipe_id": recipe_id,
+    }
+
+
+async def read_request(reader):
+    """Read one HTTP/1.1 request; returns ``(method, path, body)``."""
+    request_line = await reader.readline()
+    if not request_line:
+        raise ConnectionResetError("client closed the connection")
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= 100:
+            raise HTTPError(400, "Too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path.rstrip("/") or "/", body
+
+
+def response_head(status, content_type, extra_headers=None, length=None):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    lines += [f"{name}: {value}" for name, value in (extra_headers or {}).items()]
+    lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send_json(writer, status, payload, extra_headers=None):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(response_head(status, "application/json", extra_headers, len(body)) + body)
+    await writer.drain()
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def warm_up():
+    """Import camel and build what jobs share: recipe specs, model clients, search tools, index.
+
+    Agents are not shared; every job builds its own so their histories
+    never mix.
+    """
+    from camel.agents import ChatAgent  # noqa: F401
+    from agent_factory import create_model, get_search_tools
+    from recipes import get_recipe_registry
+    from socrates import agent_specs_for, get_report_index
+
+    get_search_tools()
+    get_report_index()
+    registry = get_recipe_registry()
+    errors = registry.validate_all()
+    model_types = set()
+    for recipe_id in registry.ids():
+        if recipe_id in errors:
+            print(f"Skipping recipe {recipe_id}: {errors[recipe_id]}")
+        else:
+            model_types.update(spec.model_type for spec in agent_specs_for(recipe_id).values())
+    # Creates the pooled HTTP clients and loads the tokenizers
+    for model_type in sorted(model_types):
+        create_model(model_type).token_counter
+
+
+class ResearchService:
+    """Bounded job queue, worker pool and the HTTP handler in front of them.
+
+    Args:
+        workers: Jobs run at the same time.
+        queue_size: Jobs allowed to wait; more are refused with 503.
+        max_jobs: Finished jobs kept for ``GET /jobs`` and late subscribers.
+    """
+
+    def __init__(self, workers=4, queue_size=32, max_jobs=1000):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.running = 0
+        self.completed = 0
+        self.started_at = time.time()
+        self._queue = None
+        self._tasks = []
+
+    async def start(self, host="127.0.0.1", port=8000):
+        """Warm up, start the workers and listen; returns the ``asyncio.Server``."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        # Each job holds a worker thread for its whole run, plus short helper calls
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers * 2 + 4))
+        await asyncio.to_thread(warm_up)
+        self._queue = asyncio.Queue(self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return await asyncio.start_server(self.handle, host, port)
+
+    def submit(self, **job_fields):
+        """Queue a job; raises ``asyncio.QueueFull`` when the queue is at capacity."""
+        job = Job(id=new_run_id(), **job_fields)
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        job.publish("status", {"status": job.status})
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.running += 1
+            try:
+                await self._run(job)
+            finally:
+                self.running -= 1
+                self.completed += 1
+                self._prune()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    async def _run(self, job):
+        from socrates import _run_query_in_thread, prior_report, results_path, save_results
+        from tracing import Tracer
+
+        loop = asyncio.get_running_loop()
+
+        def publish(event, data):
+            # Called from the job's worker thread
+            loop.call_soon_threadsafe(job.publish, event, data)
+
+        def on_span(event, span):
+            if span["kind"] == "stage":
+                data = {"stage": span["name"], "event": event}
+                if event == "end":
+                    data.update(status=span["status"], duration_s=span["duration_s"])
+                publish("stage", data)
+
+        job.status, job.started_at = "running", time.time()
+        job.publish("status", {"status": job.status})
+        try:
+            decision, match, seed = await asyncio.to_thread(
+                prior_report, job.query, job.reuse, job.max_age_days, job.recipe_id
+            )
+            if decision == "reuse":
+                job.status, job.report_path = "reused", match.path
+                return
+            checkpoint = None if job.workforce else RunCheckpoint(job.id)
+            if checkpoint is not None:
+                checkpoint.save_inputs(query=job.query, seed=seed, recipe_id=job.recipe_id)
+            tracer = Tracer(job.id, on_span=on_span)
+            stream_to = {"report_creator": lambda token: publish("token", {"text": token})}
+            try:
+                result = await asyncio.to_thread(
+                    _run_query_in_thread, job.query, checkpoint, job.workforce, tracer, seed, stream_to,
+                    job.recipe_id,
+                )
+            finally:
+                job.totals = {**tracer.totals(), "trace_path": str(tracer.path)}
+            filepath = await asyncio.to_thread(
+                save_results, job.query, result, results_path(job.query, job.id), job.recipe_id
+            )
+            job.status, job.report_path = "ok", str(filepath)
+        except Exception as e:
+            from rate_limiter import describe_error
+
+            job.status, job.error = "error", describe_error(e)
+        finally:
+            job.finished_at = time.time()
+            job.publish("done", job.summary())
+
+    async def handle(self, reader, writer):
+        """Serve one request on its own connection."""
+        try:
+            method, path, body = await read_request(reader)
+            await self.route(method, path, body, writer)
+        except HTTPError as e:
+            await send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body, writer):
+        parts = path.strip("/").split("/")
+        if path == "/health":
+            return await send_json(writer, 200, self.health())
+        if parts[0] != "jobs":
+            raise HTTPError(404, f"No route for {path}")
+        if len(parts) == 1:
+            if method == "POST":
+                try:
+                    job = self.submit(**parse_job(body))
+                except asyncio.QueueFull:
+                    raise HTTPError(503, "Job queue is full, retry later") from None
+                return await send_json(writer, 202, {
+                    **job.summary(), "events_url": f"/jobs/{job.id}/events",
+                })
+            if method == "GET":
+                return await send_json(writer, 200, {"jobs": [job.summary() for job in self.jobs.values()]})
+            raise HTTPError(405, f"{method} not allowed on /jobs")
+        job = self.jobs.get(parts[1])
+        if job is None:
+            raise HTTPError(404, f"No job {parts[1]}")
+        if method != "GET":
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        if len(parts) == 2:
+            return await send_json(writer, 200, job.summary())
+        if len(parts) == 3 and parts[2] == "events":
+            return await self.stream_events(job, writer)
+        raise HTTPError(404, f"No route for {path}")
+
+    async def stream_events(self, job, writer):
+        """Send ``job``'s events so far, then new ones as they happen, until ``done``."""
+        writer.write(response_head(200, "text/event-stream", {"Cache-Control": "no-cache"}))
+        queue = asyncio.Queue()
+        history = list(job.events)
+        # No await between copying the history and subscribing, so nothing is missed
+        if not job.done:
+            job.subscribers.add(queue)
+        try:
+            for event, data in history:
+                writer.write(sse(event, data))
+            await writer.drain()
+            if job.done:
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                else:
+                    writer.write(sse(event, data))
+                await writer.drain()
+                if event == "done":
+                    return
+        finally:
+            job.subscribers.discard(queue)
+
+    def health(self):
+        uptime = time.time() - self.started_at
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "completed": self.completed,
+            "uptime_s": round(uptime, 1),
+            "memory": memory_stats(),
+        }
+
+
+async def serve(args):
+    service = ResearchService(args.workers, args.queue_size)
+    print("Warming up...")
+    server = await service.start(args.host, args.port)
+    print(f"Research service listening on http://{args.host}:{args.port} "
+          f"({args.workers} workers, queue of {args.queue_size})")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    from agent_factory import add_backend_arguments, set_memory_policy, setup_backends
+
+    parser = argparse.ArgumentParser(description='HTTP service running research queries as background jobs')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='Interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='Port to listen on (default: 8000)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Jobs run at the same time (default: 4)')
+    parser.add_argument('--queue-size', type=int, default=32,
+                        help='Jobs allowed to wait before submissions get 503 (default: 32)')
+    add_backend_arguments(parser, fake=True)
+    args = parser.parse_args()
+    if args.workers < 1 or args.queue_size < 1:
+        parser.error("--workers and --queue-size must be at least 1")
+
+    try:
+        set_memory_policy(args.memory)
+    except ValueError as e:
+        parser.error(f"--memory: {e}")
+
+    setup_backends(args.llm_cache, args.fake,
+                   fake_options=dict(model_latency=0.05, tokens_per_second=200))
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
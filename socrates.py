@@ -1,74 +1,37 @@
-"""Import Dependencies & Set up AsyncIO"""
+"""Import Dependencies
 
-from camel.agents.chat_agent import ChatAgent
-from camel.configs.openai_config import ChatGPTConfig
-from camel.messages.base import BaseMessage
-from camel.models import ModelFactory
-from camel.tasks.task import Task
-from camel.toolkits import SearchToolkit
-from camel.types import ModelPlatformType, ModelType
-from camel.societies.workforce import Workforce
-
-import nest_asyncio
-nest_asyncio.apply()
+camel is imported lazily (see agent_factory.py) so ``--help`` and argument
+errors return immediately.
+"""
 
 import os
+import json
+import time
+import asyncio
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from getpass import getpass
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Verify API keys are loaded
-if not os.getenv("OPENAI_API_KEY"):
-    raise ValueError("Please set OPENAI_API_KEY in your .env file")
-
-if not os.getenv("GOOGLE_API_KEY") or not os.getenv("SEARCH_ENGINE_ID"):
-    raise ValueError("Please set GOOGLE_API_KEY and SEARCH_ENGINE_ID in your .env file")
-
-# Initialize search toolkit with Google
-search_toolkit = SearchToolkit()
-search_tools = [
-    search_toolkit.search_google
-]
-
-# Socratic Research Recipe
-recipe = """Socratic Research Methodology:
-
-1. Hypothesis Formulation
-   - Initial proposition generation
-   - Counterargument anticipation
-   - Knowledge domain mapping
-
-2. Elenchus (Cross-Examination)
-   - Premise validation through:
-     * Source credibility checks
-     * Logical consistency analysis
-     * Empirical evidence matching
-
-3. Aporia (Puzzle State)
-   - Identify contradictions/paradoxes
-   - Map knowledge boundaries
-   - Highlight cognitive biases
-
-4. Metanoia (Perspective Shift)
-   - Alternative interpretations
-   - Paradigm challenge exercises
-   - Cross-domain analogies
-
-5. Episteme (Verified Knowledge)
-   - Evidence-graded conclusions
-   - Confidence interval assessment
-   - Open questions/research avenues"""
-
-# Universal Research Planner Agent
-research_planner = ChatAgent(
-    system_message=BaseMessage.make_assistant_message(
-        role_name="Universal Research Planner",
-        content="""You are a Research Framework Builder that can analyze any query and create an investigation plan:
+
+from agent_factory import (
+    AgentFactory,
+    AgentSpec,
+    add_backend_arguments,
+    print_cache_stats,
+    set_memory_policy,
+    setup_backends,
+    workforce_kwargs,
+)
+from agent_memory import format_memory_stats
+from checkpoints import RunCheckpoint, new_run_id, run_stage
+from prompt_budget import compose, truncate_to_tokens
+from recipes import get_recipe_registry
+
+# Report format, from recipes/<recipe_id>.json
+DEFAULT_RECIPE = "socratic"
+
+# Universal Research Planner Agent prompt
+research_planner_prompt = """You are a Research Framework Builder that can analyze any query and create an investigation plan:
 
         YOUR PROCESS:
         1. Query Analysis
@@ -95,39 +58,18 @@ research_planner = ChatAgent(
 
         OUTPUT:
         Provide a structured research plan following the Socratic method stages."""
-    ),
-    model=ModelFactory.create(
-        model_platform=ModelPlatformType.OPENAI,
-        model_type=ModelType.O3_MINI,
-        model_config_dict=ChatGPTConfig().as_dict()
-    )
-)
 
-# Research Agent
-research_agent = ChatAgent(
-    system_message=BaseMessage.make_assistant_message(
-        role_name="Universal Researcher",
-        content="""Execute research plans using available tools and critical thinking:
+# Research Agent prompt
+research_agent_prompt = """Execute research plans using available tools and critical thinking:
         
         1. Follow the Socratic method stages
         2. Verify information across multiple sources
         3. Document evidence and reasoning chains
         4. Identify potential biases and limitations
         """
-    ),
-    model=ModelFactory.create(
-        model_platform=ModelPlatformType.OPENAI,
-        model_type=ModelType.GPT_4O,
-        model_config_dict=ChatGPTConfig().as_dict()
-    ),
-    tools=search_tools
-)
 
-# Report Creator Agent
-report_creator = ChatAgent(
-    system_message=BaseMessage.make_assistant_message(
-        role_name="Report Synthesizer",
-        content=f"""Create comprehensive research reports following this recipe:
+# Report Creator Agent prompt, filled in once per recipe
+report_creator_template = """Create comprehensive research reports following this recipe:
         {recipe}
         
         Ensure:
@@ -136,88 +78,530 @@ report_creator = ChatAgent(
         3. Balanced perspective presentation
         4. Acknowledgment of limitations
         """
-    ),
-    model=ModelFactory.create(
-        model_platform=ModelPlatformType.OPENAI,
-        model_type=ModelType.GPT_4O,
-        model_config_dict=ChatGPTConfig().as_dict()
+
+def build_agent_specs(recipe):
+    """Agent specs for ``recipe``, compiled once per recipe by the registry."""
+    report_creator_prompt = report_creator_template.format(recipe=recipe.recipe)
+    extra_blocks = recipe.ingredient_blocks + recipe.format_blocks[1:]
+    if extra_blocks:
+        report_creator_prompt = compose(report_creator_prompt, *extra_blocks)
+    return {
+        "research_planner": AgentSpec(
+            role_name="Universal Research Planner",
+            system_prompt=research_planner_prompt,
+            model_type="O3_MINI"
+        ),
+        "research_agent": AgentSpec(
+            role_name="Universal Researcher",
+            system_prompt=research_agent_prompt,
+            model_type="GPT_4O",
+            use_search=True,
+            input_budget=4000
+        ),
+        "report_creator": AgentSpec(
+            role_name="Report Synthesizer",
+            system_prompt=report_creator_prompt,
+            model_type="GPT_4O",
+            input_budget=8000
+        ),
+    }
+
+def agent_specs_for(recipe_id=None):
+    """The compiled agent specs of ``recipe_id`` (default: ``DEFAULT_RECIPE``)."""
+    return get_recipe_registry().compile(recipe_id or DEFAULT_RECIPE, build_agent_specs)
+
+# Estimated tokens of an earlier report passed as seed context on refresh
+SEED_BUDGET = 3000
+
+def build_agents(stream_to=None, tracer=None, recipe_id=None):
+    """Create a fresh agent factory for recipe ``recipe_id``.
+
+    Every query gets its own factory so conversation histories never leak
+    between queries running side by side. ``stream_to`` maps agent names to
+    token callbacks and ``tracer`` records every step (see ``AgentFactory``).
+    The specs are compiled once per recipe and shared.
+    """
+    return AgentFactory(agent_specs_for(recipe_id), stream_to=stream_to, tracer=tracer)
+
+def build_tracer(run_id=None):
+    """Tracer writing to traces/<run_id>.jsonl."""
+    from tracing import Tracer
+
+    return Tracer(run_id or new_run_id())
+
+def build_workforce(agents):
+    """Wire the three agents into a Workforce in processing order."""
+    from camel.societies.workforce import Workforce
+
+    workforce = Workforce("Universal Research Team", **workforce_kwargs(agents.tracer))
+
+    # Add agents sequentially
+    workforce.add_single_agent_worker(
+        "Research Planner Agent",
+        worker=agents["research_planner"]
+    ).add_single_agent_worker(
+        "Research Agent",
+        worker=agents["research_agent"]
+    ).add_single_agent_worker(
+        "Report Creator Agent",
+        worker=agents["report_creator"]
     )
-)
+    return workforce
 
-def save_results(query, result):
-    # Create .results directory if it doesn't exist
+def run_workforce(query, agents, seed=None):
+    """Let a camel Workforce route the query between the agents."""
+    from camel.tasks.task import Task
+
+    workforce = build_workforce(agents)
+
+    # Create and process task
+    task = Task(
+        content=query,
+        additional_info=seed,
+        id="research_task"
+    )
+    return workforce.process_task(task).result
+
+def with_seed(request, seed):
+    return f"{request}\n\n{seed}" if seed else request
+
+def plan_stage(query, agents, seed=None):
+    response = agents["research_planner"].step(with_seed(f"Research query: {query}", seed))
+    return response.msgs[0].content
+
+def research_stage(query, plan, agents, seed=None):
+    plan = truncate_to_tokens(plan, agents.specs["research_agent"].input_budget)
+    response = agents["research_agent"].step(with_seed(
+        f"Research query: {query}\n\nResearch plan:\n{plan}\n\n"
+        "Execute this research plan.", seed
+    ))
+    return response.msgs[0].content
+
+def report_stage(query, plan, research, agents):
+    # The plan is the stable part of the request, the findings get the budget
+    research = truncate_to_tokens(research, agents.specs["report_creator"].input_budget)
+    findings = f"Research findings:\n{research}\n\n" if research else ""
+    response = agents["report_creator"].step(
+        f"Research query: {query}\n\nResearch plan:\n{plan}\n\n"
+        f"{findings}Write the final research report."
+    )
+    return response.msgs[0].content
+
+def traced_stage(agents, checkpoint, stage, fn, *args):
+    """``run_stage`` inside a stage span of the agents' tracer, if any."""
+    with agents.stage(stage):
+        return run_stage(checkpoint, stage, fn, *args)
+
+def run_stages(query, agents, checkpoint=None, seed=None, needs_research=True):
+    """Plan, research and report as separate stages, checkpointing each one.
+
+    ``needs_research=False`` (from the recipe) skips the research stage.
+    """
+    plan = traced_stage(agents, checkpoint, "plan", plan_stage, query, agents, seed)
+    if needs_research:
+        research = traced_stage(
+            agents, checkpoint, "research", research_stage, query, plan, agents, seed
+        )
+    else:
+        # The recipe's query describes itself; nothing is searched
+        research = ""
+        if checkpoint is not None and not checkpoint.completed("research"):
+            checkpoint.save("research", research)
+    return traced_stage(agents, checkpoint, "report", report_stage, query, plan, research, agents)
+
+def run_query(query, agents=None, checkpoint=None, use_workforce=False, seed=None,
+              needs_research=True):
+    """Run one research query to completion and return the report.
+
+    Each query gets its own agents unless ``agents`` is given. Stage outputs
+    are saved to ``checkpoint`` (if any) so a failed run can resume; the
+    Workforce route is a single opaque step and is not checkpointed.
+    ``seed`` is context from an earlier report being refreshed, and
+    ``needs_research`` comes from the recipe (see ``run_stages``).
+    """
+    agents = agents or build_agents()
+    if use_workforce:
+        return run_workforce(query, agents, seed)
+    return run_stages(query, agents, checkpoint, seed, needs_research)
+
+_report_index = None
+
+def get_report_index():
+    """The index of saved reports, synced with results/ on first use."""
+    global _report_index
+    if _report_index is None:
+        from report_index import ReportIndex
+
+        _report_index = ReportIndex()
+        _report_index.sync()
+    return _report_index
+
+def index_report(filepath, query, result, recipe_id=None):
+    """Add a saved report to the index; a failure only costs future reuse."""
+    import sqlite3
+
+    try:
+        get_report_index().add(filepath, query, result, recipe_id=recipe_id or DEFAULT_RECIPE)
+    except sqlite3.Error as e:
+        print(f"Could not index {filepath}: {e}")
+
+def prior_report(query, policy="auto", max_age_days=7.0, recipe_id=None):
+    """Look ``query`` up among the reports saved for recipe ``recipe_id``.
+
+    Returns ``(decision, match, seed)``: ``decision`` is ``"reuse"``,
+    ``"refresh"`` or ``"run"`` (see ``report_index.reuse_decision``) and
+    ``seed`` is the earlier report as context for a refresh. A replay of
+    recorded LLM calls always runs: reusing the recorded run's own report
+    would skip the pipeline, and a refresh seed would miss every recording.
+    """
+    from agent_factory import replaying
+    from report_index import reuse_decision
+
+    if policy == "never" or replaying():
+        return "run", None, None
+    index = get_report_index()
+    match = index.best_match(query, recipe_id or DEFAULT_RECIPE)
+    decision = reuse_decision(match, policy, max_age_days)
+    seed = None
+    if decision == "refresh":
+        created = datetime.fromtimestamp(match.created_at).strftime("%Y-%m-%d")
+        seed = (
+            f"An earlier report on a similar query (\"{match.query}\", {created}) follows. "
+            "Keep what still holds, verify claims that may have changed, and search "
+            "only for what is missing or outdated.\n\n"
+            + truncate_to_tokens(index.body(match.path) or "", SEED_BUDGET)
+        )
+    return decision, match, seed
+
+def results_path(query, prefix=None):
+    """Markdown path under results/ for ``query``, prefixed with a timestamp.
+
+    A fixed ``prefix`` (e.g. a job ID) gives the same path on every call,
+    so a retried job overwrites its own report instead of adding another.
+    """
     results_dir = Path("results")
-    results_dir.mkdir(exist_ok=True)
 
     # Create filename with timestamp and sanitized query
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    prefix = "".join(c for c in prefix if c.isalnum() or c in ('-', '_')) if prefix else None
+    prefix = prefix or datetime.now().strftime("%Y%m%d_%H%M%S")
     # Sanitize query for filename (remove special chars, limit length)
     safe_query = "".join(c for c in query if c.isalnum() or c in (' ', '-', '_'))[:50]
     safe_query = safe_query.replace(' ', '_')
     
-    filename = f"{timestamp}_{safe_query}.md"
-    filepath = results_dir / filename
+    filename = f"{prefix}_{safe_query}.md"
+    return results_dir / filename
 
-    # Create markdown content
-    markdown_content = f"""# Research Report: {query}
+def report_header(query, recipe_id=None):
+    return f"""# Research Report: {query}
 Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Recipe: {recipe_id or DEFAULT_RECIPE}
 
-{result}
 """
 
-    # Save to file
-    with open(filepath, "w", encoding="utf-8") as f:
+def save_results(query, result, filepath=None, recipe_id=None):
+    filepath = Path(filepath) if filepath is not None else results_path(query)
+    # Create .results directory if it doesn't exist
+    filepath.parent.mkdir(exist_ok=True)
+
+    # Create markdown content
+    markdown_content = f"""{report_header(query, recipe_id)}{result}
+"""
+
+    # Write then rename, so a crash never leaves a truncated report behind
+    tmp_path = filepath.with_name(filepath.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(markdown_content)
-    
+    os.replace(tmp_path, filepath)
+
+    index_report(filepath, query, result, recipe_id)
     return filepath
 
+def load_batch(path):
+    """Read research queries from a JSONL file.
+
+    Each line is a JSON object with a ``query`` (``content`` or ``title``
+    are accepted as fallbacks), an optional ``id``/``request_id`` and an
+    optional ``recipe_id``. Returns ``(id, query, recipe_id)`` tuples;
+    blank lines are skipped.
+    """
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            query = record.get("query") or record.get("content") or record.get("title")
+            if not query:
+                raise ValueError(f"{path}:{line_no} has no query")
+            query_id = record.get("id", record.get("request_id", line_no))
+            queries.append((str(query_id), query, record.get("recipe_id")))
+    return queries
+
+def _run_query_in_thread(query, checkpoint, use_workforce, tracer=None, seed=None, stream_to=None,
+                         recipe_id=None):
+    import nest_asyncio
+
+    # Workforce.process_task drives its own event loop, so each worker
+    # thread needs a loop of its own.
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    nest_asyncio.apply(loop)
+    try:
+        return run_query(
+            query, build_agents(stream_to, tracer, recipe_id), checkpoint, use_workforce, seed,
+            get_recipe_registry().get(recipe_id or DEFAULT_RECIPE).needs_research,
+        )
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+async def run_batch(path, concurrency=4, summary_path=None, use_workforce=False,
+                    reuse="auto", max_age_days=7.0, recipe_id=None):
+    """Run every query in ``path`` with at most ``concurrency`` in flight.
+
+    Reports are saved as soon as each query finishes and one JSON line per
+    query (status, timings, tokens and cost) is appended to ``summary_path``.
+    Each query checkpoints and traces under the run ID
+    ``<batch file stem>-<query id>``, so rerunning an interrupted batch
+    skips the stages already done. Queries matching a saved report follow
+    the ``reuse`` policy (see ``prior_report``). A query's own
+    ``recipe_id`` takes precedence over ``recipe_id``.
+    """
+    queries = [
+        (query_id, query, query_recipe or recipe_id or DEFAULT_RECIPE)
+        for query_id, query, query_recipe in load_batch(path)
+    ]
+    # Fail before any work on a missing or invalid recipe
+    for recipe in {recipe for _, _, recipe in queries}:
+        get_recipe_registry().get(recipe)
+    if summary_path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        summary_path = Path("results") / f"{timestamp}_batch_summary.jsonl"
+    summary_path = Path(summary_path)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # asyncio.to_thread's default executor has min(32, cpus + 4) threads,
+    # which would silently cap --concurrency.
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="query")
+    loop = asyncio.get_running_loop()
+    batch_started = time.perf_counter()
+
+    with executor, open(summary_path, "a", encoding="utf-8") as summary:
+
+        async def worker(query_id, query, recipe):
+            async with semaphore:
+                record = {
+                    "id": query_id,
+                    "query": query,
+                    "recipe_id": recipe,
+                    "started_at": datetime.now().isoformat(timespec="seconds"),
+                }
+                started = time.perf_counter()
+                decision, match, seed = prior_report(query, reuse, max_age_days, recipe)
+                if decision == "reuse":
+                    record.update(status="reused", report_path=match.path, similarity=match.similarity)
+                    print(f"[{query_id}] reusing {match.path}")
+                    summary.write(json.dumps(record) + "\n")
+                    summary.flush()
+                    return record
+                run_id = f"{Path(path).stem}-{query_id}"
+                checkpoint = None if use_workforce else RunCheckpoint(run_id)
+                if checkpoint is not None:
+                    checkpoint.save_inputs(query=query, seed=seed, recipe_id=recipe)
+                record["run_id"] = run_id
+                if seed:
+                    record["refreshed_from"] = match.path
+                tracer = build_tracer(run_id)
+
+                def run():
+                    # Queued until a worker thread actually picks the query up
+                    nonlocal started
+                    started = time.perf_counter()
+                    return _run_query_in_thread(
+                        query, checkpoint, use_workforce, tracer, seed, None, recipe
+                    )
+
+                try:
+                    result = await loop.run_in_executor(executor, run)
+                    # Queries sharing a prefix may finish in the same second
+                    prefix = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{query_id}"
+                    filepath = save_results(query, result, results_path(query, prefix), recipe)
+                    record.update(status="ok", report_path=str(filepath))
+                    print(f"[{query_id}] done -> {filepath}")
+                except Exception as e:
+                    from rate_limiter import describe_error
+
+                    record.update(status="error", error=describe_error(e))
+                    print(f"[{query_id}] Error during research: {describe_error(e)}")
+                record["queued_s"] = round(started - batch_started, 3)
+                record["duration_s"] = round(time.perf_counter() - started, 3)
+                record.update(tracer.totals(), trace_path=str(tracer.path))
+                summary.write(json.dumps(record) + "\n")
+                summary.flush()
+                return record
+
+        records = await asyncio.gather(
+            *(worker(query_id, query, recipe) for query_id, query, recipe in queries)
+        )
+
+    failed = sum(1 for r in records if r["status"] == "error")
+    elapsed = time.perf_counter() - batch_started
+    print(
+        f"\nBatch finished: {len(records) - failed}/{len(records)} succeeded "
+        f"in {elapsed:.1f}s. Summary written to: {summary_path}"
+    )
+    return records
+
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Universal Research Assistant using Socratic Method')
     parser.add_argument('--query', type=str, help='Research query to investigate')
+    parser.add_argument('--batch', type=str, metavar='JSONL',
+                        help='Run every query in a JSONL file (e.g. requests.jsonl) concurrently')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Maximum number of batch queries in flight (default: 4)')
+    parser.add_argument('--summary', type=str, metavar='JSONL',
+                        help='Where to write the per-query batch summary')
+    parser.add_argument('--workforce', action='store_true',
+                        help='Let a camel Workforce route the query instead of fixed stages')
+    parser.add_argument('--run-id', type=str,
+                        help='Name for this run\'s stage checkpoints (default: timestamp)')
+    parser.add_argument('--resume', type=str, metavar='RUN_ID',
+                        help='Resume a failed run from its first incomplete stage')
+    parser.add_argument('--no-stream', action='store_true',
+                        help='Print the report only once the run has finished')
+    parser.add_argument('--metrics-file', type=str, metavar='PATH',
+                        help='Write per-stage metrics in Prometheus text format')
+    parser.add_argument('--reuse', choices=['auto', 'always', 'never'], default='auto',
+                        help='Use a saved report for a matching query: auto reuses it if newer than '
+                             '--max-age and otherwise refreshes it, always reuses it, never reruns')
+    parser.add_argument('--max-age', type=float, default=7.0, metavar='DAYS',
+                        help='Age after which a matching report is refreshed (default: 7)')
+    add_backend_arguments(parser)
+    parser.add_argument('--recipe', type=str, metavar='RECIPE_ID',
+                        help=f'Report recipe from recipes/<RECIPE_ID>.json (default: {DEFAULT_RECIPE}; '
+                             'batch lines may set their own recipe_id)')
     args = parser.parse_args()
-
-    # Get query from command line or prompt
-    query = args.query if args.query else input("Enter your research question: ")
+    if args.workforce and (args.resume or args.run_id):
+        parser.error("--workforce runs are not checkpointed; drop --resume/--run-id")
+    try:
+        set_memory_policy(args.memory)
+    except ValueError as e:
+        parser.error(f"--memory: {e}")
+    if args.recipe or not (args.resume or args.batch):
+        # Resumed runs use their recorded recipe; batches check each line's
+        try:
+            get_recipe_registry().get(args.recipe or DEFAULT_RECIPE)
+        except (KeyError, ValueError) as e:
+            parser.error(f"--recipe: {e}")
+
+    # Load environment variables and verify API keys
+    import nest_asyncio
+
+    setup_backends(args.llm_cache)
+    nest_asyncio.apply()
+
+    if args.batch:
+        if args.concurrency < 1:
+            parser.error("--concurrency must be at least 1")
+        asyncio.run(run_batch(
+            args.batch, args.concurrency, args.summary, args.workforce, args.reuse, args.max_age,
+            args.recipe,
+        ))
+        print_cache_stats()
+        print(format_memory_stats())
+        return
+
+    checkpoint = None
+    if args.resume:
+        checkpoint = RunCheckpoint.resume(args.resume)
+        inputs = checkpoint.load_inputs()
+        query, seed = inputs["query"], inputs.get("seed")
+        recipe_id = args.recipe or inputs.get("recipe_id")
+        if args.recipe and args.recipe != inputs.get("recipe_id", DEFAULT_RECIPE):
+            # The saved stages were written for another recipe
+            checkpoint.save_inputs(**{**inputs, "recipe_id": args.recipe})
+    else:
+        # Get query from command line or prompt
+        query = args.query if args.query else input("Enter your research question: ")
+        recipe_id = args.recipe or DEFAULT_RECIPE
+
+        # A saved report for the same question may make the run unnecessary
+        decision, match, seed = prior_report(query, args.reuse, args.max_age, recipe_id)
+        if decision == "reuse":
+            print(
+                f"\nReusing report from {match.age_days:.1f} days ago for \"{match.query}\" "
+                f"(similarity {match.similarity:.2f}): {match.path}\n"
+                "Pass --reuse never to run the research again."
+            )
+            print(get_report_index().body(match.path))
+            return
+        if decision == "refresh":
+            print(f"\nRefreshing a {match.age_days:.0f}-day-old report: {match.path}")
+        if not args.workforce:
+            checkpoint = RunCheckpoint(args.run_id)
+            checkpoint.save_inputs(query=query, seed=seed, recipe_id=recipe_id)
 
     print(f"\nResearching: {query}\n")
+    if checkpoint is not None:
+        print(f"Run ID: {checkpoint.run_id}\n")
+    tracer = build_tracer(checkpoint.run_id if checkpoint is not None else None)
+
+    if args.no_stream:
+        writer = None
+        agents = build_agents(tracer=tracer, recipe_id=recipe_id)
+    else:
+        from streaming import ReportWriter
+
+        # The report is printed and written to results/ token by token
+        writer = ReportWriter(results_path(query), report_header(query, recipe_id))
+        agents = build_agents({"report_creator": writer.write}, tracer, recipe_id)
+        print("REPORT (streamed as it is written):")
+        print("=" * 80)
 
     try:
-        # Create workforce with just a name
-        workforce = Workforce("Universal Research Team")
-
-        # Add agents sequentially
-        workforce.add_single_agent_worker(
-            "Research Planner Agent",
-            worker=research_planner
-        ).add_single_agent_worker(
-            "Research Agent",
-            worker=research_agent
-        ).add_single_agent_worker(
-            "Report Creator Agent",
-            worker=report_creator
-        )
-
-        # Create and process task
-        task = Task(
-            content=query,
-            id="research_task"
-        )
-        
         # Process task and get result
-        result = workforce.process_task(task)
-        
-        # Save results to markdown file
-        filepath = save_results(query, result.result)
+        result = run_query(
+            query, agents, checkpoint, args.workforce, seed,
+            get_recipe_registry().get(recipe_id or DEFAULT_RECIPE).needs_research,
+        )
         
-        print("\nFINAL RESEARCH REPORT:")
-        print("=" * 80)
-        print(result.result)
+        if writer is None:
+            # Save results to markdown file
+            filepath = save_results(query, result, recipe_id=recipe_id)
+
+            print("\nFINAL RESEARCH REPORT:")
+            print("=" * 80)
+            print(result)
+        else:
+            streamed = writer.text
+            filepath = writer.finalize(result)
+            index_report(filepath, query, result, recipe_id)
+            if result and result.strip() != streamed.strip():
+                print("\n\nFINAL RESEARCH REPORT:")
+                print("=" * 80)
+                print(result)
         print("=" * 80)
         print(f"\nReport saved to: {filepath}")
+        print_cache_stats()
         
     except Exception as e:
-        print(f"Error during research: {str(e)}")
+        from rate_limiter import describe_error
+
+        print(f"Error during research: {describe_error(e)}")
+        if writer is not None:
+            writer.abort()
+            if writer.text:
+                print(f"Partial report kept in: {writer.part_path}")
+        if checkpoint is not None:
+            print(f"Resume with: python socrates.py --resume {checkpoint.run_id}")
+    finally:
+        print(f"\n{tracer.format_summary()}")
+        print(f"Trace written to: {tracer.path}")
+        if args.metrics_file:
+            tracer.write_prometheus(args.metrics_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
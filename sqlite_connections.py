@@ -0,0 +1,32 @@
+"""Per-thread SQLite connections for the on-disk caches, limiter and queues."""
+
+import sqlite3
+import threading
+
+
+class ThreadLocalConnections:
+    """Calling it returns this thread's WAL-mode connection to ``path``.
+
+    sqlite3 connections must not be shared between threads, so each thread
+    opens its own on first use. ``pragmas`` run on every new connection and
+    ``row_factory`` is set on it; other keyword arguments go to
+    ``sqlite3.connect``.
+    """
+
+    def __init__(self, path, pragmas=(), row_factory=None, timeout=30, **connect_kwargs):
+        self.path = path
+        self.pragmas = ("journal_mode=WAL", *pragmas)
+        self.row_factory = row_factory
+        self.connect_kwargs = dict(connect_kwargs, timeout=timeout)
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, **self.connect_kwargs)
+            for pragma in self.pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,153 @@
+"""Token streaming for the report-creator stage.
+
+``StreamingModelBackend`` asks the wrapped backend for a streamed response,
+hands every content delta to a callback as it arrives, and returns the
+assembled ``ChatCompletion`` so ``ChatAgent`` works unchanged.
+``ReportWriter`` is such a callback: it appends tokens to
+``results/<timestamp>_<query>.md.part`` and atomically renames the file
+into place once the run finishes.
+"""
+
+import os
+import sys
+import time
+
+from camel.types import ChatCompletion
+
+from model_backends import DelegatingModelBackend
+
+
+def completion_from_chunks(chunks):
+    """Assemble streamed ``ChatCompletionChunk`` objects into a ``ChatCompletion``."""
+    content = []
+    tool_calls = {}
+    finish_reason = "stop"
+    usage = None
+    response_id, model, created = "", "", int(time.time())
+    for chunk in chunks:
+        response_id, model, created = chunk.id, chunk.model, chunk.created
+        if chunk.usage is not None:
+            usage = chunk.usage.model_dump()
+        for choice in chunk.choices:
+            delta = choice.delta
+            if delta.content:
+                content.append(delta.content)
+            for call in delta.tool_calls or []:
+                entry = tool_calls.setdefault(
+                    call.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                if call.id:
+                    entry["id"] = call.id
+                if call.function is not None:
+                    entry["function"]["name"] += call.function.name or ""
+                    entry["function"]["arguments"] += call.function.arguments or ""
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    message = {"role": "assistant", "content": "".join(content) or None}
+    if tool_calls:
+        message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+    return ChatCompletion.model_validate({
+        "id": response_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+        "usage": usage,
+    })
+
+
+class StreamingModelBackend(DelegatingModelBackend):
+    """Model backend that streams content deltas to ``on_token``.
+
+    Responses that come back whole (e.g. cache hits) are passed to
+    ``on_token`` in one piece.
+    """
+
+    def __init__(self, backend, on_token):
+        super().__init__(backend)
+        self.on_token = on_token
+
+    @property
+    def stream(self):
+        # ChatAgent always receives a whole completion from this backend
+        return False
+
+    def run(self, messages):
+        config = self.backend.model_config_dict
+        original = {key: config[key] for key in ("stream", "stream_options") if key in config}
+        config["stream"] = True
+        config["stream_options"] = {"include_usage": True}
+        try:
+            response = self.backend.run(messages)
+        finally:
+            for key in ("stream", "stream_options"):
+                config.pop(key, None)
+            config.update(original)
+        if isinstance(response, ChatCompletion):
+            content = response.choices[0].message.content if response.choices else None
+            if content:
+                self.on_token(content)
+            return response
+        chunks = []
+        for chunk in response:
+            chunks.append(chunk)
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    self.on_token(choice.delta.content)
+        return completion_from_chunks(chunks)
+
+
+def print_token(token):
+    sys.stdout.write(token)
+    sys.stdout.flush()
+
+
+class ReportWriter:
+    """Streams a report to stdout and to a ``.part`` file next to ``path``.
+
+    The header is written first and every token is flushed as it arrives,
+    so a crash leaves the partial report on disk. ``finalize`` atomically
+    renames the file to ``path``.
+    """
+
+    def __init__(self, path, header, echo=True):
+        self.path = path
+        self.part_path = path.with_name(path.name + ".part")
+        self.header = header
+        self.echo = echo
+        self.chunks = []
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.part_path, "w", encoding="utf-8")
+        self._file.write(header)
+        self._file.flush()
+
+    def write(self, token):
+        self.chunks.append(token)
+        self._file.write(token)
+        self._file.flush()
+        if self.echo:
+            print_token(token)
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+    def abort(self):
+        """Close after a failure, keeping the ``.part`` file only if it has content."""
+        self._file.close()
+        if not self.chunks:
+            os.remove(self.part_path)
+
+    def finalize(self, result=None):
+        """Move the report into place; ``result`` replaces the streamed body if it differs."""
+        if result is not None and result.strip() != self.text.strip():
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.write(self.header + result + "\n")
+        else:
+            self._file.write("\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.part_path, self.path)
+        return self.path
@@ -0,0 +1,71 @@
+import pytest
+
+from job_queue import JobQueue
+
+# A negative lease is already expired when the next claim looks at it
+EXPIRED = -1
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def job_row(queue, job_id):
+    row = queue._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(row)
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.enqueue("j1", "What is entropy?")
+    first = queue.claim("w1", lease_s=EXPIRED)
+    second = queue.claim("w2")
+
+    assert first["id"] == second["id"] == "j1"
+    assert second["attempts"] == 2
+    assert job_row(queue, "j1")["lease_owner"] == "w2"
+    assert queue.heartbeat("j1", "w1") is False
+
+
+def test_last_attempt_is_dead_lettered(queue):
+    queue.enqueue("expired", "What is entropy?", max_attempts=1)
+    queue.enqueue("failed", "What is enthalpy?", max_attempts=1)
+    queue.claim("w1", lease_s=EXPIRED)
+    failed = queue.claim("w2")
+
+    assert queue.fail(failed["id"], "w2", "boom") == "dead"
+    assert queue.claim("w3") is None
+    assert job_row(queue, "expired")["status"] == "dead"
+    assert job_row(queue, "expired")["error"] == "lease expired"
+    assert job_row(queue, "failed")["error"] == "boom"
+    assert queue.stats()["dead"] == 2
+
+
+def test_failed_attempt_is_retried_until_the_last(queue):
+    queue.enqueue("j1", "What is entropy?", max_attempts=2)
+    queue.claim("w1")
+
+    assert queue.fail("j1", "w1", "boom") == "queued"
+    assert queue.claim("w1")["attempts"] == 2
+    assert queue.fail("j1", "w1", "boom") == "dead"
+
+
+def test_release_does_not_count_the_attempt(queue):
+    queue.enqueue("j1", "What is entropy?", max_attempts=1)
+    queue.claim("w1")
+    queue.release("j1", "w1")
+    job = queue.claim("w2")
+
+    assert job["attempts"] == 1
+    assert job_row(queue, "j1")["status"] == "leased"
+
+
+def test_complete_fails_after_the_lease_is_lost(queue):
+    queue.enqueue("j1", "What is entropy?")
+    queue.claim("w1", lease_s=EXPIRED)
+    queue.claim("w2")
+
+    assert queue.complete("j1", "w1", "results/w1.md") is False
+    assert queue.fail("j1", "w1", "late") is None
+    assert queue.complete("j1", "w2", "results/w2.md") is True
+    assert job_row(queue, "j1")["report_path"] == "results/w2.md"
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from page_fetcher import DEFAULT_MAX_CHARS, PageFetcher
+from search_cache import SearchCache
+
+DELAY_S = 0.5
+
+
+class Handler(BaseHTTPRequestHandler):
+    full_responses = 0
+
+    def log_message(self, *args):
+        pass
+
+    def send_html(self, body, etag=None):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/slow/"):
+            time.sleep(DELAY_S)
+            self.send_html(f"<title>Page {self.path}</title><p>Slow page {self.path}</p>".encode())
+        elif self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            type(self).full_responses += 1
+            self.send_html(b"<title>Versioned</title><p>Version one of the page.</p>", etag='"v1"')
+        elif self.path == "/big":
+            paragraph = b"<p>" + b"lorem ipsum dolor sit amet " * 40 + b"</p>\n"
+            self.send_html(paragraph * (2 * 1024 * 1024 // len(paragraph) + 100))
+        else:
+            self.send_error(404)
+
+
+@pytest.fixture
+def server():
+    Handler.full_responses = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetch_all(urls, **kwargs):
+    async def run():
+        async with PageFetcher(**kwargs) as fetcher:
+            return await fetcher.fetch_all(urls)
+
+    return asyncio.run(run())
+
+
+def test_pages_are_fetched_concurrently(server):
+    urls = [f"{server}/slow/{i}" for i in range(5)]
+    started = time.perf_counter()
+    pages = fetch_all(urls, max_per_host=5)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 2 * DELAY_S
+    assert [page["text"] for page in pages] == [f"Slow page /slow/{i}" for i in range(5)]
+
+
+def test_stale_page_is_revalidated_with_etag(server, tmp_path):
+    cache = SearchCache(cache_dir=tmp_path)
+    # ttl=0: every cached page is stale and must be revalidated
+    first, = fetch_all([f"{server}/etag"], cache=cache, ttl=0)
+    second, = fetch_all([f"{server}/etag"], cache=cache, ttl=0)
+
+    assert first["cached"] is False and second["cached"] is True
+    assert second["text"] == first["text"] == "Version one of the page."
+    assert Handler.full_responses == 1
+
+
+def test_large_page_is_cut_off(server):
+    page, = fetch_all([f"{server}/big"])
+
+    assert page["truncated"] is True
+    assert 0 < len(page["text"]) <= DEFAULT_MAX_CHARS
@@ -0,0 +1,41 @@
+import sqlite3
+
+from report_index import ReportIndex
+
+QUERY = "How do heat pumps work in cold climates?"
+
+
+def write_report(path, recipe_id=None):
+    recipe = f"Recipe: {recipe_id}\n" if recipe_id else ""
+    path.write_text(
+        f"# Research Report: {QUERY}\nGenerated on: 2026-10-01 12:00:00\n{recipe}\n"
+        "Heat pumps move heat from outside air even below freezing.\n",
+        encoding="utf-8",
+    )
+
+
+def test_best_match_only_returns_reports_of_the_same_recipe(tmp_path):
+    results = tmp_path / "results"
+    results.mkdir()
+    write_report(results / "socratic.md", "socratic")
+    write_report(results / "brief.md", "brief")
+    write_report(results / "unknown.md")
+    index = ReportIndex(tmp_path / "reports.sqlite3")
+
+    assert index.sync(results) == 3
+    assert index.best_match(QUERY, "socratic").path == str(results / "socratic.md")
+    assert index.best_match(QUERY, "brief").path == str(results / "brief.md")
+    assert index.best_match(QUERY, "other") is None
+
+
+def test_index_without_recipe_column_is_upgraded(tmp_path):
+    db_path = tmp_path / "reports.sqlite3"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE reports (path TEXT PRIMARY KEY, query TEXT NOT NULL, "
+            "created_at REAL NOT NULL, mtime REAL NOT NULL)"
+        )
+    index = ReportIndex(db_path)
+    index.add(tmp_path / "new.md", QUERY, "Heat pumps.", mtime=0, recipe_id="socratic")
+
+    assert index.best_match(QUERY, "socratic").path == str(tmp_path / "new.md")
@@ -0,0 +1,34 @@
+import pytest
+
+from report_revision import clean_section, join_sections, split_sections
+
+REPORTS = [
+    "## A\ntext a\n## B\ntext b",
+    "# T\n## A\nx\n\n\n## B\ny\n\n",
+    "Intro line\n\n## A\n\n- a\n\n## B\n## C\nc\n",
+    "## A\na\n## B",
+    "No headings at all\n",
+    "",
+]
+
+
+@pytest.mark.parametrize("report", REPORTS)
+def test_split_and_join_round_trip_byte_for_byte(report):
+    assert join_sections(split_sections(report)) == report
+
+
+def test_split_keeps_single_title_in_preamble():
+    sections = split_sections("# T\n## A\nx\n\n\n## B\ny\n\n")
+    assert [s.title for s in sections] == ["", "A", "B"]
+    assert sections[0].text == "# T\n"
+
+
+def test_rewriting_one_section_leaves_the_others_untouched():
+    report = "# T\n\n## A\nold a\n\n## B\nkeep b\n\n\n## C\nkeep c"
+    sections = split_sections(report)
+    sections[1] = clean_section("## A\nnew a", sections[1])
+    assert join_sections(sections) == "# T\n\n## A\nnew a\n\n## B\nkeep b\n\n\n## C\nkeep c"
+
+    sections = split_sections(report)
+    sections[-1] = clean_section("```markdown\n## C\nnew c\n```", sections[-1])
+    assert join_sections(sections) == "# T\n\n## A\nold a\n\n## B\nkeep b\n\n\n## C\nnew c\n"
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import agent_factory
+from agent_factory import AgentFactory
+from fake_backends import FAKE_PLAN, install_fakes
+from report_revision import join_sections, split_sections
+from research_pipeline import (
+    clear_pending,
+    fold_research,
+    pending_sections,
+    repair_json,
+    run_research_and_report,
+)
+
+
+@pytest.fixture
+def factory():
+    from deep_reseach_team import DEFAULT_RECIPE, agent_specs_for
+
+    install_fakes()
+    yield AgentFactory(agent_specs_for(DEFAULT_RECIPE, "A pull request adding a model family."))
+    agent_factory.set_model_provider(None)
+    agent_factory.set_search_tools(None)
+
+
+def test_repair_json_keeps_literal_words_inside_strings():
+    text = """Here is the plan: {'evidence': "not null safe, it's true", 'done': true, 'gap': null,}"""
+    assert repair_json(text) == {"evidence": "not null safe, it's true", "done": True, "gap": None}
+
+
+def test_fold_rewrites_every_section_marked_pending_for_the_ingredient(factory):
+    sections = split_sections(
+        "## Overview\nA new model family. [pending: Technologies]\n\n"
+        "## Benefits and Results\nFaster answers. [pending: Documentation Access]\n\n"
+        "## Additional Context\nSee the docs. [pending: technologies]\n"
+    )
+    research = {"Technologies": [{
+        "topic": "model family overview", "ingredient": "Technologies",
+        "findings": "The family has four sizes.", "sources": [], "snippets": [], "pages": [],
+    }]}
+
+    rewritten = asyncio.run(fold_research(factory, FAKE_PLAN, sections, research))
+    report = join_sections(sections)
+
+    assert {"Overview", "Additional Context"} <= set(rewritten)
+    assert "[pending: Technologies]" not in report.replace("technologies", "Technologies")
+    assert "[pending: Documentation Access]" in report
+
+
+def test_leftover_markers_are_cleared_after_the_last_fold(factory):
+    sections = split_sections(
+        "## Overview\nA new model family.\n\n"
+        "## Technical Details\nFour sizes. [pending: Tech stack]\n"
+    )
+
+    rewritten = asyncio.run(clear_pending(factory, sections, {}))
+
+    assert rewritten == ["Technical Details"]
+    assert pending_sections(sections) == {}
+    assert sections[0].text == "A new model family.\n\n"
+
+
+def test_pipelined_report_has_no_pending_markers_left(factory):
+    outputs = asyncio.run(run_research_and_report(factory, FAKE_PLAN, fetch_pages=0))
+
+    assert set(outputs["research"]) == {"Technologies", "Documentation Access"}
+    assert "[pending:" not in outputs["report"]
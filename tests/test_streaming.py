@@ -0,0 +1,46 @@
+import os
+
+import streaming
+from fake_backends import FakeModel
+from streaming import ReportWriter, StreamingModelBackend
+
+REPLY = "## Summary\nThe report streams token by token to disk."
+HEADER = "# Query\n\n"
+
+
+def test_streamed_report_is_written_incrementally_and_renamed_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "results" / "report.md"
+    writer = ReportWriter(path, HEADER, echo=False)
+    assert path.with_name("report.md.part").read_text(encoding="utf-8") == HEADER
+
+    tokens, sizes = [], []
+
+    def on_token(token):
+        writer.write(token)
+        tokens.append(token)
+        sizes.append(os.path.getsize(writer.part_path))
+
+    backend = StreamingModelBackend(FakeModel(responder=lambda messages: REPLY), on_token)
+    completion = backend.run([{"role": "user", "content": "Write the report"}])
+
+    assert len(tokens) > 1
+    assert all(later > earlier for earlier, later in zip(sizes, sizes[1:]))
+    assert completion.choices[0].message.content == "".join(tokens) == REPLY
+    # The wrapped backend's config is restored after the streamed call
+    assert "stream" not in backend.model_config_dict
+
+    renames = []
+    real_replace = os.replace
+
+    def replace(src, dst):
+        # The finished report must be complete before it appears at ``path``
+        assert not os.path.exists(dst)
+        renames.append((open(src, encoding="utf-8").read(), src, dst))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(streaming.os, "replace", replace)
+    assert writer.finalize(REPLY) == path
+
+    assert renames == [(HEADER + REPLY + "\n", writer.part_path, path)]
+    assert path.read_text(encoding="utf-8") == HEADER + REPLY + "\n"
+    assert not writer.part_path.exists()
@@ -0,0 +1,257 @@
+"""Latency, token and cost tracing for agent steps, model calls and tools.
+
+A ``Tracer`` collects spans for one run and appends each one to
+``traces/<run_id>.jsonl`` as it finishes. The current tracer, stage and
+agent travel in a context variable, which ``asyncio.to_thread`` copies into
+worker threads, so shared objects such as the search tools attribute their
+spans to whichever run and agent called them.
+"""
+
+import contextvars
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from model_backends import DelegatingModelBackend
+
+DEFAULT_TRACES_DIR = "traces"
+
+# USD per million tokens (input, output); unknown models are costed at zero
+PRICES_PER_MTOK = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "o3-mini": (1.10, 4.40),
+    "o1": (15.00, 60.00),
+    "o1-mini": (1.10, 4.40),
+}
+
+_context = contextvars.ContextVar("trace_context", default=None)
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = PRICES_PER_MTOK.get(str(model), (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def current_tracer():
+    """The tracer of the calling context, or ``None`` outside a traced run."""
+    ctx = _context.get()
+    return ctx[0] if ctx is not None else None
+
+
+def annotate(**fields):
+    """Add fields to the innermost open span; a no-op outside a traced run."""
+    ctx = _context.get()
+    if ctx is not None and ctx[3] is not None:
+        ctx[3].update(fields)
+
+
+def note_retry():
+    """Count a retry against the innermost open span."""
+    ctx = _context.get()
+    if ctx is not None and ctx[3] is not None:
+        ctx[3]["retries"] += 1
+
+
+class Tracer:
+    """Spans of one run, written to ``traces_dir/<run_id>.jsonl``.
+
+    ``on_span(event, span)``, if given, is called with ``"start"`` when a
+    span opens and ``"end"`` once it is recorded, from whichever thread
+    runs the span (e.g. to report progress while the run is going).
+    """
+
+    def __init__(self, run_id, traces_dir=DEFAULT_TRACES_DIR, on_span=None):
+        self.run_id = run_id
+        self.path = Path(traces_dir) / f"{run_id}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.spans = []
+        self.on_span = on_span
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, kind, name, stage=None, agent=None, **attrs):
+        """Time the enclosed block; yields the span dict so callers can add fields.
+
+        Stage and agent are inherited from the enclosing span of this tracer.
+        The context holds ``(tracer, stage, agent, span)``; each thread gets
+        its own copy, so concurrent spans never share mutable state.
+        """
+        ctx = _context.get()
+        if ctx is not None and ctx[0] is self:
+            stage = stage or ctx[1]
+            agent = agent or ctx[2]
+        span = {
+            "run_id": self.run_id,
+            "kind": kind,
+            "name": name,
+            "stage": stage,
+            "agent": agent,
+            "start": time.time(),
+            "retries": 0,
+            "status": "ok",
+            **attrs,
+        }
+        token = _context.set((self, stage, agent, span))
+        if self.on_span is not None:
+            self.on_span("start", span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span["status"] = "error"
+            span["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span["duration_s"] = round(time.perf_counter() - started, 4)
+            _context.reset(token)
+            self._record(span)
+
+    def stage(self, name):
+        """Span for a pipeline stage; nested spans are attributed to it."""
+        return self.span("stage", name, stage=name)
+
+    def _record(self, span):
+        with self._lock:
+            self.spans.append(span)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(span, default=str) + "\n")
+        if self.on_span is not None:
+            self.on_span("end", span)
+
+    def instrument_agent(self, agent, name):
+        """Record a span around every ``agent.step`` call."""
+        step = agent.step
+
+        @functools.wraps(step)
+        def traced_step(*args, **kwargs):
+            with self.span("agent_step", name, agent=name) as span:
+                response = step(*args, **kwargs)
+                span["tool_calls"] = len(response.info.get("tool_calls") or [])
+                return response
+
+        agent.step = traced_step
+        return agent
+
+    def summary(self):
+        """Aggregate spans per stage (or per agent when no stage is set)."""
+        rows = {}
+        for span in self.spans:
+            if span["kind"] == "route":
+                # Routing decisions annotate the trace; they are not work
+                continue
+            key = span["stage"] or span["agent"] or "-"
+            row = rows.setdefault(key, {
+                "wall_s": 0.0, "steps": 0, "model_calls": 0, "tool_calls": 0,
+                "retries": 0, "errors": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "cost_usd": 0.0,
+            })
+            if span["kind"] == "stage":
+                row["wall_s"] += span["duration_s"]
+            elif span["kind"] == "agent_step":
+                row["steps"] += 1
+            elif span["kind"] == "model":
+                row["model_calls"] += 1
+                row["prompt_tokens"] += span.get("prompt_tokens", 0)
+                row["completion_tokens"] += span.get("completion_tokens", 0)
+                row["cost_usd"] += span.get("cost_usd", 0.0)
+            elif span["kind"] == "tool":
+                row["tool_calls"] += 1
+            row["retries"] += span["retries"]
+            row["errors"] += span["status"] == "error"
+        return rows
+
+    def totals(self):
+        rows = self.summary().values()
+        return {
+            "prompt_tokens": sum(r["prompt_tokens"] for r in rows),
+            "completion_tokens": sum(r["completion_tokens"] for r in rows),
+            "cost_usd": round(sum(r["cost_usd"] for r in rows), 6),
+            "model_calls": sum(r["model_calls"] for r in rows),
+            "tool_calls": sum(r["tool_calls"] for r in rows),
+        }
+
+    def format_summary(self):
+        header = (
+            f"{'stage':<22} {'wall_s':>8} {'steps':>6} {'calls':>6} {'tools':>6} "
+            f"{'retries':>7} {'prompt_tok':>10} {'compl_tok':>10} {'cost_usd':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        for name, row in self.summary().items():
+            lines.append(
+                f"{name[:22]:<22} {row['wall_s']:>8.2f} {row['steps']:>6} {row['model_calls']:>6} "
+                f"{row['tool_calls']:>6} {row['retries']:>7} {row['prompt_tokens']:>10} "
+                f"{row['completion_tokens']:>10} {row['cost_usd']:>9.4f}"
+            )
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        """Summary as Prometheus text exposition, e.g. for a node_exporter textfile."""
+        metrics = {
+            "deep_research_stage_seconds_total": "wall_s",
+            "deep_research_agent_steps_total": "steps",
+            "deep_research_model_calls_total": "model_calls",
+            "deep_research_tool_calls_total": "tool_calls",
+            "deep_research_retries_total": "retries",
+            "deep_research_errors_total": "errors",
+            "deep_research_prompt_tokens_total": "prompt_tokens",
+            "deep_research_completion_tokens_total": "completion_tokens",
+            "deep_research_cost_usd_total": "cost_usd",
+        }
+        rows = self.summary()
+        lines = []
+        for metric, field in metrics.items():
+            lines.append(f"# TYPE {metric} counter")
+            for stage, row in rows.items():
+                lines.append(f'{metric}{{run_id="{self.run_id}",stage="{stage}"}} {row[field]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        Path(path).write_text(self.prometheus_text(), encoding="utf-8")
+
+
+def traced_tool(func):
+    """Wrap a tool so calls are recorded on the calling context's tracer."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        ctx = _context.get()
+        if ctx is None:
+            return func(*args, **kwargs)
+        with ctx[0].span("tool", func.__name__) as span:
+            result = func(*args, **kwargs)
+            if isinstance(result, list):
+                span["results"] = len(result)
+            return result
+
+    return wrapper
+
+
+class TracingModelBackend(DelegatingModelBackend):
+    """Model backend that records a span with token usage and cost per call."""
+
+    def __init__(self, backend, tracer, agent_name):
+        super().__init__(backend)
+        self.tracer = tracer
+        self.agent_name = agent_name
+
+    def run(self, messages):
+        model = str(self.model_type)
+        with self.tracer.span("model", model, agent=self.agent_name) as span:
+            response = self.backend.run(messages)
+            usage = getattr(response, "usage", None)
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            # CachingModelBackend annotates hits; they cost nothing
+            cached = span.get("cached", False)
+            span.update(
+                messages=len(messages),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cached=cached,
+                cost_usd=0.0 if cached else estimate_cost(model, prompt_tokens, completion_tokens),
+            )
+            return response